@@ -3,6 +3,7 @@ class NewsArticle(object):
     Class representing a single news article containing all the information that news-please can extract.
     """
     authors = []
+    cluster_id = None
     date_download = None
     date_modify = None
     date_publish = None
@@ -35,7 +36,7 @@ class NewsArticle(object):
         Get the dict of the instance of this class.
         :return:
         """
-        return {
+        article = {
             'authors': self.authors,
             'date_download': self.date_download,
             'date_modify': self.date_modify,
@@ -53,3 +54,7 @@ class NewsArticle(object):
             'title_rss': self.title_rss,
             'url': self.url
         }
+        # only set if near-duplicates are detected
+        if self.cluster_id is not None:
+            article['cluster_id'] = self.cluster_id
+        return article
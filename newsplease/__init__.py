@@ -1,18 +1,31 @@
 import datetime
+import importlib
 import os
 import sys
 import urllib
 
-from bs4.dammit import EncodingDetector
 from six.moves import urllib
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 
+from newsplease import batch_extractor
 from newsplease.pipeline.extractor import article_extractor
-from newsplease.crawler.items import NewscrawlerItem
-from dotmap import DotMap
+from newsplease.pipeline.extractor.extraction_item import ExtractionItem
 from newsplease.pipeline.pipelines import ExtractedInformationStorage
-from newsplease.crawler.simple_crawler import SimpleCrawler
+
+# Scrapy, requests and bs4 are imported on first use, so that importing newsplease stays cheap for workers that only
+# extract articles. The names remain available as attributes of the package, see __getattr__.
+LAZY_ATTRIBUTES = {
+    'NewscrawlerItem': 'newsplease.crawler.items',
+    'SimpleCrawler': 'newsplease.crawler.simple_crawler',
+    'EncodingDetector': 'bs4.dammit',
+}
+
+
+def __getattr__(name):
+    if name in LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(LAZY_ATTRIBUTES[name]), name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 class EmptyResponseError(ValueError):
@@ -25,19 +38,91 @@ class NewsPlease:
     """
 
     @staticmethod
-    def from_warc(warc_record, decode_errors="replace", fetch_images=True):
+    def extractor(fetch_images=True, extractor_list=None, structured_data=False, templates=False, slim_html=False,
+                  max_html_bytes=None):
+        """
+        Returns the article extractor used by from_html and from_warc. Extractors are initialized only once per process
+        and configuration, so repeated calls are cheap. Callers processing many documents can hold on to the returned
+        extractor and pass it to from_html or from_warc via extractor=...
+        :param fetch_images: if True, newspaper fetches the top image of the article
+        :param extractor_list: list of extractors to use, if None the default list of news-please is used
+        :param structured_data: if True, the structured metadata of the document (JSON-LD, OpenGraph, Twitter cards,
+            Dublin Core) is read first. Fields it provides consistently are taken from it, and the other extractors
+            are only run for the remaining fields. Only applies to the default list of extractors.
+        :param templates: if True, the layout of each domain is learned from the extracted articles, and fields of
+            further pages of the domain are extracted with the learned templates instead of running the other
+            extractors. Requires domain_priors to be passed to from_html, in which the templates are kept. Only applies
+            to the default list of extractors.
+        :param slim_html: if True, scripts (except JSON-LD), styles, SVG graphics and base64-encoded images are removed
+            from the HTML before it is parsed, which speeds up the extraction of large pages. extractor.html_slimmer
+            reports the bytes saved.
+        :param max_html_bytes: if set, larger pages are cut to this size before they are parsed
+        :return: An initialized article_extractor.Extractor
+        """
+        if extractor_list is None:
+            extractor_list = (
+                ['newspaper_extractor']
+                if fetch_images
+                else [("newspaper_extractor_no_images", "NewspaperExtractorNoImages")]
+            ) + ['readability_extractor', 'date_extractor', 'lang_detect_extractor']
+            if templates:
+                extractor_list = ['template_extractor'] + extractor_list
+            if structured_data:
+                extractor_list = ['structured_data_extractor'] + extractor_list
+        return article_extractor.Extractor.get_instance(extractor_list, slim_html=slim_html,
+                                                        max_html_bytes=max_html_bytes)
+
+    @staticmethod
+    def from_warc(warc_record, decode_errors="replace", fetch_images=True, extractor=None, fields=None,
+                  domain_priors=None, extraction_cache=None, time_budget=None):
         """
         Extracts relevant information from a WARC record. This function does not invoke scrapy but only uses the article
         extractor.
+        :param extractor: an extractor obtained from NewsPlease.extractor(...), if None it is looked up by fetch_images
+        :param fields: see from_html
+        :param domain_priors: see from_html
+        :param extraction_cache: see from_html
+        :param time_budget: see from_html
         :return:
         """
+        raw_stream, content_type, url, download_date = NewsPlease.read_warc_record(warc_record)
+        return NewsPlease.from_warc_payload(raw_stream, content_type, url, download_date, decode_errors=decode_errors,
+                                            fetch_images=fetch_images, extractor=extractor, fields=fields,
+                                            domain_priors=domain_priors, extraction_cache=extraction_cache,
+                                            time_budget=time_budget)
+
+    @staticmethod
+    def read_warc_record(warc_record):
+        """
+        Reads everything the extraction needs from a WARC record, so that the record itself, which is bound to its
+        stream, does not need to be kept or passed to other processes.
+        :param warc_record:
+        :return: A tuple of the raw payload (bytes), the HTTP Content-Type header, the URL and the download date
+        """
         raw_stream = warc_record.raw_stream.read()
+        content_type = None
+        try:
+            content_type = warc_record.http_headers.get_header('Content-Type')
+        except AttributeError:
+            pass
+        url = warc_record.rec_headers.get_header('WARC-Target-URI')
+        download_date = warc_record.rec_headers.get_header('WARC-Date')
+        return raw_stream, content_type, url, download_date
+
+    @staticmethod
+    def from_warc_payload(raw_stream, content_type, url, download_date, decode_errors="replace", fetch_images=True,
+                          extractor=None, fields=None, domain_priors=None, extraction_cache=None, time_budget=None):
+        """
+        Decodes the payload of a WARC record as returned by read_warc_record and extracts relevant information from it.
+        :return:
+        """
         encoding = None
         try:
-            encoding = warc_record.http_headers.get_header('Content-Type').split(';')[1].split('=')[1]
+            encoding = content_type.split(';')[1].split('=')[1]
         except:
             pass
         if not encoding:
+            from bs4.dammit import EncodingDetector
             encoding = EncodingDetector.find_declared_encoding(raw_stream, is_html=True)
         if not encoding:
             # assume utf-8
@@ -50,77 +135,131 @@ class NewsPlease:
             html = raw_stream.decode('utf-8', errors=decode_errors)
         if not html:
             raise EmptyResponseError()
-        url = warc_record.rec_headers.get_header('WARC-Target-URI')
-        download_date = warc_record.rec_headers.get_header('WARC-Date')
-        article = NewsPlease.from_html(html, url=url, download_date=download_date, fetch_images=fetch_images)
+        article = NewsPlease.from_html(html, url=url, download_date=download_date, fetch_images=fetch_images,
+                                       extractor=extractor, fields=fields, domain_priors=domain_priors,
+                                       extraction_cache=extraction_cache, time_budget=time_budget)
         return article
 
     @staticmethod
-    def from_html(html, url=None, download_date=None, fetch_images=True):
+    def from_html(html, url=None, download_date=None, fetch_images=True, extractor=None, fields=None,
+                  domain_priors=None, extraction_cache=None, time_budget=None):
         """
         Extracts relevant information from an HTML page given as a string. This function does not invoke scrapy but only
         uses the article extractor. If you have the original URL make sure to provide it as this helps NewsPlease
         to extract the publishing date and title.
         :param html:
         :param url:
+        :param extractor: an extractor obtained from NewsPlease.extractor(...), if None it is looked up by fetch_images
+        :param fields: list of NewsArticle fields that are needed, e.g., ['title', 'date_publish', 'language']. Only
+            the extractors, cleaning steps and comparers needed for these fields are run, all other extracted fields
+            are None. If None, all fields are extracted.
+        :param domain_priors: a DomainPriors (helper_classes.domain_priors) that learns the language of each domain.
+            Once learned, the language of further pages of the domain is only verified on a short sample instead of
+            being detected on the full text. If None, the language is always detected. It also keeps the templates of
+            the template_extractor, see extractor(templates=True).
+        :param extraction_cache: an ExtractionCache (helper_classes.extraction_cache). Pages that were extracted
+            before with the same URL, extractors and fields are taken from the cache instead of being extracted again.
+        :param time_budget: a TimeBudget (helper_classes.time_budget) that limits the time spent on the page and on
+            each extractor. Extractors that exceed it are abandoned, and the fields are chosen from the results of the
+            other extractors. The URLs of such pages are logged and their HTML is optionally quarantined.
         :return:
         """
-        extractor = article_extractor.Extractor(
-            (
-                ['newspaper_extractor']
-                if fetch_images
-                else [("newspaper_extractor_no_images", "NewspaperExtractorNoImages")]
-            ) +
-            ['readability_extractor', 'date_extractor', 'lang_detect_extractor']
-        )
+        if extractor is None:
+            extractor = NewsPlease.extractor(fetch_images=fetch_images)
 
-        title_encoded = ''.encode()
         if not url:
             url = ''
 
         # if an url was given, we can use that as the filename
         filename = urllib.parse.quote_plus(url) + '.json'
 
-        item = NewscrawlerItem()
-        item['spider_response'] = DotMap()
-        item['spider_response'].body = html
-        item['url'] = url
-        item['source_domain'] = urllib.parse.urlparse(url).hostname.encode() if url != '' else ''.encode()
-        item['html_title'] = title_encoded
-        item['rss_title'] = title_encoded
-        item['local_path'] = None
-        item['filename'] = filename
-        item['download_date'] = download_date
-        item['modified_date'] = None
-        item = extractor.extract(item)
-
-        tmp_article = ExtractedInformationStorage.extract_relevant_info(item)
-        final_article = ExtractedInformationStorage.convert_to_class(tmp_article)
-        return final_article
+        item = ExtractionItem(html, url=url,
+                              source_domain=urllib.parse.urlparse(url).hostname.encode() if url != '' else ''.encode(),
+                              filename=filename, download_date=download_date, domain_priors=domain_priors)
+        item = extractor.extract(item, fields, cache=extraction_cache, time_budget=time_budget)
+
+        return ExtractedInformationStorage.item_to_class(item)
+
+    @staticmethod
+    def from_html_batch(documents, fetch_images=True, number_of_processes=None, chunksize=16,
+                        max_chunks_in_flight=None, fields=None, extraction_cache=None, time_budget=None):
+        """
+        Extracts relevant information from many HTML pages in parallel, using a pool of worker processes that each
+        initialize their extractor once. The documents are consumed lazily and only a bounded number of them is in
+        flight at any time.
+        :param documents: iterable of (html, url, download_date) tuples
+        :param fetch_images:
+        :param number_of_processes: number of worker processes, defaults to the number of CPUs. If 1, the documents are
+            extracted in the current process.
+        :param chunksize: number of documents sent to a worker at once
+        :param max_chunks_in_flight: maximum number of chunks being extracted or waiting to be yielded, defaults to
+            twice the number of processes
+        :param fields: see from_html
+        :param extraction_cache: see from_html, the cache is shared by all worker processes
+        :param time_budget: see from_html, the statistics of the worker processes are added to it
+        :return: A generator yielding a NewsArticle object (or None, if the extraction failed) for each document, in
+            the order of the documents
+        """
+        # fail early on unknown fields instead of in every worker
+        article_extractor.Extractor.candidate_fields(fields)
+        return batch_extractor.extract(batch_extractor._extract_html_chunk, documents, fetch_images=fetch_images,
+                                       number_of_processes=number_of_processes, chunksize=chunksize,
+                                       max_chunks_in_flight=max_chunks_in_flight, fields=fields,
+                                       extraction_cache=extraction_cache, time_budget=time_budget)
+
+    @staticmethod
+    def from_warc_records(warc_records, decode_errors="replace", fetch_images=True, number_of_processes=None,
+                          chunksize=16, max_chunks_in_flight=None, fields=None, extraction_cache=None,
+                          time_budget=None):
+        """
+        Extracts relevant information from many WARC records in parallel, see from_html_batch. Records that are not of
+        type response, e.g., requests or metadata, are skipped.
+        :param warc_records: iterable of WARC records, e.g., an ArchiveIterator
+        :param decode_errors:
+        :param fetch_images:
+        :param number_of_processes:
+        :param chunksize:
+        :param max_chunks_in_flight:
+        :param fields: see from_html
+        :param extraction_cache: see from_html_batch
+        :param time_budget: see from_html_batch
+        :return: A generator yielding a NewsArticle object (or None, if the extraction failed) for each response
+            record, in the order of the records
+        """
+        article_extractor.Extractor.candidate_fields(fields)
+        payloads = (NewsPlease.read_warc_record(record) + (decode_errors,)
+                    for record in warc_records if record.rec_type == 'response')
+        return batch_extractor.extract(batch_extractor._extract_warc_chunk, payloads, fetch_images=fetch_images,
+                                       number_of_processes=number_of_processes, chunksize=chunksize,
+                                       max_chunks_in_flight=max_chunks_in_flight, fields=fields,
+                                       extraction_cache=extraction_cache, time_budget=time_budget)
 
     @staticmethod
-    def from_url(url, timeout=None):
+    def from_url(url, timeout=None, domain_priors=None):
         """
         Crawls the article from the url and extracts relevant information.
         :param url:
         :param timeout: in seconds, if None, the urllib default is used
+        :param domain_priors: see from_urls
         :return: A NewsArticle object containing all the information of the article. Else, None.
         :rtype: NewsArticle, None
         """
-        articles = NewsPlease.from_urls([url], timeout=timeout)
+        articles = NewsPlease.from_urls([url], timeout=timeout, domain_priors=domain_priors)
         if url in articles.keys():
             return articles[url]
         else:
             return None
 
     @staticmethod
-    def from_urls(urls, timeout=None):
+    def from_urls(urls, timeout=None, domain_priors=None):
         """
         Crawls articles from the urls and extracts relevant information.
         :param urls:
         :param timeout: in seconds, if None, the urllib default is used
+        :param domain_priors: a DomainPriors that learns the encoding and the language of each domain, see from_html
         :return: A dict containing given URLs as keys, and extracted information as corresponding values.
         """
+        from newsplease.crawler.simple_crawler import SimpleCrawler
         results = {}
         download_date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
@@ -130,12 +269,12 @@ class NewsPlease:
             pass
         elif len(urls) == 1:
             url = urls[0]
-            html = SimpleCrawler.fetch_url(url, timeout=timeout)
-            results[url] = NewsPlease.from_html(html, url, download_date)
+            html = SimpleCrawler.fetch_url(url, timeout=timeout, domain_priors=domain_priors)
+            results[url] = NewsPlease.from_html(html, url, download_date, domain_priors=domain_priors)
         else:
-            results = SimpleCrawler.fetch_urls(urls)
+            results = SimpleCrawler.fetch_urls(urls, domain_priors=domain_priors)
             for url in results:
-                results[url] = NewsPlease.from_html(results[url], url, download_date)
+                results[url] = NewsPlease.from_html(results[url], url, download_date, domain_priors=domain_priors)
 
         return results
 
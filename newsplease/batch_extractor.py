@@ -0,0 +1,301 @@
+"""
+Extracts articles from many documents in parallel using a pool of worker processes. Each worker initializes its
+article extractor once and reuses it for all documents it processes. Documents are sent to the workers in chunks,
+results are returned in the order of the input, and only a bounded number of chunks is in flight at any time, so that
+memory usage stays flat regardless of the number of documents.
+
+The statistics that the workers collect, e.g., the hits of the extraction cache, and the domain priors they learn are
+returned with the articles of each chunk and added to the objects of the calling process, so that its reports and the
+snapshot of the priors cover all documents.
+"""
+import collections
+import io
+import logging
+import os
+from itertools import islice
+from multiprocessing import Pool
+
+LOGGER = logging.getLogger(__name__)
+
+# the extractor, the requested fields, the extraction cache, the time budget and the domain priors of the current
+# (worker) process, set by __init_worker
+__extractor = None
+__fields = None
+__extraction_cache = None
+__time_budget = None
+__domain_priors = None
+
+# counters of the statistics objects of a worker, which are sent to the calling process with each chunk and then reset,
+# as (name of the object, attributes). The counters are integers, collections.Counters or collections.deques.
+STATISTICS = (
+    ('extractor', ('documents', 'fast_path_documents', 'settled_field_documents')),
+    ('html_slimmer', ('documents', 'size_in', 'size_out', 'truncated')),
+    ('extraction_cache', ('hits', 'misses', 'puts')),
+    ('time_budget', ('documents', 'documents_over_budget', 'abandoned', 'offenders')),
+)
+
+
+def __init_worker(fetch_images, fields, extraction_cache=None, time_budget=None, extractor_options=None,
+                  domain_priors=None):
+    """
+    Initializes the article extractor of a worker process.
+    :param fetch_images:
+    :param fields:
+    :param extraction_cache:
+    :param time_budget:
+    :param extractor_options: further keyword arguments of NewsPlease.extractor, e.g., structured_data
+    :param domain_priors:
+    :return:
+    """
+    # imported here, because the newsplease package imports this module
+    from . import NewsPlease
+
+    global __extractor
+    global __fields
+    global __extraction_cache
+    global __time_budget
+    global __domain_priors
+    __extractor = NewsPlease.extractor(fetch_images=fetch_images, **(extractor_options or {}))
+    __fields = fields
+    __extraction_cache = extraction_cache
+    __time_budget = time_budget
+    __domain_priors = domain_priors
+
+
+def __init_pool_worker(*arguments):
+    """
+    Initializes a worker process of the pool, see __init_worker.
+    :param arguments:
+    :return:
+    """
+    __init_worker(*arguments)
+    # the statistics of the calling process, which the worker inherits, are not sent back to it
+    _take_statistics()
+
+
+def _extract_html_chunk(chunk):
+    """
+    Extracts articles from a chunk of (html, url, download_date) tuples.
+    :param chunk:
+    :return: list of NewsArticle objects, None for documents that could not be extracted
+    """
+    from . import NewsPlease
+
+    articles = []
+    for html, url, download_date in chunk:
+        try:
+            articles.append(NewsPlease.from_html(html, url=url, download_date=download_date, extractor=__extractor,
+                                                 fields=__fields, domain_priors=__domain_priors,
+                                                 extraction_cache=__extraction_cache, time_budget=__time_budget))
+        except Exception as error:
+            LOGGER.warning('could not extract %s: %s', url, error)
+            articles.append(None)
+    return articles
+
+
+def _extract_warc_chunk(chunk):
+    """
+    Extracts articles from a chunk of WARC payloads as returned by NewsPlease.read_warc_record, each extended by the
+    decode_errors setting. None tasks stand for records that are skipped.
+    :param chunk:
+    :return: list of NewsArticle objects, None for records that could not be extracted
+    """
+    from . import NewsPlease
+
+    articles = []
+    for task in chunk:
+        if task is None:
+            articles.append(None)
+            continue
+        raw_stream, content_type, url, download_date, decode_errors = task
+        try:
+            articles.append(NewsPlease.from_warc_payload(raw_stream, content_type, url, download_date,
+                                                         decode_errors=decode_errors, extractor=__extractor,
+                                                         fields=__fields, domain_priors=__domain_priors,
+                                                         extraction_cache=__extraction_cache,
+                                                         time_budget=__time_budget))
+        except Exception as error:
+            LOGGER.warning('could not extract %s: %s', url, error)
+            articles.append(None)
+    return articles
+
+
+def _extract_warc_offset_chunk(chunk):
+    """
+    Extracts articles from a chunk of records of local WARC files, given as (path_name, offset, length,
+    decode_errors) tuples. Each record is read from the file at its offset, so that the payloads do not need to be
+    sent to the worker. This requires that each record is a gzip member of its own or that the file is not
+    compressed, as is the case for the WARC files of CommonCrawl. None tasks stand for records that are skipped.
+    :param chunk:
+    :return: list of NewsArticle objects, None for records that could not be extracted
+    """
+    from warcio.archiveiterator import ArchiveIterator
+
+    from . import NewsPlease
+
+    articles = []
+    warc_files = {}
+    try:
+        for task in chunk:
+            if task is None:
+                articles.append(None)
+                continue
+            path_name, offset, length, decode_errors = task
+            try:
+                if path_name not in warc_files:
+                    warc_files[path_name] = open(path_name, 'rb')
+                warc_file = warc_files[path_name]
+                warc_file.seek(offset)
+                record = next(iter(ArchiveIterator(io.BytesIO(warc_file.read(length)))))
+                articles.append(NewsPlease.from_warc(record, decode_errors=decode_errors, extractor=__extractor,
+                                                     fields=__fields, domain_priors=__domain_priors,
+                                                     extraction_cache=__extraction_cache,
+                                                     time_budget=__time_budget))
+            except Exception as error:
+                LOGGER.warning('could not extract the record at %i of %s: %s', offset, path_name, error)
+                articles.append(None)
+    finally:
+        for warc_file in warc_files.values():
+            warc_file.close()
+    return articles
+
+
+def _statistics_objects(extractor, extraction_cache, time_budget):
+    """
+    :return: dict of the statistics objects of STATISTICS, None for those that are not used
+    """
+    return {'extractor': extractor, 'html_slimmer': getattr(extractor, 'html_slimmer', None),
+            'extraction_cache': extraction_cache, 'time_budget': time_budget}
+
+
+def _take_statistics():
+    """
+    Collects the statistics of the worker since the last call and resets them.
+    :return: dict of the counters of STATISTICS by object name, and the changes of the domain priors under the key
+        domain_priors, see DomainPriors.take_changes
+    """
+    statistics = {}
+    objects = _statistics_objects(__extractor, __extraction_cache, __time_budget)
+    for name, attributes in STATISTICS:
+        if objects[name] is None:
+            continue
+        counters = statistics[name] = {}
+        for attribute in attributes:
+            value = getattr(objects[name], attribute)
+            if isinstance(value, collections.deque):
+                counters[attribute] = list(value)
+                value.clear()
+            elif isinstance(value, collections.Counter):
+                counters[attribute] = value.copy()
+                value.clear()
+            else:
+                counters[attribute] = value
+                setattr(objects[name], attribute, 0)
+    if __domain_priors is not None:
+        statistics['domain_priors'] = __domain_priors.take_changes()
+    return statistics
+
+
+def __add_statistics(statistics, extractor, extraction_cache, time_budget, domain_priors):
+    """
+    Adds the statistics of a worker, see _take_statistics, to the statistics objects of the calling process.
+    :return:
+    """
+    objects = _statistics_objects(extractor, extraction_cache, time_budget)
+    for name, counters in statistics.items():
+        if name == 'domain_priors':
+            if domain_priors is not None:
+                domain_priors.merge(*counters)
+        elif objects.get(name) is not None:
+            for attribute, count in counters.items():
+                value = getattr(objects[name], attribute)
+                if isinstance(value, collections.deque):
+                    value.extend(count)
+                elif isinstance(value, collections.Counter):
+                    value.update(count)
+                else:
+                    setattr(objects[name], attribute, value + count)
+
+
+def _extract_chunk_with_statistics(function, chunk):
+    """
+    Runs a chunk function in a worker process.
+    :param function: _extract_html_chunk, _extract_warc_chunk or _extract_warc_offset_chunk
+    :param chunk:
+    :return: (list of NewsArticle objects, statistics of the worker, see _take_statistics)
+    """
+    articles = function(chunk)
+    return articles, _take_statistics()
+
+
+def __chunks(iterable, chunksize):
+    """
+    Splits an iterable into lists of at most chunksize elements without consuming it upfront.
+    :param iterable:
+    :param chunksize:
+    :return:
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def extract(function, tasks, fetch_images=True, number_of_processes=None, chunksize=16, max_chunks_in_flight=None,
+            fields=None, extraction_cache=None, time_budget=None, extractor_options=None, domain_priors=None,
+            extractor=None):
+    """
+    Runs function on chunks of tasks in a pool of worker processes and yields the results in the order of the tasks.
+    :param function: _extract_html_chunk, _extract_warc_chunk or _extract_warc_offset_chunk
+    :param tasks: iterable of tasks, consumed lazily
+    :param fetch_images:
+    :param number_of_processes: number of worker processes, defaults to the number of CPUs. If 1, all documents
+        are extracted in the current process.
+    :param chunksize: number of documents sent to a worker at once
+    :param max_chunks_in_flight: maximum number of chunks submitted but not yet yielded, defaults to twice the number
+        of processes
+    :param fields: NewsArticle fields to extract, None for all fields
+    :param extraction_cache: ExtractionCache shared by the workers, None to extract every document. The hits of the
+        workers are added to its statistics.
+    :param time_budget: TimeBudget, of which each worker uses a copy, None for no time limits. The statistics of the
+        workers are added to it.
+    :param extractor_options: further keyword arguments of NewsPlease.extractor, e.g., structured_data
+    :param domain_priors: DomainPriors, of which each worker uses and updates a copy, None to detect the language of
+        every document. The priors learned by the workers are merged into it, see DomainPriors.merge.
+    :param extractor: Extractor of the calling process, to whose statistics (and those of its HtmlSlimmer) the
+        statistics of the workers are added, None to drop them
+    :return: generator of NewsArticle objects
+    """
+    if number_of_processes is None:
+        number_of_processes = os.cpu_count() or 1
+    if max_chunks_in_flight is None:
+        max_chunks_in_flight = 2 * number_of_processes
+
+    chunks = __chunks(tasks, chunksize)
+
+    if number_of_processes <= 1:
+        __init_worker(fetch_images, fields, extraction_cache, time_budget, extractor_options, domain_priors)
+        for chunk in chunks:
+            for article in function(chunk):
+                yield article
+        return
+
+    LOGGER.info('creating extraction process pool with %i processes', number_of_processes)
+    with Pool(number_of_processes, initializer=__init_pool_worker,
+              initargs=(fetch_images, fields, extraction_cache, time_budget, extractor_options,
+                        domain_priors)) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_extract_chunk_with_statistics, (function, chunk)))
+            if len(pending) >= max_chunks_in_flight:
+                articles, statistics = pending.popleft().get()
+                __add_statistics(statistics, extractor, extraction_cache, time_budget, domain_priors)
+                for article in articles:
+                    yield article
+        while pending:
+            articles, statistics = pending.popleft().get()
+            __add_statistics(statistics, extractor, extraction_cache, time_budget, domain_priors)
+            for article in articles:
+                yield article
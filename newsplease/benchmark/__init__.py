@@ -0,0 +1,75 @@
+"""
+Benchmarks for the extraction pipeline of news-please. Each module can be run on its own, e.g.,
+python -m newsplease.benchmark.parse_count [html files...]
+
+If no HTML files are given, the benchmarks run on a synthetic news article.
+"""
+import os
+
+from ..pipeline.extractor.extraction_item import ExtractionItem
+
+SAMPLE_URL = 'https://www.example.com/politics/2019/05/17/parliament-passes-budget.html'
+
+
+def sample_html(paragraphs=40):
+    """
+    Generates a synthetic news article page with the typical clutter of a news site (scripts, navigation, meta tags).
+    :param paragraphs: number of paragraphs in the article body
+    :return: the HTML as a string
+    """
+    paragraph = '<p>The parliament passed the budget on Friday after a long debate about the spending plans of the ' \
+                'government, which the opposition criticised as too ambitious for the coming years.</p>\n'
+    navigation = ''.join('<li><a href="/section/%i">Section %i</a></li>' % (i, i) for i in range(50))
+    return '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Parliament passes budget | Example News</title>
+<meta name="description" content="The parliament passed the budget on Friday.">
+<meta property="og:title" content="Parliament passes budget">
+<meta property="og:image" content="https://www.example.com/images/budget.jpg">
+<meta property="article:published_time" content="2019-05-17T14:30:00+02:00">
+<meta name="author" content="Jane Doe">
+<script type="application/ld+json">{"@context": "https://schema.org", "@type": "NewsArticle",
+"headline": "Parliament passes budget", "datePublished": "2019-05-17T14:30:00+02:00",
+"author": {"@type": "Person", "name": "Jane Doe"}}</script>
+<script>var tracking = {"id": 12345, "section": "politics"};</script>
+<style>body { font-family: sans-serif; }</style>
+</head>
+<body>
+<header><nav><ul>%s</ul></nav></header>
+<article>
+<h1>Parliament passes budget</h1>
+<p class="byline">By Jane Doe</p>
+<time datetime="2019-05-17T14:30:00+02:00">May 17, 2019</time>
+%s
+</article>
+<footer><p>Copyright Example News</p></footer>
+</body>
+</html>''' % (navigation, paragraph * paragraphs)
+
+
+def load_documents(paths):
+    """
+    Reads the given HTML files. If no paths are given, a single synthetic article is returned.
+    :param paths: list of paths to HTML files
+    :return: list of (html, url) tuples
+    """
+    if not paths:
+        return [(sample_html(), SAMPLE_URL)]
+
+    documents = []
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as html_file:
+            documents.append((html_file.read(), 'file://' + os.path.abspath(path)))
+    return documents
+
+
+def make_item(html, url):
+    """
+    Creates an ExtractionItem like NewsPlease.from_html does.
+    :param html:
+    :param url:
+    :return:
+    """
+    return ExtractionItem(html, url=url)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Checks the Cleaner against the previous implementation, which parsed every string with lxml and applied the
+whitespace rules one after another, and measures the time both take per document. The strings to clean are the
+fields that the extractors return for the given documents, plus random strings of markup, entities, whitespace and
+characters that lxml treats specially.
+
+python -m newsplease.benchmark.cleaning [repetitions] [html files...]
+"""
+import copy
+import random
+import sys
+import time
+
+from lxml import html
+
+from . import load_documents, make_item
+from ..pipeline.extractor import article_extractor
+from ..pipeline.extractor.cleaner import Cleaner
+from ..pipeline.extractor.parsed_document import ParsedDocument
+
+EXTRACTORS = ['newspaper_extractor', 'readability_extractor', 'date_extractor', 'lang_detect_extractor']
+
+# building blocks of the random strings
+ALPHABET = [' ', '  ', '\t', '\n', '\r', '\r\n', '\x0c', '\x0b', '\xa0', '\x00', '\x85', '﻿', ' ', 'a', 'B',
+            'ü', '字', '<b>', '</b>', '<p>', '<br/>', '<!-- x -->', '&amp;', '&nbsp;', '&', '<', '>']
+
+
+class ReferenceCleaner(Cleaner):
+    """The Cleaner as it was before the fast paths: every string is parsed, and the whitespace rules are applied one
+    after another."""
+
+    def delete_tags(self, arg):
+        if len(arg) > 0:
+            try:
+                raw = html.fromstring(arg)
+            except ValueError:
+                raw = html.fromstring(arg.encode("utf-8"))
+            return raw.text_content().strip()
+
+        return arg
+
+    def delete_whitespaces(self, arg):
+        return self.delete_whitespaces_stepwise(arg)
+
+
+def extract_candidates(documents):
+    """
+    Runs each extractor on the documents.
+    :param documents: list of (html, url) tuples
+    :return: list of lists, the uncleaned ArticleCandidates of each document
+    """
+    extractor = article_extractor.Extractor(EXTRACTORS)
+    candidates = []
+    for html_string, url in documents:
+        item = make_item(html_string, url)
+        item['parsed_document'] = ParsedDocument(html_string)
+        candidates.append([extractor.extract(item) for extractor in extractor.extractor_list])
+    return candidates
+
+
+def random_strings(count, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 16))) for _ in range(count)]
+
+
+def clean_string(cleaner, string):
+    try:
+        return cleaner.do_cleaning(string)
+    except Exception as error:
+        # whitespace-only strings make lxml raise, the Cleaner has to behave alike
+        return type(error).__name__
+
+
+def check_parity(candidates, strings):
+    """
+    Prints every candidate field and every string that the Cleaner cleans differently from the ReferenceCleaner.
+    :param candidates:
+    :param strings:
+    :return: number of differences
+    """
+    cleaner = Cleaner()
+    reference_cleaner = ReferenceCleaner()
+    differences = 0
+    for document_candidates in candidates:
+        expected = reference_cleaner.clean(copy.deepcopy(document_candidates))
+        cleaned = cleaner.clean(copy.deepcopy(document_candidates))
+        for expected_candidate, candidate in zip(expected, cleaned):
+            for field in ('title', 'description', 'text', 'topimage', 'author', 'publish_date'):
+                if getattr(expected_candidate, field) != getattr(candidate, field):
+                    differences += 1
+                    print('%s.%s: expected %r, got %r' % (candidate.extractor, field,
+                                                          getattr(expected_candidate, field),
+                                                          getattr(candidate, field)))
+    for string in strings:
+        expected = clean_string(reference_cleaner, string)
+        cleaned = clean_string(cleaner, string)
+        if expected != cleaned:
+            differences += 1
+            print('%r: expected %r, got %r' % (string, expected, cleaned))
+    return differences
+
+
+def measure(cleaner, candidates, repetitions):
+    """
+    :return: seconds per document
+    """
+    secs = 0.0
+    for _ in range(repetitions):
+        copies = copy.deepcopy(candidates)
+        start_time = time.time()
+        for document_candidates in copies:
+            cleaner.clean(document_candidates)
+        secs += time.time() - start_time
+    return secs / (len(candidates) * repetitions)
+
+
+def main(args):
+    repetitions = int(args[0]) if args else 20
+    candidates = extract_candidates(load_documents(args[1:]))
+    strings = random_strings(20000)
+
+    differences = check_parity(candidates, strings)
+    print('parity: %i differences in %i documents and %i random strings' % (differences, len(candidates),
+                                                                              len(strings)))
+
+    reference_secs = measure(ReferenceCleaner(), candidates, repetitions)
+    secs = measure(Cleaner(), candidates, repetitions)
+    print('documents = %i, repetitions = %i' % (len(candidates), repetitions))
+    print('microseconds per document, previous cleaner = %.1f' % (reference_secs * 1e6))
+    print('microseconds per document, cleaner = %.1f' % (secs * 1e6))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
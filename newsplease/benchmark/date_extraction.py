@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Checks the DateExtractor against the parity corpus and measures the time it takes per document. The corpus
+(date_corpus.json) covers every source of dates the extractor knows (JSON-LD, the supported <meta> tags, <time>,
+itemprop and class-based elements, the URL) and their precedence; the expected values were recorded with the
+original BeautifulSoup-based implementation.
+
+python -m newsplease.benchmark.date_extraction [repetitions] [html files...]
+"""
+import json
+import os
+import sys
+import time
+
+from . import load_documents, make_item
+from ..helper_classes import date_parser
+from ..pipeline.extractor.extractors.date_extractor import DateExtractor
+from ..pipeline.extractor.parsed_document import ParsedDocument
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'date_corpus.json')
+
+
+def load_corpus():
+    """
+    Reads the parity corpus.
+    :return: list of dicts with the keys name, url, html and expected
+    """
+    with open(CORPUS_PATH, encoding='utf-8') as corpus_file:
+        return json.load(corpus_file)
+
+
+def check_parity(extractor, corpus):
+    """
+    Runs the extractor on each case of the corpus and prints every case whose result differs from the expected one.
+    :param extractor:
+    :param corpus:
+    :return: number of differing cases
+    """
+    differences = 0
+    for case in corpus:
+        publish_date = date_parser.to_string(extractor.extract(make_item(case['html'], case['url'])).publish_date)
+        if publish_date != case['expected']:
+            differences += 1
+            print('%s: expected %r, got %r' % (case['name'], case['expected'], publish_date))
+    return differences
+
+
+def main(args):
+    repetitions = int(args[0]) if args else 100
+    extractor = DateExtractor()
+    corpus = load_corpus()
+
+    differences = check_parity(extractor, corpus)
+    print('parity: %i of %i cases differ' % (differences, len(corpus)))
+
+    # the documents are parsed upfront, so that only the date extraction is measured. Each repetition gets fresh
+    # documents, since their derived views (meta tags, JSON-LD) are cached
+    documents = [(case['html'], case['url']) for case in corpus] + load_documents(args[1:])
+    secs = 0.0
+    for _ in range(repetitions):
+        items = []
+        for html, url in documents:
+            item = make_item(html, url)
+            item['parsed_document'] = ParsedDocument(html)
+            items.append(item)
+
+        start_time = time.time()
+        for item in items:
+            extractor.extract(item)
+        secs += time.time() - start_time
+
+    print('documents = %i, repetitions = %i' % (len(documents), repetitions))
+    print('microseconds per document = %.1f' % (secs / (len(documents) * repetitions) * 1e6))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
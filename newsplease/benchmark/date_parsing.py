@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Measures the cost of parsing date strings per article. All date strings that are parsed while articles are extracted
+and converted to NewsArticle objects are recorded and then parsed again with dateutil, with the strict parsers of
+date_parser (cache cleared) and with the warm cache. It also checks that the strict parsers agree with dateutil on
+every recorded string and on a set of common formats.
+
+python -m newsplease.benchmark.date_parsing [html files...]
+"""
+import sys
+import time
+from unittest import mock
+
+from dateutil import parser
+
+from . import load_documents, make_item
+from .date_extraction import load_corpus
+from ..helper_classes import date_parser
+from ..pipeline.extractor import article_extractor
+from ..pipeline.pipelines import ExtractedInformationStorage
+
+EXTRACTORS = ['newspaper_extractor', 'readability_extractor', 'date_extractor', 'lang_detect_extractor']
+
+FORMATS = ['2019-05-17', '2019-05-17 14:30:00', '2019-05-17T14:30:00', '2019-05-17T14:30:00Z',
+           '2019-05-17T14:30:00.123Z', '2019-05-17T14:30:00.1234567+00:00', '2019-05-17T14:30:00+02:00',
+           '2019-05-17T14:30:00-0500', '2019-05-17T14:30+01:00', '2019-05-17 14:30:00 +0000',
+           'Fri, 17 May 2019 14:30:00 GMT', 'Fri, 17 May 2019 14:30:00 +0200', '17 May 2019 14:30 -0700',
+           'Fri, 17 May 2019 14:30:00 UTC', '2019-02-30T14:30:00Z']
+
+
+def record_date_strings(documents):
+    """
+    Extracts the documents and records every string passed to date_parser.
+    :param documents: list of (html, url) tuples
+    :return: list of lists, the date strings of each document
+    """
+    extractor = article_extractor.Extractor(EXTRACTORS)
+    strings = []
+    parse = date_parser.parse
+
+    def recording_parse(date_string):
+        strings[-1].append(date_string)
+        return parse(date_string)
+
+    with mock.patch.object(date_parser, 'parse', recording_parse):
+        for html, url in documents:
+            strings.append([])
+            item = make_item(html, url)
+            item['download_date'] = '2019-05-17T14:31:07Z'
+            item['modified_date'] = None
+            item = extractor.extract(item)
+            ExtractedInformationStorage.convert_to_class(ExtractedInformationStorage.extract_relevant_info(item))
+    return strings
+
+
+def dateutil_parse(date_string):
+    try:
+        return parser.parse(date_string)
+    except (ValueError, OverflowError):
+        return None
+
+
+def new_parse(date_string):
+    try:
+        return date_parser.parse(date_string)
+    except ValueError:
+        return None
+
+
+def check(date_strings):
+    """
+    Prints every string for which date_parser and dateutil disagree, i.e., return dates that are not equal or have
+    different UTC offsets.
+    :param date_strings:
+    :return: number of disagreements
+    """
+    differences = 0
+    for date_string in sorted(set(date_strings)):
+        expected = dateutil_parse(date_string)
+        date = new_parse(date_string)
+        if expected != date or (expected is not None and expected.utcoffset() != date.utcoffset()):
+            differences += 1
+            print('%r: dateutil %r, date_parser %r' % (date_string, expected, date))
+    return differences
+
+
+def measure(function, date_strings):
+    start_time = time.time()
+    for date_string in date_strings:
+        function(date_string)
+    return time.time() - start_time
+
+
+def main(paths):
+    documents = load_documents(paths) + [(case['html'], case['url']) for case in load_corpus()]
+    strings_per_document = record_date_strings(documents)
+    date_strings = [date_string for strings in strings_per_document for date_string in strings
+                    if isinstance(date_string, str)]
+
+    differences = check(date_strings + FORMATS)
+    print('agreement with dateutil: %i of %i distinct strings differ' % (differences,
+                                                                         len(set(date_strings + FORMATS))))
+
+    date_parser._parse_cached.cache_clear()
+    cold_secs = measure(new_parse, date_strings)
+    warm_secs = measure(new_parse, date_strings)
+    dateutil_secs = measure(dateutil_parse, date_strings)
+
+    print('documents = %i, date strings per document = %.2f' % (len(documents), len(date_strings) / len(documents)))
+    print('microseconds per document, dateutil = %.1f' % (dateutil_secs / len(documents) * 1e6))
+    print('microseconds per document, date_parser (cold cache) = %.1f' % (cold_secs / len(documents) * 1e6))
+    print('microseconds per document, date_parser (warm cache) = %.1f' % (warm_secs / len(documents) * 1e6))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
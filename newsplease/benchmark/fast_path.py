@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Compares the extraction with and without the structured metadata fast path, i.e., with the StructuredDataExtractor
+in front of the default extractors. Reports how many documents were served by the fast path, how often each field was
+settled, the time per document of both runs and the fields in which their results differ.
+
+Both extractors first make an untimed pass over the documents, which loads their resources and fills the caches of the
+libraries they use, and whose results are compared. The timed passes then alternate between both extractors, so that
+neither profits from running later, and the fastest pass of each is reported.
+
+python -m newsplease.benchmark.fast_path [html files...]
+"""
+import sys
+import time
+
+from . import load_documents, make_item
+from ..pipeline.extractor import article_extractor
+
+EXTRACTORS = ['newspaper_extractor', 'readability_extractor', 'date_extractor', 'lang_detect_extractor']
+FIELDS = ['article_title', 'article_description', 'article_text', 'article_image', 'article_author',
+          'article_publish_date', 'article_language']
+REPETITIONS = 5
+
+
+def run(extractor, documents):
+    results = []
+    start_time = time.perf_counter()
+    for html, url in documents:
+        results.append(extractor.extract(make_item(html, url)))
+    return results, (time.perf_counter() - start_time) / len(documents)
+
+
+def main(paths, repetitions=REPETITIONS):
+    documents = load_documents(paths)
+    default_extractor = article_extractor.Extractor(EXTRACTORS)
+    fast_path_extractor = article_extractor.Extractor(['structured_data_extractor'] + EXTRACTORS)
+
+    # warm-up passes
+    default_results, _ = run(default_extractor, documents)
+    fast_path_results, _ = run(fast_path_extractor, documents)
+    fast_path_documents = fast_path_extractor.fast_path_documents
+    settled_field_documents = dict(fast_path_extractor.settled_field_documents)
+
+    default_secs = []
+    fast_path_secs = []
+    for _ in range(repetitions):
+        default_secs.append(run(default_extractor, documents)[1])
+        fast_path_secs.append(run(fast_path_extractor, documents)[1])
+
+    for (html, url), default_item, fast_path_item in zip(documents, default_results, fast_path_results):
+        for field in FIELDS:
+            if default_item[field] != fast_path_item[field]:
+                print('%s: %s differs: %r / %r' % (url, field, default_item[field], fast_path_item[field]))
+
+    print('documents = %i' % len(documents))
+    print('served by fast path = %i' % fast_path_documents)
+    print('settled fields: %s' % (', '.join('%s = %i' % (field, count)
+                                            for field, count in sorted(settled_field_documents.items())) or '-'))
+    print('seconds per document, default = %.4f' % min(default_secs))
+    print('seconds per document, fast path = %.4f (%.2fx faster)' % (min(fast_path_secs),
+                                                                    min(default_secs) / min(fast_path_secs)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Measures the cost of filtering URLs by large lists of hosts, as done by the CommonCrawl extractor for each record. The
+former filter scanned each URL for each host of the list, the HostIndex parses the hostname once and looks up its
+parent domains in a hash set. Both run on synthetic host lists and URLs, of which a part belongs to the listed hosts,
+a part to their subdomains, and a part to other hosts that mention a listed host in their query string or share a
+prefix with it. The scan is measured on a sample of the URLs only, since it is too slow for all of them.
+
+python -m newsplease.benchmark.host_filter [number of hosts] [number of urls]
+"""
+import random
+import sys
+import time
+
+from ..helper_classes.host_index import HostIndex, EXACT, SUBDOMAIN, REGISTERED_DOMAIN
+
+SUFFIXES = ['com', 'org', 'net', 'de', 'fr', 'co.uk', 'com.au', 'co.jp', 'com.br', 'es', 'it', 'cl']
+SCAN_SAMPLE = 200
+
+
+def make_hosts(number_of_hosts, seed=1):
+    random.seed(seed)
+    return ['%snews%i.%s' % (random.choice(['', 'www.']), index, random.choice(SUFFIXES))
+            for index in range(number_of_hosts)]
+
+
+def make_urls(hosts, number_of_urls, seed=2):
+    """
+    :return: list of URLs: a quarter on the listed hosts, a quarter on their subdomains, a quarter on unlisted hosts
+        that mention a listed host in the query, and a quarter on unlisted hosts whose name contains a listed host
+    """
+    random.seed(seed)
+    urls = []
+    for index in range(number_of_urls):
+        host = random.choice(hosts).replace('www.', '')
+        kind = index % 4
+        if kind == 0:
+            url = 'https://%s/politics/2019/05/17/story-%i.html' % (host, index)
+        elif kind == 1:
+            url = 'https://sport.%s/football/story-%i.html' % (host, index)
+        elif kind == 2:
+            url = 'https://share.example/redirect?url=%s/story-%i.html' % (host, index)
+        else:
+            url = 'https://my%s/story-%i.html' % (host, index)
+        urls.append(url)
+    return urls
+
+
+def substring_scan(url, valid_hosts):
+    # the former filter of CommonCrawlExtractor.filter_record
+    for valid_host in valid_hosts:
+        if valid_host in url:
+            return True
+    return False
+
+
+def main(args):
+    if args and args[0] in ('-h', '--help'):
+        print(__doc__.strip())
+        return
+    number_of_hosts = int(args[0]) if args else 100000
+    number_of_urls = int(args[1]) if len(args) > 1 else 100000
+    hosts = make_hosts(number_of_hosts)
+    urls = make_urls(hosts, number_of_urls)
+    print('hosts = %i, urls = %i' % (number_of_hosts, number_of_urls))
+
+    sample = urls[:SCAN_SAMPLE]
+    start_time = time.time()
+    scan_passed = sum(substring_scan(url, hosts) for url in sample)
+    scan_secs = (time.time() - start_time) / len(sample)
+    print('substring scan: %.1f microseconds per url, passed = %i of %i sampled urls' % (
+        scan_secs * 1e6, scan_passed, len(sample)))
+
+    for match in (EXACT, SUBDOMAIN, REGISTERED_DOMAIN):
+        start_time = time.time()
+        host_index = HostIndex(hosts, match=match)
+        build_secs = time.time() - start_time
+        start_time = time.time()
+        passed = sum(host_index.matches(url) for url in urls)
+        lookup_secs = (time.time() - start_time) / len(urls)
+        sample_passed = sum(host_index.matches(url) for url in sample)
+        print('host index (%s): built in %.2f s, %.2f microseconds per url (%.0fx faster), passed = %i of %i urls, '
+              '%i of %i sampled urls' % (match, build_secs, lookup_secs * 1e6, scan_secs / lookup_secs, passed,
+                                         len(urls), sample_passed, len(sample)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Compares the language identification backends with the previous path of the LangExtractor, i.e., unseeded
+langdetect on the full text. Reports the accuracy on the language corpus (language_corpus.json, short news sentences
+in 18 languages), the agreement with langdetect and the time per document on the visible text of the given pages.
+
+python -m newsplease.benchmark.language_identification [repetitions] [html files...]
+"""
+import json
+import os
+import sys
+import time
+
+from langdetect import detect
+from langdetect.lang_detect_exception import LangDetectException
+
+from . import load_documents
+from ..pipeline.extractor.language_identifier import IDENTIFIERS
+from ..pipeline.extractor.parsed_document import ParsedDocument
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'language_corpus.json')
+
+
+def load_corpus():
+    """
+    Reads the language corpus.
+    :return: list of dicts with the keys language and text
+    """
+    with open(CORPUS_PATH, encoding='utf-8') as corpus_file:
+        return json.load(corpus_file)
+
+
+def langdetect_detect(text):
+    try:
+        return detect(text)
+    except LangDetectException:
+        return None
+
+
+def measure(function, texts, repetitions):
+    """
+    Identifies the language of each text repeatedly.
+    :return: list of the detected languages, seconds per text
+    """
+    start_time = time.time()
+    for _ in range(repetitions):
+        languages = [function(text) for text in texts]
+    return languages, (time.time() - start_time) / (len(texts) * repetitions)
+
+
+def main(args):
+    repetitions = int(args[0]) if args else 10
+    corpus = load_corpus()
+    corpus_texts = [case['text'] for case in corpus]
+    texts = [ParsedDocument(html).text for html, _ in load_documents(args[1:])]
+
+    functions = [('langdetect (previous)', langdetect_detect)]
+    for name, identifier in sorted(IDENTIFIERS.items()):
+        start_time = time.time()
+        instance = identifier.get_instance()
+        print('%s: initialized in %.2f seconds' % (name, time.time() - start_time))
+        functions.append((name, instance.detect))
+
+    reference = None
+    for name, function in functions:
+        languages, _ = measure(function, corpus_texts, 1)
+        correct = sum(1 for case, language in zip(corpus, languages) if language == case['language'])
+        wrong = ['%s->%s' % (case['language'], language) for case, language in zip(corpus, languages)
+                 if language != case['language']]
+
+        document_languages, secs = measure(function, texts, repetitions)
+        deterministic = measure(function, corpus_texts, 1)[0] == languages
+        if reference is None:
+            reference = document_languages
+        agreement = sum(1 for a, b in zip(reference, document_languages) if a == b)
+
+        print('%s: accuracy %i of %i %s, deterministic %s, agreement with langdetect on documents %i of %i, '
+              'milliseconds per document %.2f' % (name, correct, len(corpus), wrong, deterministic, agreement,
+                                                 len(texts), secs * 1e3))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
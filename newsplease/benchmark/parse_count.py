@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Counts how often each HTML document is parsed while it runs through the article extractor, and how long the
+extraction takes. Since all extractors share one ParsedDocument, every document should be parsed exactly once;
+extractors that modify the DOM receive copies of the tree, which are reported separately.
+
+python -m newsplease.benchmark.parse_count [html files...]
+"""
+import sys
+import time
+from unittest import mock
+
+import lxml.html
+import readability.readability
+
+from . import load_documents, make_item
+from ..pipeline.extractor import article_extractor
+from ..pipeline.extractor.parsed_document import ParsedDocument
+
+EXTRACTORS = ['newspaper_extractor', 'readability_extractor', 'date_extractor', 'lang_detect_extractor']
+
+
+class ParseCounter(object):
+    """
+    Wraps the HTML parsing functions used by news-please and its extractors and counts the calls that parse the
+    document's body. Parses of other strings, e.g., of extracted fields by the Cleaner, are not counted.
+    """
+
+    def __init__(self):
+        self.bodies = ()
+        self.parses = 0
+        self.copies = 0
+
+    def reset(self, body):
+        self.bodies = (body, body.encode('utf-8'))
+        self.parses = 0
+        self.copies = 0
+
+    def wrap_parse(self, function):
+        def wrapper(html, *args, **kwargs):
+            if html in self.bodies:
+                self.parses += 1
+            return function(html, *args, **kwargs)
+
+        return wrapper
+
+    def wrap_copy(self, function):
+        def wrapper(*args, **kwargs):
+            self.copies += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+
+def main(paths):
+    documents = load_documents(paths)
+    counter = ParseCounter()
+
+    with mock.patch.object(lxml.html, 'fromstring', counter.wrap_parse(lxml.html.fromstring)), \
+            mock.patch.object(readability.readability, 'build_doc', counter.wrap_parse(readability.readability.build_doc)), \
+            mock.patch.object(ParsedDocument, 'copy_tree', counter.wrap_copy(ParsedDocument.copy_tree)):
+        extractor = article_extractor.Extractor(EXTRACTORS)
+
+        total_parses = 0
+        total_copies = 0
+        total_secs = 0.0
+        for html, url in documents:
+            counter.reset(html)
+            start_time = time.time()
+            extractor.extract(make_item(html, url))
+            total_secs += time.time() - start_time
+            total_parses += counter.parses
+            total_copies += counter.copies
+            print('%s: %i parse(s), %i tree copy(ies)' % (url, counter.parses, counter.copies))
+
+    print('documents = %i' % len(documents))
+    print('parses per document = %.2f' % (total_parses / len(documents)))
+    print('tree copies per document = %.2f' % (total_copies / len(documents)))
+    print('seconds per document = %.4f' % (total_secs / len(documents)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
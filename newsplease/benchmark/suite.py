@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+"""
+Benchmark suite of the article extractor. Runs the extractor on a versioned corpus of offline HTML pages with gold
+values of title, publishing date, authors, main text and language (extraction_corpus.json), and reports
+
+- the throughput (documents per second) and the latency per document (p50, p99, mean),
+- the latency of each stage: parsing, each extractor, the cleaner and the comparer,
+- the peak resident memory of the process,
+- the time and memory that importing newsplease takes in a fresh interpreter, and which heavy modules it loads,
+- the accuracy of each field, for the final article and for the candidates of each extractor.
+
+The results are written as JSON, together with the versions and the configuration of the run, so that runs of
+different versions and configurations can be compared:
+
+news-please-benchmark -o before.json
+news-please-benchmark -o after.json -s
+news-please-benchmark before.json after.json
+
+The accuracy of a field is the share of documents whose value matches the gold value: titles and languages are
+compared after normalizing whitespace, dates to the second, authors as case-insensitive sets. For the main text, the
+token F1 score against the gold text is averaged instead.
+"""
+import collections
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from unittest import mock
+
+import plac
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+from . import make_item
+from ..helper_classes import date_parser
+from ..helper_classes.extraction_cache import NEWSPLEASE_VERSION
+from ..pipeline.extractor import article_extractor
+from ..pipeline.extractor.parsed_document import ParsedDocument
+
+# version of the format of the results, increased whenever keys are renamed or change their meaning
+SUITE_VERSION = 1
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'extraction_corpus.json')
+EXTRACTORS = ['newspaper_extractor', 'readability_extractor', 'date_extractor', 'lang_detect_extractor']
+
+# modules that extracting articles does not need, importing newsplease should not load them
+HEAVY_MODULES = ('scrapy', 'twisted', 'pymysql', 'psycopg2', 'elasticsearch', 'numpy', 'pandas', 'requests', 'bs4',
+                 'newspaper', 'readability', 'langdetect')
+# run in a fresh interpreter, prints the import time, the peak memory and the loaded heavy modules as JSON
+IMPORT_SCRIPT = '''
+import json, sys, time
+start_time = time.perf_counter()
+import newsplease
+seconds = time.perf_counter() - start_time
+peak = None
+try:
+    # on Linux, ru_maxrss includes the memory of the benchmark process from which this interpreter was forked
+    with open('/proc/self/status') as status:
+        peak = [int(line.split()[1]) / 1024.0 for line in status if line.startswith('VmHWM:')][0]
+except (IOError, IndexError):
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+    except ImportError:
+        pass
+print(json.dumps({'seconds': seconds, 'peak_rss_mb': peak, 'modules': len(sys.modules),
+                  'heavy_modules': [name for name in %r if name in sys.modules]}))
+''' % (HEAVY_MODULES,)
+
+# gold fields of the corpus, mapped to the fields of the item and of ArticleCandidate
+GOLD_FIELDS = {
+    'title': ('article_title', 'title'),
+    'date_publish': ('article_publish_date', 'publish_date'),
+    'authors': ('article_author', 'author'),
+    'maintext': ('article_text', 'text'),
+    'language': ('article_language', 'language'),
+}
+
+# to improve performance, regex statements are compiled only once per module
+re_whitespaces = re.compile(r'\s+')
+re_token = re.compile(r'\w+')
+
+
+def load_corpus(path=None):
+    """
+    :param path: path of a corpus in the format of extraction_corpus.json, defaults to the shipped corpus
+    :return: dict with the version and the documents of the corpus
+    """
+    with open(path or CORPUS_PATH, encoding='utf-8') as corpus_file:
+        return json.load(corpus_file)
+
+
+def percentile(values, share):
+    """
+    :param values: list of numbers
+    :param share: e.g., 0.99 for the 99th percentile
+    :return: The value of the nearest rank, None if there are no values
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(share * len(values) + 0.5)) - 1))]
+
+
+def latency_summary(seconds):
+    """
+    :param seconds: list of durations
+    :return: dict of p50, p99 and mean in milliseconds
+    """
+    return {
+        'p50_ms': percentile(seconds, 0.5) * 1e3,
+        'p99_ms': percentile(seconds, 0.99) * 1e3,
+        'mean_ms': sum(seconds) / len(seconds) * 1e3,
+    }
+
+
+def peak_rss_mb():
+    """
+    :return: The peak resident memory of the process in megabytes, None if it cannot be determined
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def token_f1(text, gold):
+    """
+    :return: The F1 score of the tokens of a text against the tokens of the gold text
+    """
+    tokens = collections.Counter(re_token.findall(text.lower()))
+    gold_tokens = collections.Counter(re_token.findall(gold.lower()))
+    overlap = sum((tokens & gold_tokens).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(tokens.values())
+    recall = overlap / sum(gold_tokens.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def score(field, value, gold):
+    """
+    Compares an extracted value with the gold value of a field.
+    :param field: A gold field, see GOLD_FIELDS
+    :param value: The extracted value
+    :param gold: The gold value
+    :return: A number between 0 and 1
+    """
+    if field == 'maintext':
+        if not value or not gold:
+            return float(not value and not gold)
+        return token_f1(value, gold)
+    if field == 'authors':
+        return float({author.strip().lower() for author in value or []} ==
+                     {author.strip().lower() for author in gold or []})
+    if field == 'date_publish':
+        return float(date_parser.to_string(date_parser.normalize(value) if value else None) == gold)
+    if field == 'title':
+        value = re_whitespaces.sub(' ', value).strip() if value else None
+        gold = re_whitespaces.sub(' ', gold).strip() if gold else None
+    return float(value == gold)
+
+
+class StageTimer(object):
+    """
+    Measures the time that each stage of the extraction of a document takes, by wrapping the functions of the stages.
+    """
+
+    def __init__(self):
+        # seconds of each stage of the current document
+        self.current = collections.defaultdict(float)
+        # per stage, the seconds of each document
+        self.stages = collections.defaultdict(list)
+        # return values of the wrapped functions of the current document, by stage
+        self.results = {}
+
+    def wrap(self, stage, function):
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.current[stage] += time.perf_counter() - start_time
+            self.results[stage] = result
+            return result
+
+        return wrapper
+
+    def instrument(self, extractor):
+        """
+        Wraps the extractors, the cleaner and the comparer of an Extractor, which must not be shared.
+        :param extractor: An article_extractor.Extractor
+        """
+        for sub_extractor in extractor.extractor_list:
+            sub_extractor.extract = self.wrap('extractor:' + sub_extractor.name, sub_extractor.extract)
+        extractor.cleaner.clean = self.wrap('cleaner', extractor.cleaner.clean)
+        extractor.comparer.compare = self.wrap('comparer', extractor.comparer.compare)
+
+    def start(self):
+        self.current.clear()
+        self.results = {}
+
+    def stop(self, record=True):
+        if record:
+            for stage, seconds in self.current.items():
+                self.stages[stage].append(seconds)
+
+
+def measure_import(repetitions=5, slowest=10):
+    """
+    Measures importing newsplease in fresh interpreters, which are started from the directory that contains the
+    package that is benchmarked.
+    :param repetitions: number of interpreters
+    :param slowest: number of modules reported from python -X importtime
+    :return: dict with the latency, the peak memory and the number of modules after the import, the heavy modules
+        that were loaded and the cumulative import time of the slowest modules
+    """
+    directory = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    runs = [json.loads(subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT], cwd=directory))
+            for _ in range(repetitions)]
+
+    # lines like "import time:       self [us] | cumulative | imported package"
+    importtime = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import newsplease'], cwd=directory,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True).stderr
+    modules = []
+    for line in importtime.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            modules.append((int(parts[1]) / 1e3, parts[2].strip()))
+
+    result = latency_summary([run['seconds'] for run in runs])
+    result.update({
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs) if runs[0]['peak_rss_mb'] is not None else None,
+        'modules': runs[0]['modules'],
+        'heavy_modules': runs[0]['heavy_modules'],
+        'slowest_modules_ms': {name: milliseconds for milliseconds, name in sorted(modules, reverse=True)[:slowest]},
+    })
+    return result
+
+
+def run(extractor_list=None, fields=None, repetitions=3, corpus_path=None, measure_import_time=True, slim_html=False,
+        max_html_bytes=None):
+    """
+    Runs the benchmark.
+    :param extractor_list: The extractors, defaults to the extractors of NewsPlease.extractor
+    :param fields: list of NewsArticle fields to extract, None for all fields
+    :param repetitions: number of timed passes over the corpus, after one untimed pass that also measures the accuracy
+    :param corpus_path: see load_corpus
+    :param measure_import_time: if True, importing newsplease is measured as well, see measure_import
+    :param slim_html: if True, the payloads of the pages are removed before they are parsed, see NewsPlease.extractor
+    :param max_html_bytes: if set, larger pages are cut to this size before they are parsed
+    :return: dict of the results, see the module documentation
+    """
+    extractor_list = list(extractor_list or EXTRACTORS)
+    corpus = load_corpus(corpus_path)
+    documents = corpus['documents']
+
+    start_time = time.perf_counter()
+    # a new Extractor rather than the shared instance, since its stages are instrumented
+    extractor = article_extractor.Extractor(extractor_list, slim_html=slim_html, max_html_bytes=max_html_bytes)
+    initialization_seconds = time.perf_counter() - start_time
+
+    timer = StageTimer()
+    timer.instrument(extractor)
+    totals = []
+    document_results = []
+    article_scores = collections.defaultdict(list)
+    extractor_scores = collections.defaultdict(lambda: collections.defaultdict(list))
+    gold_fields = [field for field in GOLD_FIELDS if fields is None or field in fields]
+
+    with mock.patch.object(article_extractor, 'ParsedDocument', timer.wrap('parse', ParsedDocument)):
+        for repetition in range(repetitions + 1):
+            timed = repetition > 0
+            for document in documents:
+                item = make_item(document['html'], document['url'])
+                timer.start()
+                start_time = time.perf_counter()
+                item = extractor.extract(item, fields)
+                seconds = time.perf_counter() - start_time
+                timer.stop(record=timed)
+                if timed:
+                    totals.append(seconds)
+                    continue
+
+                # the first pass measures the accuracy
+                gold = document['gold']
+                document_result = {'name': document['name']}
+                for field in gold_fields:
+                    item_field, candidate_field = GOLD_FIELDS[field]
+                    document_result[field] = score(field, item[item_field], gold[field])
+                    article_scores[field].append(document_result[field])
+                    for candidate in timer.results.get('cleaner') or []:
+                        value = getattr(candidate, candidate_field)
+                        if value is not None:
+                            # the readability extractor sets its name method rather than the name
+                            name = candidate.extractor() if callable(candidate.extractor) else candidate.extractor
+                            extractor_scores[name][field].append(score(field, value, gold[field]))
+                document_results.append(document_result)
+
+    stages = {}
+    for stage, seconds in sorted(timer.stages.items()):
+        stages[stage] = latency_summary(seconds)
+        stages[stage]['share'] = sum(seconds) / sum(totals)
+
+    return {
+        'suite_version': SUITE_VERSION,
+        'corpus': {'path': os.path.abspath(corpus_path or CORPUS_PATH), 'version': corpus['version'],
+                   'documents': len(documents)},
+        'environment': {'news-please': NEWSPLEASE_VERSION, 'python': platform.python_version(),
+                        'platform': platform.platform()},
+        'configuration': {'extractors': extractor_list, 'fields': fields, 'repetitions': repetitions,
+                          'slim_html': slim_html, 'max_html_bytes': max_html_bytes},
+        'import': measure_import() if measure_import_time else None,
+        'initialization_seconds': initialization_seconds,
+        'throughput': dict(latency_summary(totals), documents_per_second=len(totals) / sum(totals)),
+        'stages': stages,
+        'peak_rss_mb': peak_rss_mb(),
+        'html_slimmer': {'bytes_in': extractor.html_slimmer.size_in, 'bytes_out': extractor.html_slimmer.size_out,
+                         'truncated_documents': extractor.html_slimmer.truncated}
+        if extractor.html_slimmer is not None else None,
+        'accuracy': {
+            'article': {field: sum(scores) / len(scores) for field, scores in article_scores.items()},
+            # the share of the documents for which an extractor gave a value, and the accuracy of these values
+            'extractors': {name: {field: {'coverage': len(scores) / len(documents),
+                                          'accuracy': sum(scores) / len(scores)}
+                                  for field, scores in sorted(field_scores.items())}
+                           for name, field_scores in sorted(extractor_scores.items())},
+        },
+        'documents': document_results,
+    }
+
+
+def flatten(results, prefix=''):
+    """
+    :return: dict of the measured numbers in the results, keyed by their path, e.g., 'throughput.p50_ms'. The
+        results of the single documents and the description of the run are left out.
+    """
+    values = {}
+    for key, value in results.items():
+        if not prefix and key in ('documents', 'suite_version', 'corpus', 'configuration'):
+            continue
+        path = prefix + str(key)
+        if isinstance(value, dict):
+            values.update(flatten(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def compare(path_a, path_b):
+    """
+    Prints the numbers of two result files side by side, with the relative change.
+    :return: list of the printed lines
+    """
+    results = []
+    for path in (path_a, path_b):
+        with open(path, encoding='utf-8') as results_file:
+            results.append(json.load(results_file))
+    for key in ('suite_version', 'corpus', 'configuration'):
+        if results[0].get(key) != results[1].get(key):
+            print('note: %s differs: %s / %s' % (key, json.dumps(results[0].get(key)), json.dumps(results[1].get(key))))
+
+    values_a, values_b = flatten(results[0]), flatten(results[1])
+    lines = []
+    for key in sorted(set(values_a) | set(values_b)):
+        value_a, value_b = values_a.get(key), values_b.get(key)
+        change = ''
+        if value_a and value_b is not None:
+            change = '%+.1f %%' % (100.0 * (value_b - value_a) / value_a)
+        lines.append('%-60s %12s %12s %10s' % (key, '-' if value_a is None else '%.4g' % value_a,
+                                               '-' if value_b is None else '%.4g' % value_b, change))
+    for line in lines:
+        print(line)
+    return lines
+
+
+@plac.annotations(
+    results=plac.Annotation('two result files to compare instead of running the benchmark', 'positional'),
+    output=plac.Annotation('write the results as JSON to this file instead of stdout', 'option', 'o'),
+    corpus=plac.Annotation('path of a corpus in the format of extraction_corpus.json', 'option', 'c'),
+    extractors=plac.Annotation('comma-separated list of extractors', 'option', 'e'),
+    fields=plac.Annotation('comma-separated list of NewsArticle fields to extract, e.g., title,date_publish',
+                           'option', 'f'),
+    repetitions=plac.Annotation('number of timed passes over the corpus', 'option', 'r', int),
+    structured_data=plac.Annotation('read the structured metadata first, see NewsPlease.extractor', 'flag', 's'),
+    no_import=plac.Annotation('do not measure the time it takes to import newsplease', 'flag', 'n'),
+    slim_html=plac.Annotation('remove scripts, styles and other payloads before parsing, see NewsPlease.extractor',
+                              'flag', 'm'),
+    max_html_bytes=plac.Annotation('cut larger pages to this size before parsing', 'option', 'b', int),
+)
+def cli(output=None, corpus=None, extractors=None, fields=None, repetitions=3, structured_data=False, no_import=False,
+        slim_html=False, max_html_bytes=None, *results):
+    "Benchmarks the article extractor on a corpus of HTML pages with gold values, or compares two result files."
+    if results:
+        if len(results) != 2:
+            sys.exit('two result files are needed for a comparison')
+        compare(*results)
+        return
+
+    extractor_list = extractors.split(',') if extractors else list(EXTRACTORS)
+    if structured_data and 'structured_data_extractor' not in extractor_list:
+        extractor_list = ['structured_data_extractor'] + extractor_list
+    results = run(extractor_list, fields.split(',') if fields else None, repetitions, corpus, not no_import,
+                  slim_html, max_html_bytes)
+    if output:
+        with open(output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(results, indent=2, sort_keys=True))
+
+
+def main():
+    plac.call(cli)
+
+
+if __name__ == '__main__':
+    main()
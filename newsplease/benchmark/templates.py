@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Compares the extraction with and without learned templates on the pages of a synthetic site, whose articles share the
+layout of the synthetic article but differ in their titles and texts. Halfway through, the site changes the layout of
+the article, so that the text template fails and has to be learned again. Reports the time per page of both runs,
+how often the templates were used and the fields in which the results differ.
+
+python -m newsplease.benchmark.templates [pages]
+"""
+import random
+import sys
+import time
+
+from . import make_item, sample_html
+from ..helper_classes.domain_priors import DomainPriors
+from ..pipeline.extractor import article_extractor
+from ..pipeline.extractor.comparer.comparer_text import ComparerText
+
+EXTRACTORS = ['newspaper_extractor', 'readability_extractor', 'date_extractor', 'lang_detect_extractor']
+FIELDS = ['article_title', 'article_description', 'article_text', 'article_image', 'article_author',
+          'article_publish_date', 'article_language']
+DOMAIN = 'www.example.com'
+
+STOPWORDS = ('the of and to in a is that for it as was with be by on not he this are or his from at which but have '
+             'an they you were her she there been one all we their has would when if so no will can more who about '
+             'some them into only its then could other than these two may after first also new any').split()
+
+
+def make_pages(count, seed=0):
+    """
+    Generates the pages of a site. Each page has its own title and text, the pages of the second half put the
+    article into a <main> element instead of an <article> element.
+    :return: list of (html, url) tuples
+    """
+    rng = random.Random(seed)
+    template = sample_html(1)
+    paragraph = template[template.index('<p>The parliament'):template.index('</p>', template.index('<p>The parl')) + 5]
+    pages = []
+    for index in range(count):
+        words = ['w%i' % rng.randint(0, 20000) if rng.random() < 0.5 else rng.choice(STOPWORDS)
+                 for _ in range(rng.randint(300, 800))]
+        body = ''.join('<p>%s.</p>\n' % ' '.join(words[start:start + 40]) for start in range(0, len(words), 40))
+        html = template.replace(paragraph, body).replace('Parliament passes budget', 'Story %i of the day' % index)
+        if index >= count // 2:
+            html = html.replace('<article>', '<main>').replace('</article>', '</main>')
+        pages.append((html, 'https://%s/politics/story-%i.html' % (DOMAIN, index)))
+    return pages
+
+
+def run(extractor, pages, domain_priors=None):
+    results = []
+    start_time = time.time()
+    for html, url in pages:
+        item = make_item(html, url)
+        item['source_domain'] = DOMAIN.encode()
+        item['domain_priors'] = domain_priors
+        results.append(extractor.extract(item))
+    return results, (time.time() - start_time) / len(pages)
+
+
+def main(args):
+    pages = make_pages(int(args[0]) if args else 200)
+    default_results, default_secs = run(article_extractor.Extractor(EXTRACTORS), pages)
+    domain_priors = DomainPriors()
+    template_results, template_secs = run(article_extractor.Extractor(['template_extractor'] + EXTRACTORS), pages,
+                                          domain_priors)
+
+    comparer = ComparerText()
+    differences = dict((field, 0) for field in FIELDS)
+    text_scores = []
+    for default_item, template_item in zip(default_results, template_results):
+        for field in FIELDS:
+            if default_item[field] != template_item[field]:
+                differences[field] += 1
+        if default_item['article_text'] and template_item['article_text']:
+            text_scores.append(comparer.score(set(default_item['article_text'].split()),
+                                              set(template_item['article_text'].split())))
+
+    print('pages = %i' % len(pages))
+    print('templates: %s' % domain_priors.report())
+    print('pages with different values: %s' % ', '.join('%s = %i' % item for item in sorted(differences.items())))
+    if text_scores:
+        print('agreement of the texts (ComparerText.score): min = %.3f, mean = %.3f' %
+              (min(text_scores), sum(text_scores) / len(text_scores)))
+    print('milliseconds per page, default = %.2f' % (default_secs * 1e3))
+    print('milliseconds per page, templates = %.2f' % (template_secs * 1e3))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
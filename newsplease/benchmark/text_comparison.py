@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Measures the ComparerText on ensembles of 2 to 8 extractors and long texts, and checks that it picks the same text as
+the previous implementation, which split every text again for each pair of extractors. The candidate texts are
+variants of the text of the given pages (or of the synthetic article): each extractor drops and adds some sentences,
+like real extractors do with teasers, captions and comments.
+
+python -m newsplease.benchmark.text_comparison [repetitions] [html files...]
+"""
+import itertools
+import random
+import sys
+import time
+
+from . import load_documents
+from ..pipeline.extractor.article_candidate import ArticleCandidate
+from ..pipeline.extractor.comparer.comparer_text import ComparerText
+from ..pipeline.extractor.parsed_document import ParsedDocument
+
+ENSEMBLE_SIZES = [2, 4, 8]
+
+
+class ReferenceComparerText(ComparerText):
+    """The ComparerText as it was before texts were tokenized once: each pair of texts is split into sets again."""
+
+    def extract(self, item, article_candidate_list):
+        list_text = [(candidate.text, candidate.extractor) for candidate in article_candidate_list
+                     if candidate.text is not None and len(candidate.text.split()) >= self.min_number_words]
+        if len(list_text) == 0:
+            return None
+        if len(list_text) < 2:
+            return list_text[0][0]
+
+        list_score = []
+        for a, b, in itertools.combinations(list_text, 2):
+            set_a = set(a[0].split())
+            set_b = set(b[0].split())
+            intersection_a_b = set_a & set_b
+            score = 1 - ((len(set_a ^ set_b)) / (2 * len(intersection_a_b)))
+            list_score.append((score, a[1], b[1]))
+        best_score = max(list_score, key=lambda item: item[0])
+
+        if "newspaper" in best_score:
+            return (list(filter(lambda x: x[1] == "newspaper", list_text))[0][0])
+        top_candidates = [text_tuple for text_tuple in list_text
+                          if text_tuple[1] == best_score[1] or text_tuple[1] == best_score[2]]
+        if len(top_candidates[0][0]) > len(top_candidates[1][0]):
+            return top_candidates[0][0]
+        return top_candidates[1][0]
+
+
+def make_ensembles(text, size, count, rng):
+    """
+    Creates ensembles of candidate texts from a text.
+    :return: list of lists of ArticleCandidates
+    """
+    paragraphs = [paragraph for paragraph in text.replace('\n', '. ').split('. ') if paragraph.strip()]
+    # long articles, the texts of the sample pages are repeated with numbered words
+    while len(' '.join(paragraphs).split()) < 2000:
+        paragraphs += ['%s %i' % (paragraph, len(paragraphs)) for paragraph in paragraphs]
+    ensembles = []
+    for _ in range(count):
+        ensemble = []
+        for index in range(size):
+            kept = [paragraph for paragraph in paragraphs if rng.random() > 0.1 * (index + 1) / size]
+            kept += ['noise %i %i %s' % (index, rng.randint(0, 10 ** 6), paragraph)
+                     for paragraph in rng.sample(paragraphs, min(3, len(paragraphs)))]
+            candidate = ArticleCandidate()
+            candidate.extractor = 'newspaper' if index == size - 1 and rng.random() < 0.5 else 'extractor%i' % index
+            candidate.text = '\n'.join(kept)
+            ensemble.append(candidate)
+        ensembles.append(ensemble)
+    return ensembles
+
+
+def measure(comparer, ensembles):
+    """
+    :return: list of the chosen texts, seconds per ensemble
+    """
+    start_time = time.time()
+    texts = [comparer.extract(None, ensemble) for ensemble in ensembles]
+    return texts, (time.time() - start_time) / len(ensembles)
+
+
+def main(args):
+    repetitions = int(args[0]) if args else 20
+    rng = random.Random(0)
+    texts = [ParsedDocument(html).text for html, _ in load_documents(args[1:])]
+
+    comparers = [('previous', ReferenceComparerText()), ('current', ComparerText())]
+
+    for size in ENSEMBLE_SIZES:
+        ensembles = [ensemble for text in texts for ensemble in make_ensembles(text, size, repetitions, rng)]
+        words = sum(len(candidate.text.split()) for ensemble in ensembles for candidate in ensemble)
+        expected = None
+        for name, comparer in comparers:
+            chosen, secs = measure(comparer, ensembles)
+            if expected is None:
+                expected = chosen
+            differences = sum(1 for a, b in zip(expected, chosen) if a != b)
+            print('extractors = %i, words per text = %i, %s: milliseconds per article = %.2f, '
+                  'different choices = %i of %i' % (size, words / (len(ensembles) * size), name, secs * 1e3,
+                                                    differences, len(ensembles)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -19,7 +19,6 @@ except ImportError:
     import configparser as ConfigParser
 
 from ast import literal_eval
-from scrapy.utils.log import configure_logging
 import os
 
 
@@ -151,6 +150,8 @@ class CrawlerConfig(object):
         handled here
         """
 
+        # imported here, so that reading the configuration does not load Scrapy
+        from scrapy.utils.log import configure_logging
         configure_logging(self.get_scrapy_options())
 
         # Now, after log-level is correctly set, lets log them.
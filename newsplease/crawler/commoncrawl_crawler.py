@@ -8,15 +8,17 @@ import logging
 import os
 import subprocess
 import tempfile
+import threading
 import time
 from functools import partial
 from multiprocessing import Pool
 import datetime
 
-from dateutil import parser
 from scrapy.utils.log import configure_logging
 
 from ..crawler.commoncrawl_extractor import CommonCrawlExtractor
+from ..crawler.warc_prefetcher import WarcPrefetcher
+from ..helper_classes import date_parser
 
 __author__ = "Felix Hamborg"
 __copyright__ = "Copyright 2017"
@@ -79,7 +81,7 @@ def __get_publishing_date(warc_record, article):
     :return:
     """
     if article.publish_date:
-        return parser.parse(article.publish_date)
+        return date_parser.parse(article.publish_date)
     else:
         return None
 
@@ -258,7 +260,16 @@ def __start_commoncrawl_extractor(warc_download_url, callback_on_article_extract
                                   continue_process=True,
                                   log_pathname_fully_extracted_warcs=None,
                                   extractor_cls=CommonCrawlExtractor,
-                                  fetch_images=False):
+                                  fetch_images=False,
+                                  fields=None,
+                                  structured_data=False, domain_priors_path=None,
+                                  extraction_cache_path=None, near_duplicate_index_path=None,
+                                  keep_near_duplicates=False, templates=False,
+                                  slim_html=False, max_html_bytes=None, document_time_budget=None,
+                                  extractor_time_budget=None, cpu_time_budget=False, quarantine_dir=None,
+                                  stream_warc=False, number_of_record_processes=1, record_index=False,
+                                  valid_languages=None, prefilter=False, excluded_hosts=None,
+                                  host_match='subdomain'):
     """
     Starts a single CommonCrawlExtractor
     :param warc_download_url:
@@ -275,6 +286,26 @@ def __start_commoncrawl_extractor(warc_download_url, callback_on_article_extract
     :param log_level:
     :param extractor_cls: A subclass of CommonCrawlExtractor, which can be used
         to add custom filtering by overriding .filter_record(...)
+    :param fields:
+    :param structured_data:
+    :param domain_priors_path:
+    :param extraction_cache_path:
+    :param near_duplicate_index_path:
+    :param keep_near_duplicates:
+    :param templates:
+    :param slim_html:
+    :param max_html_bytes:
+    :param document_time_budget:
+    :param extractor_time_budget:
+    :param cpu_time_budget:
+    :param quarantine_dir:
+    :param stream_warc:
+    :param number_of_record_processes:
+    :param record_index:
+    :param valid_languages:
+    :param prefilter:
+    :param excluded_hosts:
+    :param host_match:
     :return:
     """
     commoncrawl_extractor = extractor_cls()
@@ -290,7 +321,113 @@ def __start_commoncrawl_extractor(warc_download_url, callback_on_article_extract
                                                    log_level=log_level,
                                                    delete_warc_after_extraction=delete_warc_after_extraction,
                                                    log_pathname_fully_extracted_warcs=__log_pathname_fully_extracted_warcs,
-                                                   fetch_images=fetch_images)
+                                                   fetch_images=fetch_images,
+                                                   fields=fields,
+                                                   structured_data=structured_data,
+                                                   domain_priors_path=domain_priors_path,
+                                                   extraction_cache_path=extraction_cache_path,
+                                                   near_duplicate_index_path=near_duplicate_index_path,
+                                                   keep_near_duplicates=keep_near_duplicates,
+                                                   templates=templates,
+                                                   slim_html=slim_html,
+                                                   max_html_bytes=max_html_bytes,
+                                                   document_time_budget=document_time_budget,
+                                                   extractor_time_budget=extractor_time_budget,
+                                                   cpu_time_budget=cpu_time_budget,
+                                                   quarantine_dir=quarantine_dir,
+                                                   stream_warc=stream_warc,
+                                                   number_of_record_processes=number_of_record_processes,
+                                                   record_index=record_index,
+                                                   valid_languages=valid_languages,
+                                                   prefilter=prefilter,
+                                                   excluded_hosts=excluded_hosts,
+                                                   host_match=host_match)
+
+
+def __extract_prefetched_warc(start_extractor, warc_download_url):
+    """
+    Extracts a WARC file that was downloaded by the WarcPrefetcher.
+    :param start_extractor: __start_commoncrawl_extractor with all settings but the URL
+    :param warc_download_url:
+    :return: The wall-clock time and the CPU time of the extraction in seconds
+    """
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    start_extractor(warc_download_url, reuse_previously_downloaded_files=True)
+    return time.perf_counter() - start_time, time.process_time() - start_cpu_time
+
+
+def __prefetch_and_extract(start_extractor, warc_download_urls, number_of_extraction_processes,
+                           local_download_dir_warc, prefetch_warc_files, prefetch_max_bytes,
+                           number_of_download_threads, reuse_previously_downloaded_files):
+    """
+    Downloads the WARC files in background threads and extracts each file as soon as its download is complete and an
+    extraction process is idle, see crawl_from_commoncrawl.
+    :param start_extractor: __start_commoncrawl_extractor with all settings but the URL
+    :param warc_download_urls:
+    :param number_of_extraction_processes:
+    :param local_download_dir_warc:
+    :param prefetch_warc_files:
+    :param prefetch_max_bytes:
+    :param number_of_download_threads:
+    :param reuse_previously_downloaded_files:
+    :return:
+    """
+    prefetcher = WarcPrefetcher(warc_download_urls, local_download_dir_warc, max_files=prefetch_warc_files,
+                                max_bytes=prefetch_max_bytes, download_threads=number_of_download_threads,
+                                reuse_previously_downloaded_files=reuse_previously_downloaded_files)
+    # wall-clock and CPU time spent on the extraction
+    extraction_seconds = [0.0, 0.0]
+    errors = []
+
+    def on_extracted(warc_download_url, seconds):
+        prefetcher.release(warc_download_url)
+        extraction_seconds[0] += seconds[0]
+        extraction_seconds[1] += seconds[1]
+        __logger.info('prefetch statistics: %s', prefetcher.report())
+        __logger.info('extraction busy = %.1f s (cpu = %.1f s)', *extraction_seconds)
+
+    __logger.info('prefetching up to %i WARC files with %i download threads', prefetch_warc_files,
+                  number_of_download_threads)
+    prefetcher.start()
+    if number_of_extraction_processes > 1:
+        idle_processes = threading.Semaphore(number_of_extraction_processes)
+
+        def on_completed(warc_download_url, seconds):
+            on_extracted(warc_download_url, seconds)
+            idle_processes.release()
+
+        def on_error(warc_download_url, error):
+            __logger.error('could not extract %s: %s', warc_download_url, error)
+            errors.append(error)
+            prefetcher.release(warc_download_url)
+            idle_processes.release()
+
+        with Pool(number_of_extraction_processes) as extraction_process_pool:
+            warcs = iter(prefetcher)
+            while True:
+                # wait for an idle extraction process first, so that the prefetcher measures how long an idle process
+                # waits for a download
+                idle_processes.acquire()
+                warc_download_url, local_filepath = next(warcs, (None, None))
+                if warc_download_url is None:
+                    break
+                if local_filepath is None:
+                    idle_processes.release()
+                    continue
+                extraction_process_pool.apply_async(__extract_prefetched_warc, (start_extractor, warc_download_url),
+                                                    callback=partial(on_completed, warc_download_url),
+                                                    error_callback=partial(on_error, warc_download_url))
+            extraction_process_pool.close()
+            extraction_process_pool.join()
+    else:
+        for warc_download_url, local_filepath in prefetcher:
+            if local_filepath is not None:
+                on_extracted(warc_download_url, __extract_prefetched_warc(start_extractor, warc_download_url))
+
+    __logger.info('prefetch statistics: %s', prefetcher.report())
+    __logger.info('extraction busy = %.1f s (cpu = %.1f s)', *extraction_seconds)
+    if errors:
+        raise errors[0]
 
 
 def crawl_from_commoncrawl(callback_on_article_extracted, callback_on_warc_completed=None, valid_hosts=None,
@@ -299,7 +436,14 @@ def crawl_from_commoncrawl(callback_on_article_extracted, callback_on_warc_compl
                            continue_after_error=True, show_download_progress=False,
                            number_of_extraction_processes=4, log_level=logging.ERROR,
                            delete_warc_after_extraction=True, continue_process=True,
-                           extractor_cls=CommonCrawlExtractor, fetch_images=False):
+                           extractor_cls=CommonCrawlExtractor, fetch_images=False, fields=None,
+                           structured_data=False, domain_priors_path=None,
+                           extraction_cache_path=None, near_duplicate_index_path=None, keep_near_duplicates=False,
+                           templates=False, slim_html=False, max_html_bytes=None, document_time_budget=None,
+                           extractor_time_budget=None, cpu_time_budget=False, quarantine_dir=None,
+                           stream_warc=False, prefetch_warc_files=0, prefetch_max_bytes=None,
+                           number_of_download_threads=2, number_of_record_processes=1, record_index=False,
+                           valid_languages=None, prefilter=False, excluded_hosts=None, host_match='subdomain'):
     """
     Crawl and extract articles form the news crawl provided by commoncrawl.org. For each article that was extracted
     successfully the callback function callback_on_article_extracted is invoked where the first parameter is the
@@ -308,7 +452,9 @@ def crawl_from_commoncrawl(callback_on_article_extracted, callback_on_warc_compl
     :param delete_warc_after_extraction:
     :param number_of_extraction_processes:
     :param callback_on_article_extracted:
-    :param valid_hosts:
+    :param valid_hosts: list of hosts, e.g., ['nytimes.com', 'bbc.co.uk']. Articles whose host does not match one of
+        them, see host_match, are discarded. The hosts are kept in a hash index, so that lists of tens of thousands of
+        hosts do not slow down the filtering. None for any host.
     :param start_date:
     :param end_date:
     :param warc_files_start_date
@@ -320,8 +466,83 @@ def crawl_from_commoncrawl(callback_on_article_extracted, callback_on_warc_compl
     :param show_download_progress:
     :param log_level:
     :param extractor_cls:
+    :param fields: list of NewsArticle fields that are needed, e.g., ['url', 'title', 'date_publish', 'language'].
+        Extractors, cleaning steps and comparers that only contribute to other fields are skipped, which makes
+        metadata-only crawls considerably faster. If None, all fields are extracted.
+    :param structured_data: if True, fields that the structured metadata of a page (JSON-LD, OpenGraph, ...) provides
+        consistently are taken from it and the heavier extractors are only run for the remaining fields
+    :param domain_priors_path: path of a JSON file in which the usual language of each domain is kept. If set, the
+        language of pages from domains with a learned language is only verified on a short sample instead of being
+        detected on the full text. The file is shared by all extraction processes and updated after each WARC file.
+    :param extraction_cache_path: path of an SQLite database in which extraction results are cached. Pages that
+        occur in several WARC files with the same URL, e.g., if WARC files are processed again, are then extracted
+        only once. The database is shared by all extraction processes.
+    :param near_duplicate_index_path: path of an SQLite database with the SimHash fingerprints of the extracted
+        articles. If set, articles whose maintext is a near-duplicate of an earlier article, e.g., copies of the same
+        wire story, are discarded. The database is shared by all extraction processes and kept across runs.
+    :param keep_near_duplicates: if True, near-duplicates are passed to callback_on_article_extracted nevertheless.
+        The cluster_id of each article then identifies the first article of its cluster.
+    :param templates: if True, the layout of each domain is learned from the articles extracted by the extractors,
+        and fields of further pages of the domain are extracted with the learned templates, which is much faster.
+        Pages on which a template gives implausible values are extracted by the extractors. The templates are kept
+        with the domain priors, i.e., in domain_priors_path if set.
+    :param slim_html: if True, scripts (except JSON-LD), styles, SVG graphics and base64-encoded images are removed
+        from the pages before they are parsed, which speeds up the extraction of large pages considerably. The bytes
+        saved are logged with the other statistics.
+    :param max_html_bytes: if set, larger pages are cut to this size before they are parsed, which bounds the time
+        and memory spent on a single page
+    :param document_time_budget: maximum time in seconds spent on the extractors of a page. Once it is used up, the
+        extractor that is running is abandoned, the remaining extractors are skipped, and the fields are chosen from
+        the results of the extractors that finished. This keeps pathological pages from stalling an extraction
+        process. The URLs of such pages are logged. None for no limit.
+    :param extractor_time_budget: maximum time in seconds spent on a single extractor of a page, None for no limit
+    :param cpu_time_budget: if True, the time budgets are measured in CPU time instead of wall-clock time
+    :param quarantine_dir: directory to which the HTML of the pages whose extractors exceeded their time budget is
+        written, so that their extraction can be replayed later, see helper_classes.time_budget.read_quarantine
+    :param stream_warc: if True, the articles of each WARC file are extracted while it is downloaded, instead of
+        downloading it to local_download_dir_warc first, which saves disk space and I/O. A broken connection is
+        resumed. If delete_warc_after_extraction is False, the WARC file is written to local_download_dir_warc as it
+        is streamed, and reused later if reuse_previously_downloaded_files is True.
+    :param prefetch_warc_files: if greater than 0, the WARC files are downloaded by number_of_download_threads
+        background threads, which download up to this number of files ahead, while the extraction processes extract
+        the files whose download is complete. This keeps both the network and the extraction processes busy. The
+        time the extraction processes waited for downloads and the time they were busy are logged. If 0, each
+        extraction process downloads its WARC files itself.
+    :param prefetch_max_bytes: maximum number of bytes of the WARC files that are downloaded ahead, e.g., 10e9. Once
+        it is reached, the downloads wait until files were extracted. Note that extracted files are only removed if
+        delete_warc_after_extraction is True. None for no limit.
+    :param number_of_download_threads: number of WARC files that are downloaded concurrently if prefetch_warc_files
+        is greater than 0
+    :param number_of_record_processes: if greater than 1, the records of each WARC file are extracted by this number
+        of processes, while the WARC file is read and the articles are filtered in the extraction process. This uses
+        all cores when only a few WARC files are extracted. It requires number_of_extraction_processes to be 1. The
+        domain priors learned by the record processes and their statistics are merged in the extraction process, and
+        the priors are saved after each WARC file as usual.
+    :param record_index: if True and number_of_record_processes is greater than 1, the record processes read the
+        records from the local WARC file themselves, at the offsets of the records found while the file is read,
+        instead of receiving their payloads from the extraction process. Not used if stream_warc is True.
+    :param valid_languages: list of ISO 639-1 codes, e.g., ['en', 'de']. Articles in other languages are discarded.
+        None for any language.
+    :param prefilter: if True, records are dropped before their article is extracted if cheap signals show that they
+        would be discarded anyway, see helper_classes.prefilter: responses that are no HTML or whose status is not
+        2xx, hosts that are not in valid_hosts, dates in the URL or in the <meta> tags that are outside of start_date
+        and end_date by more than a day, and pages whose <html lang> is not in valid_languages. The number of records
+        dropped by each stage is logged. The signals are hints only, so that a few articles that the regular filters
+        would keep may be dropped.
+    :param excluded_hosts: list of hosts whose articles are discarded, together with the articles of their
+        subdomains, even if they match valid_hosts
+    :param host_match: how the host of an article is matched against valid_hosts: 'exact' for the host itself,
+        'subdomain' for the host and its subdomains (e.g., 'bbc.co.uk' matches 'www.bbc.co.uk'), or
+        'registered_domain' for all hosts of the registered domain of a host (e.g., 'www.bbc.co.uk' matches
+        'news.bbc.co.uk'), see helper_classes.host_index
     :return:
     """
+    if prefetch_warc_files > 0 and stream_warc:
+        raise ValueError('prefetch_warc_files and stream_warc cannot be used together')
+    if number_of_record_processes > 1 and number_of_extraction_processes > 1:
+        # the processes of a pool cannot start processes of their own
+        raise ValueError('number_of_record_processes requires number_of_extraction_processes to be 1')
+
     __setup(local_download_dir_warc, log_level)
 
     global __extern_callback_on_warc_completed
@@ -353,39 +574,51 @@ def crawl_from_commoncrawl(callback_on_article_extracted, callback_on_warc_compl
             # if not continue process, then always add
             warc_download_urls.append(warc_download_url)
 
+    # the extraction of a single WARC file, with all settings but the URL
+    start_extractor = partial(__start_commoncrawl_extractor,
+                              callback_on_article_extracted=callback_on_article_extracted,
+                              callback_on_warc_completed=__callback_on_warc_completed,
+                              valid_hosts=valid_hosts,
+                              start_date=start_date, end_date=end_date,
+                              strict_date=strict_date,
+                              reuse_previously_downloaded_files=reuse_previously_downloaded_files,
+                              local_download_dir_warc=local_download_dir_warc,
+                              continue_after_error=continue_after_error,
+                              show_download_progress=show_download_progress,
+                              log_level=log_level,
+                              delete_warc_after_extraction=delete_warc_after_extraction,
+                              log_pathname_fully_extracted_warcs=__log_pathname_fully_extracted_warcs,
+                              extractor_cls=extractor_cls,
+                              fetch_images=fetch_images,
+                              fields=fields,
+                              structured_data=structured_data,
+                              domain_priors_path=domain_priors_path,
+                              extraction_cache_path=extraction_cache_path,
+                              near_duplicate_index_path=near_duplicate_index_path,
+                              keep_near_duplicates=keep_near_duplicates,
+                              templates=templates,
+                              slim_html=slim_html,
+                              max_html_bytes=max_html_bytes,
+                              document_time_budget=document_time_budget,
+                              extractor_time_budget=extractor_time_budget,
+                              cpu_time_budget=cpu_time_budget,
+                              quarantine_dir=quarantine_dir,
+                              stream_warc=stream_warc,
+                              number_of_record_processes=number_of_record_processes,
+                              record_index=record_index,
+                              valid_languages=valid_languages,
+                              prefilter=prefilter,
+                              excluded_hosts=excluded_hosts,
+                              host_match=host_match)
+
+    if prefetch_warc_files > 0:
+        __prefetch_and_extract(start_extractor, warc_download_urls, number_of_extraction_processes,
+                               local_download_dir_warc, prefetch_warc_files, prefetch_max_bytes,
+                               number_of_download_threads, reuse_previously_downloaded_files)
     # run the crawler in the current, single process if number of extraction processes is set to 1
-    if number_of_extraction_processes > 1:
+    elif number_of_extraction_processes > 1:
         with Pool(number_of_extraction_processes) as extraction_process_pool:
-            extraction_process_pool.map(partial(__start_commoncrawl_extractor,
-                                                callback_on_article_extracted=callback_on_article_extracted,
-                                                callback_on_warc_completed=__callback_on_warc_completed,
-                                                valid_hosts=valid_hosts,
-                                                start_date=start_date, end_date=end_date,
-                                                strict_date=strict_date,
-                                                reuse_previously_downloaded_files=reuse_previously_downloaded_files,
-                                                local_download_dir_warc=local_download_dir_warc,
-                                                continue_after_error=continue_after_error,
-                                                show_download_progress=show_download_progress,
-                                                log_level=log_level,
-                                                delete_warc_after_extraction=delete_warc_after_extraction,
-                                                log_pathname_fully_extracted_warcs=__log_pathname_fully_extracted_warcs,
-                                                extractor_cls=extractor_cls,
-                                                fetch_images=fetch_images),
-                                        warc_download_urls)
+            extraction_process_pool.map(start_extractor, warc_download_urls)
     else:
         for warc_download_url in warc_download_urls:
-            __start_commoncrawl_extractor(warc_download_url,
-                                          callback_on_article_extracted=callback_on_article_extracted,
-                                          callback_on_warc_completed=__callback_on_warc_completed,
-                                          valid_hosts=valid_hosts,
-                                          start_date=start_date, end_date=end_date,
-                                          strict_date=strict_date,
-                                          reuse_previously_downloaded_files=reuse_previously_downloaded_files,
-                                          local_download_dir_warc=local_download_dir_warc,
-                                          continue_after_error=continue_after_error,
-                                          show_download_progress=show_download_progress,
-                                          log_level=log_level,
-                                          delete_warc_after_extraction=delete_warc_after_extraction,
-                                          log_pathname_fully_extracted_warcs=__log_pathname_fully_extracted_warcs,
-                                          extractor_cls=extractor_cls,
-                                          fetch_images=fetch_images)
+            start_extractor(warc_download_url)
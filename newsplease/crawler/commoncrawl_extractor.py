@@ -4,6 +4,8 @@ Provides functionality to crawl and extract news articles from a single WARC fil
 and host list, can be defined. Currently, the WARC file will be downloaded to the path WORKINGDIR/cc_download_warc, if
 not otherwise specified.
 """
+import collections
+import io
 import logging
 import os
 import subprocess
@@ -11,13 +13,20 @@ import sys
 import time
 
 from ago import human
-from dateutil import parser
 from hurry.filesize import size
 from scrapy.utils.log import configure_logging
 from six.moves import urllib
 from warcio.archiveiterator import ArchiveIterator
 
-from .. import NewsPlease, EmptyResponseError
+from .. import NewsPlease, EmptyResponseError, batch_extractor
+from ..helper_classes import date_parser
+from ..helper_classes.domain_priors import DomainPriors
+from ..helper_classes.extraction_cache import ExtractionCache
+from ..helper_classes.host_index import HostIndex
+from ..helper_classes.near_duplicates import NearDuplicateIndex
+from ..helper_classes.prefilter import PreFilter
+from ..helper_classes.time_budget import TimeBudget
+from .warc_stream import HttpStream
 
 __author__ = "Felix Hamborg"
 __copyright__ = "Copyright 2017"
@@ -29,14 +38,21 @@ class CommonCrawlExtractor:
     __warc_download_url = None
     # download dir for warc files
     __local_download_dir_warc = './cc_download_warc/'
-    # hosts (if None or empty list, any host is OK)
+    # hosts (if None or empty list, any host is OK), and hosts that are not OK, with their subdomains
     __filter_valid_hosts = []  # example: ['elrancaguino.cl']
+    __filter_excluded_hosts = []
+    # index of the valid and excluded hosts (if None, any host is OK)
+    __host_index = None
     # start date (if None, any date is OK as start date), as datetime
     __filter_start_date = None
     # end date (if None, any date is OK as end date)
     __filter_end_date = None
     # if date filtering is string, e.g., if we could not detect the date of an article, we will discard the article
     __filter_strict_date = True
+    # languages (if None or empty list, any language is OK), as ISO 639-1 codes
+    __filter_valid_languages = None
+    # cheap checks that drop records before their article is extracted (if None, all records are extracted)
+    __prefilter = None
     # if True, the script checks whether a file has been downloaded already and uses that file instead of downloading
     # again. Note that there is no check whether the file has been downloaded completely or is valid!
     __reuse_previously_downloaded_files = True
@@ -46,9 +62,20 @@ class CommonCrawlExtractor:
     __ignore_unicode_errors = False
     # fetch images
     __fetch_images = False
+    # article extractor, initialized once and reused for all records, and the options it was created with
+    __extractor = None
+    __extractor_options = {}
+    # fields of the articles that are needed (if None, all fields are extracted)
+    __fields = None
     # log level
     __log_level = logging.INFO
     __delete_warc_after_extraction = True
+    # if True, the WARC file is extracted while it is downloaded instead of being downloaded completely first
+    __stream_warc = False
+    # number of processes that extract the records of the WARC file, if 1, the records are extracted one after another
+    __number_of_record_processes = 1
+    # if True, the processes read the records of a local WARC file themselves, at the offsets found by the reader
+    __record_index = False
     __log_pathname_fully_extracted_warcs = None
 
     # commoncrawl.org
@@ -104,18 +131,8 @@ class CommonCrawlExtractor:
         :return: A tuple of (True or False) and an article (might be None)
         """
         # filter by host
-        if self.__filter_valid_hosts:
-            url = warc_record.rec_headers.get_header('WARC-Target-URI')
-
-            # very simple check, check if one of the required host names is contained in the url of the WARC transaction
-            # better would be to extract the host name from the WARC transaction Target URI and then check for equality
-            # because currently something like g.co?forward_url=facebook.com would yield a positive filter test for
-            # facebook.com even though the actual host is g.co
-            for valid_host in self.__filter_valid_hosts:
-                if valid_host in url:
-                    break
-            else:
-                return False, article
+        if not self.__filter_host(warc_record.rec_headers.get_header('WARC-Target-URI')):
+            return False, article
 
         # filter by date
         if self.__filter_start_date or self.__filter_end_date:
@@ -133,8 +150,50 @@ class CommonCrawlExtractor:
                 if self.__filter_end_date and publishing_date > self.__filter_end_date:
                     return False, article
 
+        # filter by language
+        if self.__filter_valid_languages:
+            if not article:
+                article = self._from_warc(warc_record)
+            if article.language not in self.__filter_valid_languages:
+                return False, article
+
         return True, article
 
+    def __filter_host(self, url):
+        """
+        Returns true if the URL of a record passes the host filter
+        :param url:
+        :return:
+        """
+        # the host name is extracted from the WARC transaction Target URI, so that something like
+        # g.co?forward_url=facebook.com does not pass for facebook.com
+        return self.__host_index is None or self.__host_index.matches(url)
+
+    def __passes_prefilter(self, warc_record):
+        """
+        Returns true if a response record passes the pre-filters, or the host filter if no pre-filters are used. If
+        the pre-filters fail on the record, e.g., because of a malformed header, the record passes, so that the regular
+        filters decide on it.
+        :param warc_record:
+        :return:
+        """
+        url = warc_record.rec_headers.get_header('WARC-Target-URI')
+        if self.__prefilter is None:
+            return self.__filter_host(url)
+
+        try:
+            raw_stream = warc_record.raw_stream.read()
+            # the payload is put back, so that the article can still be extracted from the record
+            warc_record.raw_stream = io.BytesIO(raw_stream)
+            status, content_type = None, None
+            if warc_record.http_headers is not None:
+                status = warc_record.http_headers.get_statuscode()
+                content_type = warc_record.http_headers.get_header('Content-Type')
+            return self.__prefilter.check(url, raw_stream, status=status, content_type=content_type) is None
+        except Exception as error:
+            self.__logger.warning('pre-filters failed on %s: %s', url, error)
+            return True
+
     def __get_publishing_date(self, warc_record, article):
         """
         Extracts the publishing date from the record
@@ -142,7 +201,7 @@ class CommonCrawlExtractor:
         :return:
         """
         if hasattr(article, 'date_publish'):
-            return parser.parse(article.date_publish) if isinstance(article.date_publish, str) else article.date_publish
+            return date_parser.parse(article.date_publish) if isinstance(article.date_publish, str) else article.date_publish
         else:
             return None
 
@@ -194,11 +253,19 @@ class CommonCrawlExtractor:
         :param totalsize:
         :return:
         """
+        self.__show_progress(blocknum * blocksize, totalsize)
+
+    def __show_progress(self, readsofar, totalsize):
+        """
+        Prints some download progress information
+        :param readsofar: number of bytes downloaded so far
+        :param totalsize: size of the file in bytes, 0 or None if unknown
+        :return:
+        """
         if not self.__show_download_progress:
             return
 
-        readsofar = blocknum * blocksize
-        if totalsize > 0:
+        if totalsize:
             s = "\r%s / %s" % (size(readsofar), size(totalsize))
             sys.stdout.write(s)
             if readsofar >= totalsize:  # near the end
@@ -206,14 +273,20 @@ class CommonCrawlExtractor:
         else:  # total size is unknown
             sys.stdout.write("\rread %s" % (size(readsofar)))
 
+    def __get_local_filepath(self, url):
+        """
+        :param url: The URL of a WARC file
+        :return: The path of the local copy of the file
+        """
+        return os.path.join(self.__local_download_dir_warc, urllib.parse.quote_plus(url))
+
     def __download(self, url):
         """
         Download and save a file locally.
         :param url: Where to download from
         :return: File path name of the downloaded file
         """
-        local_filename = urllib.parse.quote_plus(url)
-        local_filepath = os.path.join(self.__local_download_dir_warc, local_filename)
+        local_filepath = self.__get_local_filepath(url)
 
         if os.path.isfile(local_filepath) and self.__reuse_previously_downloaded_files:
             self.__logger.info("found local file %s, not downloading again due to configuration", local_filepath)
@@ -232,14 +305,104 @@ class CommonCrawlExtractor:
             return local_filepath
 
     def _from_warc(self, record):
-        return NewsPlease.from_warc(record, decode_errors="replace" if self.__ignore_unicode_errors else "strict", fetch_images=self.__fetch_images)
+        return NewsPlease.from_warc(record, decode_errors="replace" if self.__ignore_unicode_errors else "strict",
+                                    fetch_images=self.__fetch_images, extractor=self.__extractor, fields=self.__fields,
+                                    domain_priors=self.__domain_priors, extraction_cache=self.__extraction_cache,
+                                    time_budget=self.__time_budget)
 
     def __process_warc_gz_file(self, path_name):
+        """
+        Extracts the articles of a local WARC file, see __process_warc_stream, and deletes the file afterwards if
+        configured.
+        :param path_name:
+        :return:
+        """
+        self.__process_warc_stream(open(path_name, 'rb'), path_name=path_name)
+
+        # cleanup
+        if self.__delete_warc_after_extraction:
+            os.remove(path_name)
+
+    def __read_records(self, stream, path_name=None):
+        """
+        Iterates the records of a WARC file. If several record processes are configured, the response records are
+        extracted by a pool of processes while the file is read; the articles are returned in the order of the records.
+        :param stream: The WARC file
+        :param path_name: The path of the WARC file if it is a local file, which the processes then read the records
+            from themselves if configured
+        :return: A generator yielding a (record, article, extracted) tuple for each record. extracted is True if the
+            article was extracted already or the record was dropped, article is then None if the extraction failed or
+            the record did not pass the pre-filters.
+        """
+        if self.__number_of_record_processes <= 1:
+            for record in ArchiveIterator(stream):
+                if self.__prefilter is not None and record.rec_type == 'response' \
+                        and not self.__passes_prefilter(record):
+                    yield record, None, True
+                else:
+                    yield record, None, False
+            return
+
+        # the records that were sent to the processes and wait for their article, the records themselves are not
+        # sent, their headers are kept for the filters and the log
+        pending_records = collections.deque()
+        decode_errors = "replace" if self.__ignore_unicode_errors else "strict"
+        record_index = self.__record_index and path_name is not None
+
+        def tasks():
+            archive_iterator = ArchiveIterator(stream)
+            for record in archive_iterator:
+                if record.rec_type != 'response':
+                    continue
+                pending_records.append(record)
+                if not self.__passes_prefilter(record):
+                    # skipped, but still sent, so that the record is logged in order
+                    yield None
+                elif record_index:
+                    archive_iterator.read_to_end(record)
+                    yield path_name, archive_iterator.get_record_offset(), archive_iterator.get_record_length(), \
+                        decode_errors
+                else:
+                    yield NewsPlease.read_warc_record(record) + (decode_errors,)
+
+        articles = batch_extractor.extract(
+            batch_extractor._extract_warc_offset_chunk if record_index else batch_extractor._extract_warc_chunk,
+            tasks(), fetch_images=self.__fetch_images, number_of_processes=self.__number_of_record_processes,
+            fields=self.__fields, extraction_cache=self.__extraction_cache, time_budget=self.__time_budget,
+            extractor_options=self.__extractor_options, domain_priors=self.__domain_priors, extractor=self.__extractor)
+        for article in articles:
+            yield pending_records.popleft(), article, True
+
+    def __log_statistics(self):
+        """
+        Logs the statistics of the extractor and of the optional components, i.e., the domain priors, the extraction
+        cache, the near-duplicate index, the HTML slimmer, the time budget and the pre-filters.
+        :return:
+        """
+        self.__logger.info('served by structured data = %i of %i extracted documents (%s)',
+                           self.__extractor.fast_path_documents, self.__extractor.documents,
+                           ', '.join('%s = %i' % field_count for field_count in
+                                     sorted(self.__extractor.settled_field_documents.items())) or '-')
+        if self.__domain_priors is not None:
+            self.__logger.info('domain priors: %s', self.__domain_priors.report())
+        if self.__extraction_cache is not None:
+            self.__logger.info('extraction cache: %s', self.__extraction_cache.report())
+        if self.__near_duplicate_index is not None:
+            self.__logger.info('near-duplicate index: %s', self.__near_duplicate_index.report())
+        if self.__extractor.html_slimmer is not None:
+            self.__logger.info('html slimmer: %s', self.__extractor.html_slimmer.report())
+        if self.__time_budget is not None:
+            self.__logger.info('time budget: %s', self.__time_budget.report())
+        if self.__prefilter is not None:
+            self.__logger.info('pre-filter: %s', self.__prefilter.report())
+
+    def __process_warc_stream(self, stream, path_name=None):
         """
         Iterates all transactions in one WARC file and for each transaction tries to extract an article object.
         Afterwards, each article is checked against the filter criteria and if all are passed, the function
         on_valid_article_extracted is invoked with the article object.
-        :param path_name:
+        :param stream: The WARC file, a local file or an HttpStream, which is closed afterwards
+        :param path_name: The path of the WARC file if it is a local file
         :return:
         """
         counter_article_total = 0
@@ -248,15 +411,18 @@ class CommonCrawlExtractor:
         counter_article_error = 0
         start_time = time.time()
 
-        with open(path_name, 'rb') as stream:
-            for record in ArchiveIterator(stream):
+        with stream:
+            for record, article, extracted in self.__read_records(stream, path_name):
                 try:
                     if record.rec_type == 'response':
                         counter_article_total += 1
 
                         # if the article passes filter tests, we notify the user
                         try:
-                            filter_pass, article = self.filter_record(record)
+                            if extracted and article is None:
+                                filter_pass = False
+                            else:
+                                filter_pass, article = self.filter_record(record, article)
                         except (UnicodeDecodeError, EmptyResponseError):
                             filter_pass = False
                         if filter_pass:
@@ -265,6 +431,9 @@ class CommonCrawlExtractor:
                                     article = self._from_warc(record)
                             except (UnicodeDecodeError, EmptyResponseError):
                                 filter_pass = False
+                        if filter_pass and self.__near_duplicate_index is not None:
+                            article.cluster_id, near_duplicate = self.__near_duplicate_index.assign(article.maintext)
+                            filter_pass = not near_duplicate or self.__keep_near_duplicates
                         if filter_pass:
                             counter_article_passed += 1
 
@@ -291,6 +460,7 @@ class CommonCrawlExtractor:
                                                counter_article_discarded, counter_article_error, counter_article_total)
                             self.__logger.info('extraction from current WARC file started %s; %f s/article',
                                                human(start_time), secs_per_article)
+                            self.__log_statistics()
                 except:
                     if self.__continue_after_error:
                         self.__logger.error('Unexpected error: %s (%s)', *sys.exc_info()[0:2])
@@ -300,9 +470,9 @@ class CommonCrawlExtractor:
                     else:
                         raise
 
-        # cleanup
-        if self.__delete_warc_after_extraction:
-            os.remove(path_name)
+        self.__log_statistics()
+        if self.__domain_priors is not None:
+            self.__domain_priors.save()
 
         self.__register_fully_extracted_warc_file(self.__warc_download_url)
         self.__callback_on_warc_completed(self.__warc_download_url, counter_article_passed, counter_article_discarded,
@@ -317,8 +487,30 @@ class CommonCrawlExtractor:
         """
         self.__setup()
 
-        local_path_name = self.__download(self.__warc_download_url)
-        self.__process_warc_gz_file(local_path_name)
+        if self.__stream_warc:
+            self.__stream(self.__warc_download_url)
+        else:
+            local_path_name = self.__download(self.__warc_download_url)
+            self.__process_warc_gz_file(local_path_name)
+
+    def __stream(self, url):
+        """
+        Extracts the articles of a WARC file while it is downloaded, without staging it on disk. A local copy that was
+        downloaded before is used instead if configured. If the WARC file is not deleted after the extraction, it is
+        written to the local download directory as it is streamed.
+        :param url: Where to download from
+        :return:
+        """
+        local_filepath = self.__get_local_filepath(url)
+        if os.path.isfile(local_filepath) and self.__reuse_previously_downloaded_files:
+            self.__logger.info("found local file %s, not streaming again due to configuration", local_filepath)
+            self.__process_warc_gz_file(local_filepath)
+            return
+
+        tee_path = None if self.__delete_warc_after_extraction else local_filepath
+        self.__logger.info('streaming %s (local: %s)', url, tee_path)
+        self.__process_warc_stream(HttpStream(url, tee_path=tee_path, progress_callback=self.__show_progress))
+        self.__logger.info('streaming completed: %s', url)
 
     def extract_from_commoncrawl(self, warc_download_url, callback_on_article_extracted,
                                  callback_on_warc_completed=None,
@@ -327,7 +519,13 @@ class CommonCrawlExtractor:
                                  strict_date=True, reuse_previously_downloaded_files=True, local_download_dir_warc=None,
                                  continue_after_error=True, ignore_unicode_errors=False,
                                  show_download_progress=False, log_level=logging.ERROR, delete_warc_after_extraction=True,
-                                 log_pathname_fully_extracted_warcs=None, fetch_images=False):
+                                 log_pathname_fully_extracted_warcs=None, fetch_images=False, fields=None,
+                                 structured_data=False, domain_priors_path=None, extraction_cache_path=None,
+                                 near_duplicate_index_path=None, keep_near_duplicates=False, templates=False,
+                                 slim_html=False, max_html_bytes=None, document_time_budget=None,
+                                 extractor_time_budget=None, cpu_time_budget=False, quarantine_dir=None,
+                                 stream_warc=False, number_of_record_processes=1, record_index=False,
+                                 valid_languages=None, prefilter=False, excluded_hosts=None, host_match='subdomain'):
         """
         Crawl and extract articles form the news crawl provided by commoncrawl.org. For each article that was extracted
         successfully the callback function callback_on_article_extracted is invoked where the first parameter is the
@@ -346,10 +544,45 @@ class CommonCrawlExtractor:
         :param continue_after_error:
         :param show_download_progress:
         :param log_level:
+        :param fields: list of NewsArticle fields that are needed, see NewsPlease.from_html. If a date filter is set,
+            date_publish is always extracted.
+        :param structured_data: if True, fields provided by the structured metadata of a page are taken from it, see
+            NewsPlease.extractor
+        :param domain_priors_path: path of a JSON file with the usual language of each domain, see
+            commoncrawl_crawler.crawl_from_commoncrawl
+        :param extraction_cache_path: path of an SQLite database in which extraction results are cached, see
+            commoncrawl_crawler.crawl_from_commoncrawl
+        :param near_duplicate_index_path: path of an SQLite database with the fingerprints of the extracted articles,
+            see commoncrawl_crawler.crawl_from_commoncrawl
+        :param keep_near_duplicates: if True, near-duplicates are not discarded but only tagged with their cluster_id
+        :param templates: if True, extraction templates are learned per domain, see
+            commoncrawl_crawler.crawl_from_commoncrawl
+        :param slim_html: if True, scripts, styles and other payloads are removed before parsing, see
+            NewsPlease.extractor
+        :param max_html_bytes: if set, larger pages are cut to this size before they are parsed
+        :param document_time_budget: maximum seconds spent on the extractors of a page, see
+            commoncrawl_crawler.crawl_from_commoncrawl
+        :param extractor_time_budget: maximum seconds spent on a single extractor of a page
+        :param cpu_time_budget: if True, the time budgets are measured in CPU time instead of wall-clock time
+        :param quarantine_dir: directory to which pages whose extractors exceeded their time budget are written
+        :param stream_warc: if True, the articles are extracted while the WARC file is downloaded, see
+            commoncrawl_crawler.crawl_from_commoncrawl
+        :param number_of_record_processes: number of processes that extract the records of the WARC file, see
+            commoncrawl_crawler.crawl_from_commoncrawl
+        :param record_index: if True, the record processes read the records from the local WARC file themselves
+        :param valid_languages: list of ISO 639-1 codes of the languages of the articles to keep, None for any language
+        :param prefilter: if True, records are dropped by cheap checks before their article is extracted, see
+            commoncrawl_crawler.crawl_from_commoncrawl
+        :param excluded_hosts: list of hosts whose articles are discarded, with their subdomains
+        :param host_match: how the host of a record is matched against valid_hosts: 'exact', 'subdomain' or
+            'registered_domain', see helper_classes.host_index
         :return:
         """
         self.__warc_download_url = warc_download_url
         self.__filter_valid_hosts = valid_hosts
+        self.__filter_excluded_hosts = excluded_hosts
+        self.__host_index = HostIndex(valid_hosts, excluded_hosts, match=host_match) \
+            if valid_hosts or excluded_hosts else None
         self.__filter_start_date = start_date
         self.__filter_end_date = end_date
         self.__filter_strict_date = strict_date
@@ -359,11 +592,33 @@ class CommonCrawlExtractor:
         self.__continue_after_error = continue_after_error
         self.__ignore_unicode_errors = ignore_unicode_errors
         self.__fetch_images = fetch_images
+        self.__extractor_options = dict(structured_data=structured_data, templates=templates, slim_html=slim_html,
+                                        max_html_bytes=max_html_bytes)
+        self.__extractor = NewsPlease.extractor(fetch_images=fetch_images, **self.__extractor_options)
+        if fields is not None and (start_date or end_date):
+            fields = set(fields) | {'date_publish'}
+        if fields is not None and valid_languages:
+            fields = set(fields) | {'language'}
+        self.__fields = fields
+        self.__domain_priors = DomainPriors(path=domain_priors_path) if domain_priors_path or templates else None
+        self.__extraction_cache = ExtractionCache(extraction_cache_path) if extraction_cache_path else None
+        self.__near_duplicate_index = NearDuplicateIndex(near_duplicate_index_path) if near_duplicate_index_path \
+            else None
+        self.__keep_near_duplicates = keep_near_duplicates
+        self.__time_budget = TimeBudget(document_seconds=document_time_budget, extractor_seconds=extractor_time_budget,
+                                        quarantine_dir=quarantine_dir, cpu_time=cpu_time_budget) \
+            if document_time_budget is not None or extractor_time_budget is not None else None
         self.__callback_on_article_extracted = callback_on_article_extracted
         self.__callback_on_warc_completed = callback_on_warc_completed
         self.__show_download_progress = show_download_progress
         self.__log_level = log_level
         self.__delete_warc_after_extraction = delete_warc_after_extraction
+        self.__stream_warc = stream_warc
+        self.__number_of_record_processes = number_of_record_processes
+        self.__record_index = record_index
+        self.__filter_valid_languages = valid_languages
+        self.__prefilter = PreFilter(host_index=self.__host_index, start_date=start_date, end_date=end_date,
+                                     languages=valid_languages) if prefilter else None
         self.__log_pathname_fully_extracted_warcs = log_pathname_fully_extracted_warcs
 
         self.__run()
@@ -26,6 +26,10 @@ class NewscrawlerItem(scrapy.Item):
     html_title = scrapy.Field()
     # Response object from crawler
     spider_response = scrapy.Field()
+    # DOM of the response body, parsed once and shared by all extractors
+    parsed_document = scrapy.Field()
+    # Optional DomainPriors with the usual language of the source domain, consulted by the extractors
+    domain_priors = scrapy.Field()
     # Title of the article as store in the RSS feed
     rss_title = scrapy.Field()
     # Extracted article title
@@ -42,3 +46,5 @@ class NewscrawlerItem(scrapy.Item):
     article_publish_date = scrapy.Field()
     # Extracted language of the article
     article_language = scrapy.Field()
+    # Id of the cluster of near-duplicate articles, set by the NearDuplicateFilter
+    cluster_id = scrapy.Field()
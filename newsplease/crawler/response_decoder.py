@@ -1,10 +1,23 @@
 # Based on https://github.com/adbar/trafilatura/blob/master/trafilatura/utils.py
+import codecs
+import functools
 import logging
+import re
+import urllib.parse
 
 import cchardet  # For unknown encoding, see https://charset-normalizer.readthedocs.io/en/latest/ for more info
 
+from ..helper_classes.domain_priors import ENCODING
+
 LOGGER = logging.getLogger(__name__)
 
+# number of bytes at the start of the input on which the encoding prior of a domain is verified
+SAMPLE_BYTES = 8192
+
+# to improve performance, regex statements are compiled only once per module
+re_charset = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+re_meta_charset = re.compile(rb'<meta\s[^>]*?charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
 
 def isutf8(data):
     """Simple heuristic to determine if a bytestring uses standard unicode encoding"""
@@ -16,14 +29,81 @@ def isutf8(data):
         return True
 
 
-def detect_encoding(bytesobject):
-    """Read the first chunk of input and return its encoding"""
+def isencoded(data, encoding):
+    """Determine if a bytestring decodes without errors in the given encoding"""
+    try:
+        data.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    else:
+        return True
+
+
+def normalize_encoding(encoding):
+    """Return the canonical name of an encoding, e.g., cp1252 for windows-1252, None if it is unknown"""
+    try:
+        return codecs.lookup(encoding).name
+    except (LookupError, TypeError):
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def issinglebyte(encoding):
+    """Determine if an encoding maps each byte to a character, so that any input decodes with it"""
+    try:
+        return len(bytes(range(256)).decode(encoding, errors='replace')) == 256
+    except LookupError:
+        return False
+
+
+def declared_encoding(sample, content_type=None):
+    """Return the encoding declared by the Content-Type header or by a <meta> tag in the sample, None if there is
+    none"""
+    match = re_charset.search(content_type or '') or re_meta_charset.search(sample)
+    if match is None:
+        return None
+    encoding = match.group(1)
+    if isinstance(encoding, bytes):
+        encoding = encoding.decode('ascii')
+    return normalize_encoding(encoding)
+
+
+def verify_prior(sample, prior, content_type=None):
+    """Determine if a sample of the input is encoded in the encoding prior of its domain. Single-byte encodings decode
+    any input, they are therefore checked against the declared encoding, or against a guess on the sample if no
+    encoding is declared."""
+    try:
+        # a character that is cut at the end of the sample is not an error
+        codecs.getincrementaldecoder(prior)().decode(sample, final=False)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    if not issinglebyte(prior):
+        return True
+    declared = declared_encoding(sample, content_type)
+    if declared is None:
+        declared = normalize_encoding(cchardet.detect(sample)['encoding'])
+    return declared == normalize_encoding(prior)
+
+
+def detect_encoding(bytesobject, domain=None, domain_priors=None, content_type=None):
+    """Read the first chunk of input and return its encoding. If domain priors are given, the usual encoding of the
+    domain is used instead of guessing, provided that a sample of the input agrees with it, see verify_prior."""
     # unicode-test
     if isutf8(bytesobject):
         return 'UTF-8'
     else:
+        if domain_priors is not None:
+            prior = domain_priors.get(ENCODING, domain)
+            verified = None
+            if prior is not None:
+                verified = verify_prior(bytesobject[:SAMPLE_BYTES], prior, content_type)
+            domain_priors.record(ENCODING, verified)
+            if verified:
+                return prior
         guess = cchardet.detect(bytesobject)
         LOGGER.debug('guessed encoding: %s', guess['encoding'])
+        if domain_priors is not None:
+            domain_priors.observe(ENCODING, domain, guess['encoding'])
         return guess['encoding']
     # fallback on full response
     # if guess is None or guess['encoding'] is None: # or guess['confidence'] < 0.99:
@@ -32,9 +112,10 @@ def detect_encoding(bytesobject):
     return None
 
 
-def decode_response(response):
+def decode_response(response, domain_priors=None):
     """Read the first chunk of server response and decode it"""
-    guessed_encoding = detect_encoding(response.content)
+    guessed_encoding = detect_encoding(response.content, urllib.parse.urlparse(response.url).hostname, domain_priors,
+                                       response.headers.get('Content-Type'))
     LOGGER.debug('response/guessed encoding: %s / %s', response.encoding, guessed_encoding)
     # process
     if guessed_encoding is not None:
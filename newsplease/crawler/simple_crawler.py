@@ -25,22 +25,24 @@ class SimpleCrawler(object):
     _results = {}
 
     @staticmethod
-    def fetch_url(url, timeout=None):
+    def fetch_url(url, timeout=None, domain_priors=None):
         """
         Crawls the html content of the parameter url and returns the html
         :param url:
         :param timeout: in seconds, if None, the urllib default is used
+        :param domain_priors: DomainPriors with the usual encoding of the domains, if None the encoding is detected
         :return:
         """
-        return SimpleCrawler._fetch_url(url, False, timeout=timeout)
+        return SimpleCrawler._fetch_url(url, False, timeout=timeout, domain_priors=domain_priors)
 
     @staticmethod
-    def _fetch_url(url, is_threaded, timeout=None):
+    def _fetch_url(url, is_threaded, timeout=None, domain_priors=None):
         """
         Crawls the html content of the parameter url and saves the html in _results
         :param url:
         :param is_threaded: If True, results will be stored for later processing by the fetch_urls method. Else not.
         :param timeout: in seconds, if None, the urllib default is used
+        :param domain_priors: see fetch_url
         :return: html of the url
         """
         html_str = None
@@ -69,20 +71,22 @@ class SimpleCrawler(object):
             elif len(response.text) > MAX_FILE_SIZE:
                 LOGGER.error('too large: %s %s', url, len(response.text))
             else:
-                html_str = decode_response(response)
+                html_str = decode_response(response, domain_priors)
         if is_threaded:
             SimpleCrawler._results[url] = html_str
         return html_str
 
     @staticmethod
-    def fetch_urls(urls, timeout=None):
+    def fetch_urls(urls, timeout=None, domain_priors=None):
         """
         Crawls the html content of all given urls in parallel. Returns when all requests are processed.
         :param urls:
         :param timeout: in seconds, if None, the urllib default is used
+        :param domain_priors: see fetch_url
         :return:
         """
-        threads = [threading.Thread(target=SimpleCrawler._fetch_url, args=(url, True, timeout)) for url in urls]
+        threads = [threading.Thread(target=SimpleCrawler._fetch_url, args=(url, True, timeout, domain_priors))
+                   for url in urls]
         for thread in threads:
             thread.start()
         for thread in threads:
@@ -0,0 +1,193 @@
+"""
+Prefetching of WARC files. Without prefetching, each extraction process downloads a WARC file and only then extracts
+it, so that the processes wait for the network during the download and the network is idle during the extraction. A
+WarcPrefetcher downloads the next WARC files in background threads into the local download directory, while the
+extraction processes extract the files that are already complete. The number of files and the number of bytes that
+are downloaded ahead are limited; once the limit is reached, the downloads wait until extracted files are released
+(back-pressure), so that the scratch area stays bounded.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+from six.moves import urllib
+
+from .warc_stream import HttpStream
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DiskBudget(object):
+    def __init__(self, max_bytes=None):
+        """
+        Bytes of the scratch area that are taken by files that were downloaded but not released yet.
+        :param max_bytes: maximum number of bytes, None for no limit
+        """
+        self.max_bytes = max_bytes
+        self.reserved = 0
+        self.__condition = threading.Condition()
+
+    def acquire(self, size):
+        """
+        Reserves bytes for a file, waits until enough bytes were released. A file that is larger than the budget is
+        admitted once no other file is reserved.
+        :param size: size of the file in bytes
+        :return: seconds waited
+        """
+        start_time = time.perf_counter()
+        with self.__condition:
+            while self.max_bytes is not None and self.reserved and self.reserved + size > self.max_bytes:
+                self.__condition.wait()
+            self.reserved += size
+        return time.perf_counter() - start_time
+
+    def release(self, size):
+        """
+        Releases the bytes of a file.
+        :param size: size of the file in bytes
+        """
+        with self.__condition:
+            self.reserved -= size
+            self.__condition.notify_all()
+
+
+class WarcPrefetcher(object):
+    def __init__(self, warc_download_urls, local_download_dir_warc, max_files=4, max_bytes=None, download_threads=2,
+                 reuse_previously_downloaded_files=True):
+        """
+        :param warc_download_urls: URLs of the WARC files, downloaded in this order
+        :param local_download_dir_warc: directory to which the files are downloaded
+        :param max_files: maximum number of files that are downloaded or wait for their extraction
+        :param max_bytes: maximum number of bytes of the files that are downloaded or wait for their extraction, None
+            for no limit
+        :param download_threads: number of files that are downloaded concurrently
+        :param reuse_previously_downloaded_files: if True, files that exist in the download directory are not
+            downloaded again
+        """
+        self.warc_download_urls = list(warc_download_urls)
+        self.local_download_dir_warc = local_download_dir_warc
+        self.download_threads = download_threads
+        self.reuse_previously_downloaded_files = reuse_previously_downloaded_files
+        self.budget = DiskBudget(max_bytes)
+
+        self.__pending = queue.Queue()
+        for warc_download_url in self.warc_download_urls:
+            self.__pending.put(warc_download_url)
+        self.__ready = queue.Queue()
+        self.__slots = threading.Semaphore(max_files)
+        self.__sizes = {}
+        self.__lock = threading.Lock()
+
+        # statistics
+        self.files_downloaded = 0
+        self.files_reused = 0
+        self.bytes_downloaded = 0
+        self.download_seconds = 0.0
+        # time the downloads waited for the limits, and the time the consumer waited for a complete file
+        self.budget_wait_seconds = 0.0
+        self.input_wait_seconds = 0.0
+
+    def local_filepath(self, warc_download_url):
+        """
+        :param warc_download_url: The URL of a WARC file
+        :return: The path of the local copy of the file, where the CommonCrawlExtractor looks for it
+        """
+        return os.path.join(self.local_download_dir_warc, urllib.parse.quote_plus(warc_download_url))
+
+    def start(self):
+        """
+        Starts the download threads.
+        """
+        for _ in range(max(1, self.download_threads)):
+            thread = threading.Thread(target=self.__download_loop, daemon=True)
+            thread.start()
+
+    def __remote_size(self, warc_download_url):
+        """
+        :return: The size of a remote file in bytes, 0 if the server does not tell it
+        """
+        try:
+            request = urllib.request.Request(warc_download_url, method='HEAD')
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return int(response.headers.get('Content-Length') or 0)
+        except (OSError, ValueError) as error:
+            LOGGER.warning('could not determine the size of %s: %s', warc_download_url, error)
+            return 0
+
+    def __download_loop(self):
+        """
+        Downloads the pending files one after another.
+        """
+        while True:
+            try:
+                warc_download_url = self.__pending.get_nowait()
+            except queue.Empty:
+                return
+
+            start_time = time.perf_counter()
+            self.__slots.acquire()
+            waited = time.perf_counter() - start_time
+            local_filepath = self.local_filepath(warc_download_url)
+            size = 0
+            try:
+                if self.reuse_previously_downloaded_files and os.path.isfile(local_filepath):
+                    size = os.path.getsize(local_filepath)
+                    waited += self.budget.acquire(size)
+                    with self.__lock:
+                        self.files_reused += 1
+                else:
+                    size = self.__remote_size(warc_download_url)
+                    waited += self.budget.acquire(size)
+                    start_time = time.perf_counter()
+                    with HttpStream(warc_download_url, tee_path=local_filepath) as stream:
+                        while stream.read(1 << 20):
+                            pass
+                    with self.__lock:
+                        self.files_downloaded += 1
+                        self.bytes_downloaded += stream.position
+                        self.download_seconds += time.perf_counter() - start_time
+                with self.__lock:
+                    self.__sizes[warc_download_url] = size
+                    self.budget_wait_seconds += waited
+                self.__ready.put((warc_download_url, local_filepath))
+            except Exception as error:
+                LOGGER.error('could not download %s: %s', warc_download_url, error)
+                self.budget.release(size)
+                self.__slots.release()
+                self.__ready.put((warc_download_url, None))
+
+    def __iter__(self):
+        """
+        Yields the files in the order in which their downloads complete. Each file has to be released once it was
+        extracted, see release.
+        :return: A generator yielding a (warc_download_url, local_filepath) tuple for each file, local_filepath is None
+            if the file could not be downloaded
+        """
+        for _ in range(len(self.warc_download_urls)):
+            start_time = time.perf_counter()
+            warc = self.__ready.get()
+            self.input_wait_seconds += time.perf_counter() - start_time
+            yield warc
+
+    def release(self, warc_download_url):
+        """
+        Releases the limits taken by a file once it was extracted, so that further files are downloaded.
+        :param warc_download_url: The URL of the file
+        """
+        with self.__lock:
+            size = self.__sizes.pop(warc_download_url, 0)
+        self.budget.release(size)
+        self.__slots.release()
+
+    def report(self):
+        """
+        :return: A string like "downloaded = 3 files (3.2 GB, 41.0 MB/s), reused = 0, waited for limits = 12.0 s,
+            waited for downloads = 95.1 s"
+        """
+        return 'downloaded = %i files (%.1f GB, %.1f MB/s), reused = %i, waited for limits = %.1f s, ' \
+               'waited for downloads = %.1f s' % (
+                   self.files_downloaded, self.bytes_downloaded / 1e9,
+                   self.bytes_downloaded / 1e6 / self.download_seconds if self.download_seconds else 0.0,
+                   self.files_reused, self.budget_wait_seconds, self.input_wait_seconds)
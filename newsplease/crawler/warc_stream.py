@@ -0,0 +1,126 @@
+"""
+Streaming of WARC files over HTTP. A WARC file of CC-NEWS is about 1 GB large; instead of downloading it completely
+before its records are extracted, an HttpStream hands the body of the HTTP response to the ArchiveIterator while it is
+downloaded, so that the file does not need to be staged on disk. If the connection breaks, the download is resumed at
+the current position with a range request. Optionally, the data is written to a local file as it is read (tee), which
+is kept only once the stream was read to its end, so that the file can be reused later.
+"""
+import http.client
+import logging
+import os
+import time
+
+from six.moves import urllib
+
+LOGGER = logging.getLogger(__name__)
+
+
+class HttpStream(object):
+    def __init__(self, url, tee_path=None, retries=5, timeout=60, progress_callback=None):
+        """
+        Opens the connection.
+        :param url: The URL of the file
+        :param tee_path: path of a local file to which the data is written as it is read, None to keep it in memory
+            only. While the stream is read, the data is written to tee_path + '.part', which is renamed to tee_path
+            once the end of the stream is reached, or removed if the stream is closed before.
+        :param retries: number of consecutive failed attempts to resume a broken connection before the error is raised
+        :param timeout: timeout of the connection in seconds
+        :param progress_callback: function called with the number of bytes read so far and the size of the file (None
+            if unknown) after each read
+        """
+        self.url = url
+        self.tee_path = tee_path
+        self.retries = retries
+        self.timeout = timeout
+        self.progress_callback = progress_callback
+        # number of bytes read so far, and the size of the file if the server sent it
+        self.position = 0
+        self.size = None
+        self.complete = False
+        self.__response = None
+        self.__tee = None
+
+        self.__connect()
+        if tee_path is not None:
+            self.__tee = open(tee_path + '.part', 'wb')
+
+    def __connect(self):
+        """
+        Opens the connection, at the current position if the stream was read before.
+        """
+        request = urllib.request.Request(self.url)
+        if self.position:
+            request.add_header('Range', 'bytes=%i-' % self.position)
+        response = urllib.request.urlopen(request, timeout=self.timeout)
+        if self.position and response.getcode() != 206:
+            # the server ignored the range, the data that was already read is skipped
+            skip = self.position
+            while skip > 0:
+                skipped = len(response.read(min(skip, 1 << 20)))
+                if not skipped:
+                    raise http.client.IncompleteRead(b'', skip)
+                skip -= skipped
+        if self.size is None:
+            content_length = response.headers.get('Content-Length')
+            self.size = int(content_length) if content_length else None
+        self.__response = response
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes. A broken connection is resumed.
+        :param size: maximum number of bytes, -1 for the rest of the file
+        :return: bytes, empty at the end of the file
+        """
+        attempt = 0
+        while True:
+            try:
+                if self.__response is None:
+                    self.__connect()
+                data = self.__response.read(size)
+                if not data and size != 0 and self.size is not None and self.position < self.size:
+                    raise http.client.IncompleteRead(b'', self.size - self.position)
+                break
+            except (OSError, http.client.HTTPException) as error:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                LOGGER.warning('reading %s failed at byte %i (%s), resuming (attempt %i of %i)', self.url,
+                               self.position, error, attempt, self.retries)
+                if self.__response is not None:
+                    self.__response.close()
+                    self.__response = None
+                time.sleep(min(2 ** attempt, 30))
+
+        if data:
+            self.position += len(data)
+            if self.__tee is not None:
+                self.__tee.write(data)
+            if self.progress_callback is not None:
+                self.progress_callback(self.position, self.size)
+        elif size != 0 and not self.complete:
+            self.complete = True
+            if self.__tee is not None:
+                self.__tee.close()
+                self.__tee = None
+                os.replace(self.tee_path + '.part', self.tee_path)
+        return data
+
+    def close(self):
+        """
+        Closes the connection. The local file of an incomplete stream is removed.
+        """
+        if self.__response is not None:
+            self.__response.close()
+        if self.__tee is not None:
+            self.__tee.close()
+            self.__tee = None
+            try:
+                os.remove(self.tee_path + '.part')
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -49,6 +49,12 @@ my_local_download_dir_warc = './cc_download_warc/'
 my_local_download_dir_article = './cc_download_articles/'
 # hosts (if None or empty list, any host is OK)
 my_filter_valid_hosts = []  # example: ['elrancaguino.cl']
+# hosts whose articles are discarded, including their subdomains, even if they are in my_filter_valid_hosts
+my_filter_excluded_hosts = []  # example: ['blogs.elrancaguino.cl']
+# how hosts are matched: 'exact' (the host only), 'subdomain' (the host and its subdomains, e.g., elrancaguino.cl
+# matches www.elrancaguino.cl) or 'registered_domain' (all hosts of the same registered domain, e.g., www.bbc.co.uk
+# matches news.bbc.co.uk)
+my_filter_host_match = 'subdomain'
 # start date (if None, any date is OK as start date), as datetime
 my_filter_start_date = None  # datetime.datetime(2016, 1, 1)
 # end date (if None, any date is OK as end date), as datetime
@@ -62,6 +68,12 @@ my_warc_files_start_date = None # example: datetime.datetime(2020, 3, 1)
 my_warc_files_end_date = None # example: datetime.datetime(2020, 3, 2)
 # if date filtering is strict and news-please could not detect the date of an article, the article will be discarded
 my_filter_strict_date = True
+# languages as ISO 639-1 codes (if None or empty list, any language is OK), example: ['en', 'de']
+my_filter_valid_languages = None
+# if True, records are dropped before their article is extracted if cheap signals (HTTP status and content type, host,
+# dates in the URL and in the meta tags, <html lang>) show that the filters above would discard them anyway, which
+# makes crawls with narrow filters much faster. A few articles that the filters would keep may be dropped, though
+my_prefilter = False
 # if True, the script checks whether a file has been downloaded already and uses that file instead of downloading
 # again. Note that there is no check whether the file has been downloaded completely or is valid!
 my_reuse_previously_downloaded_files = True
@@ -84,6 +96,58 @@ my_continue_process = True
 # do not contain any images, so that news-please will crawl the current image from
 # the articles online webpage, if this option is enabled.
 my_fetch_images = False
+# fields of the articles you need, e.g., ['title', 'date_publish', 'language']. Extraction steps that only contribute to
+# other fields are skipped, which makes metadata-only crawls considerably faster. If None, all fields are extracted.
+my_fields = None
+# if True, fields that a page describes consistently in its structured metadata (JSON-LD, OpenGraph, Twitter cards,
+# Dublin Core) are taken from there, and the slower extractors are only run for the remaining fields
+my_structured_data = False
+# path of a JSON file in which the usual language of each domain is learned and kept, e.g., 'domain_priors.json'. Pages
+# from domains with a learned language are only checked on a short sample instead of running the full language
+# detection. If None, the language of each page is detected
+my_domain_priors_path = None
+# path of an SQLite database in which extraction results are cached, e.g., 'extractions.sqlite'. Pages that occur in
+# several WARC files with the same URL are then extracted only once. If None, every page is extracted
+my_extraction_cache_path = None
+# path of an SQLite database with fingerprints of the extracted articles, e.g., 'near_duplicates.sqlite'. Articles whose
+# maintext is a near-duplicate of an earlier article (e.g., the same wire story on several sites) are then discarded, or
+# kept and tagged with the same cluster_id if my_keep_near_duplicates is True. If None, all articles are kept
+my_near_duplicate_index_path = None
+my_keep_near_duplicates = False
+# if True, the layout of each domain is learned from the first articles of the domain, and further articles are
+# extracted with the learned templates, which is much faster. The templates are kept in my_domain_priors_path if set
+my_templates = False
+# if True, scripts, styles, SVG graphics and base64-encoded images are removed from the pages before they are parsed,
+# which speeds up the extraction of large pages. JSON-LD and meta tags are kept
+my_slim_html = False
+# maximum size of a page in bytes, larger pages are cut before they are parsed, e.g., 1000000. If None, pages are kept
+# whole
+my_max_html_bytes = None
+# maximum time in seconds spent on the extractors of a page and on a single extractor, e.g., 30 and 10. Extractors that
+# exceed it are abandoned and the fields are chosen from the results of the other extractors, so that pathological
+# pages do not stall the extraction. If None, there is no limit
+my_document_time_budget = None
+my_extractor_time_budget = None
+# if True, the time budgets are measured in CPU time instead of wall-clock time
+my_cpu_time_budget = False
+# directory to which pages whose extractors exceeded their time budget are written for later replay, e.g.,
+# './cc_quarantine/'. If None, only their URLs are logged
+my_quarantine_dir = None
+# if True, the articles of each WARC file are extracted while it is downloaded instead of downloading it first, so that
+# no local disk space is needed (unless my_delete_warc_after_extraction is False, then the file is kept)
+my_stream_warc = False
+# if greater than 0, the WARC files are downloaded in the background, up to this number of files ahead, while the
+# extraction processes extract the files that are already downloaded. Cannot be used together with my_stream_warc
+my_prefetch_warc_files = 0
+# maximum number of bytes of the WARC files downloaded ahead (a WARC file has about 1 GB), e.g., 10e9, None for no limit
+my_prefetch_max_bytes = None
+# number of WARC files downloaded concurrently when prefetching
+my_number_of_download_threads = 2
+# if greater than 1, the records of each WARC file are extracted by this number of processes, which uses all cores when
+# only a few WARC files are extracted. Requires my_number_of_extraction_processes to be 1
+my_number_of_record_processes = 1
+# if True, the record processes read the records from the local WARC file themselves instead of receiving them
+my_record_index = False
 ############ END YOUR CONFIG #########
 
 
@@ -170,11 +234,15 @@ def main():
     commoncrawl_crawler.crawl_from_commoncrawl(on_valid_article_extracted,
                                                callback_on_warc_completed=callback_on_warc_completed,
                                                valid_hosts=my_filter_valid_hosts,
+                                               excluded_hosts=my_filter_excluded_hosts,
+                                               host_match=my_filter_host_match,
                                                start_date=my_filter_start_date,
                                                end_date=my_filter_end_date,
                                                warc_files_start_date=my_warc_files_start_date,
                                                warc_files_end_date=my_warc_files_end_date,
                                                strict_date=my_filter_strict_date,
+                                               valid_languages=my_filter_valid_languages,
+                                               prefilter=my_prefilter,
                                                reuse_previously_downloaded_files=my_reuse_previously_downloaded_files,
                                                local_download_dir_warc=my_local_download_dir_warc,
                                                continue_after_error=my_continue_after_error,
@@ -183,7 +251,26 @@ def main():
                                                log_level=my_log_level,
                                                delete_warc_after_extraction=my_delete_warc_after_extraction,
                                                continue_process=True,
-                                               fetch_images=my_fetch_images)
+                                               fetch_images=my_fetch_images,
+                                               fields=my_fields,
+                                               structured_data=my_structured_data,
+                                               domain_priors_path=my_domain_priors_path,
+                                               extraction_cache_path=my_extraction_cache_path,
+                                               near_duplicate_index_path=my_near_duplicate_index_path,
+                                               keep_near_duplicates=my_keep_near_duplicates,
+                                               templates=my_templates,
+                                               slim_html=my_slim_html,
+                                               max_html_bytes=my_max_html_bytes,
+                                               document_time_budget=my_document_time_budget,
+                                               extractor_time_budget=my_extractor_time_budget,
+                                               cpu_time_budget=my_cpu_time_budget,
+                                               quarantine_dir=my_quarantine_dir,
+                                               stream_warc=my_stream_warc,
+                                               prefetch_warc_files=my_prefetch_warc_files,
+                                               prefetch_max_bytes=my_prefetch_max_bytes,
+                                               number_of_download_threads=my_number_of_download_threads,
+                                               number_of_record_processes=my_number_of_record_processes,
+                                               record_index=my_record_index)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+"""
+Helper for parsing the date strings found in articles and WARC records. Most of these strings are ISO-8601 (meta
+tags, JSON-LD, WARC headers, the output of the extractors) or RFC-822 (feeds, HTTP headers) dates, which are parsed
+by strict regular expressions. All other strings are handed to dateutil, which understands almost any format but is
+comparatively slow. Results are kept in a bounded LRU cache keyed by the raw string, since the same strings occur
+over and over again, e.g., the download date of all records of a WARC file.
+"""
+import datetime
+import re
+from functools import lru_cache
+
+from dateutil import parser, tz
+
+# to improve performance, regex statements are compiled only once per module
+re_iso_8601 = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?'
+    r'\s*(Z|[+-]\d{2}:?\d{2})?'
+)
+re_rfc_822 = re.compile(
+    r'(?:(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun), )?(\d{1,2}) (Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) (\d{4}) '
+    r'(\d{2}):(\d{2})(?::(\d{2}))?(?: (GMT|UTC|Z|[+-]\d{4}))?'
+)
+
+MONTHS = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6, 'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10,
+          'Nov': 11, 'Dec': 12}
+
+# number of distinct date strings whose result is kept
+CACHE_SIZE = 16384
+
+# the format in which the extractors store dates
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _timezone(designator):
+    """
+    Converts a UTC offset like Z, +02:00 or -0500 into a tzinfo.
+    :param designator:
+    :return: tzinfo, None if no designator is given
+    """
+    if designator is None:
+        return None
+    if designator in ('Z', 'GMT', 'UTC'):
+        return tz.tzutc()
+    sign = -1 if designator[0] == '-' else 1
+    digits = designator[1:].replace(':', '')
+    offset = sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+    if offset == 0:
+        return tz.tzutc()
+    return tz.tzoffset(None, offset)
+
+
+def _parse_fast(date_string):
+    """
+    Parses ISO-8601 and RFC-822 dates.
+    :param date_string:
+    :return: datetime, None if the string is in neither format or its values are out of range
+    """
+    match = re_iso_8601.fullmatch(date_string)
+    if match:
+        year, month, day, hour, minute, second, fraction, designator = match.groups()
+        microsecond = int(fraction[:6].ljust(6, '0')) if fraction else 0
+    else:
+        match = re_rfc_822.fullmatch(date_string)
+        if not match:
+            return None
+        day, month, year, hour, minute, second, designator = match.groups()
+        month = MONTHS[month]
+        microsecond = 0
+
+    try:
+        return datetime.datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                                 microsecond, tzinfo=_timezone(designator))
+    except ValueError:
+        # e.g., the 30th of February, dateutil reports these
+        return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_cached(date_string):
+    """
+    Parses a date string, first with the strict parsers, then with dateutil.
+    :param date_string:
+    :return: datetime, None if the string cannot be parsed
+    """
+    date = _parse_fast(date_string.strip())
+    if date is not None:
+        return date
+    try:
+        return parser.parse(date_string)
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse(date_string):
+    """
+    Parses a date string into a datetime, like dateutil.parser.parse. Other types than str, e.g., bytes, are handed
+    to dateutil as they are.
+    :param date_string:
+    :return: datetime
+    :raises ValueError: if the string cannot be parsed
+    """
+    if not isinstance(date_string, str):
+        # let dateutil report the error as before
+        return parser.parse(date_string)
+    date = _parse_cached(date_string)
+    if date is None:
+        raise ValueError('Unknown date format: %s' % date_string)
+    return date
+
+
+def normalize(date):
+    """
+    Converts a date into the form in which news-please carries publishing dates: a naive datetime with the local time
+    of the source, to the second.
+    :param date: A date string or a datetime
+    :return: datetime, None if the string cannot be parsed
+    """
+    try:
+        if not isinstance(date, datetime.datetime):
+            date = parse(date)
+        return date.replace(microsecond=0, tzinfo=None)
+    except Exception:
+        return None
+
+
+def to_string(date):
+    """
+    Formats a date the way news-please stores dates, e.g., in JSON files or Elasticsearch. Values that are no datetime
+    are returned as they are.
+    :param date:
+    :return: A string like 2019-05-17 14:30:00
+    """
+    if isinstance(date, datetime.datetime):
+        return date.strftime(DATE_FORMAT)
+    return date
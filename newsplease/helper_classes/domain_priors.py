@@ -0,0 +1,206 @@
+"""
+Per-domain priors for properties that hardly vary within a domain, such as the language and the charset of its
+pages. After a domain has shown the same value in min_observations consecutive documents, that value becomes the
+prior of the domain. Later documents of the domain are then only checked against the prior with a cheap verification
+(e.g., the language of a short text sample) instead of running the full detection. A failed verification falls back to
+the full detection, whose result restarts the learning, so that domains with mixed values never get a prior.
+
+Priors whose verification can fail for single documents, like the extraction templates of a domain, are not dropped at
+the first failure. Instead, each failure takes back several observations (see reject), so that a prior is dropped only
+when its failure rate rises.
+
+The priors are kept in memory and can be loaded from and saved to a JSON snapshot, e.g., to share them between the
+WARC files of a CommonCrawl run.
+"""
+import json
+import logging
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, where concurrent saves are not serialized
+    fcntl = None
+
+LOGGER = logging.getLogger(__name__)
+
+LANGUAGE = 'language'
+ENCODING = 'encoding'
+# prefix of the kinds of the extraction templates, one kind per field, e.g., 'template:text'
+TEMPLATE = 'template'
+
+
+class DomainPriors(object):
+    def __init__(self, min_observations=5, path=None, max_observations=20):
+        """
+        :param min_observations: number of consecutive documents of a domain with the same value after which the value
+            becomes the prior of the domain
+        :param path: path of a JSON snapshot, loaded if it exists and written by save()
+        :param max_observations: observations are counted up to this number, so that a prior that was confirmed by
+            many documents is still dropped after a few failures, see reject
+        """
+        self.min_observations = min_observations
+        self.max_observations = max_observations
+        self.path = path
+        # kind (language, encoding) -> domain -> [value, number of consecutive documents with this value]
+        self.observations = {}
+        # kind -> [hits, misses, documents of domains without prior]
+        self.counters = {}
+        # (kind, domain) of the observations changed since the last call of take_changes
+        self.changed = set()
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def domain(source_domain):
+        """
+        Normalizes the source_domain of an item, which may be bytes.
+        :param source_domain:
+        :return: A string, None if no domain is given
+        """
+        if isinstance(source_domain, bytes):
+            source_domain = source_domain.decode('utf-8', errors='replace')
+        return source_domain or None
+
+    def get(self, kind, domain):
+        """
+        Returns the prior of a domain.
+        :param kind: LANGUAGE or ENCODING
+        :param domain:
+        :return: The learned value, None if the domain has no prior yet
+        """
+        observation = self.observations.get(kind, {}).get(domain)
+        if observation is not None and observation[1] >= self.min_observations:
+            return observation[0]
+        return None
+
+    def observe(self, kind, domain, value):
+        """
+        Records the value that the full detection found for a document of a domain.
+        :param kind: LANGUAGE or ENCODING
+        :param domain:
+        :param value:
+        :return:
+        """
+        if domain is None or value is None:
+            return
+        domains = self.observations.setdefault(kind, {})
+        observation = domains.get(domain)
+        if observation is not None and observation[0] == value:
+            observation[1] = min(observation[1] + 1, self.max_observations)
+        else:
+            domains[domain] = [value, 1]
+        self.changed.add((kind, domain))
+
+    def reject(self, kind, domain, penalty):
+        """
+        Records that the value learned for a domain failed for a document. Each failure takes back penalty
+        observations; the prior is dropped once fewer than min_observations remain, i.e., when more than about
+        1 / (1 + penalty) of the documents fail, and has to be learned again afterwards.
+        :param kind: e.g., a TEMPLATE kind
+        :param domain:
+        :param penalty: number of observations that a failure outweighs
+        :return:
+        """
+        observation = self.observations.get(kind, {}).get(domain)
+        if observation is not None:
+            observation[1] -= penalty
+            if observation[1] <= 0:
+                del self.observations[kind][domain]
+            self.changed.add((kind, domain))
+
+    def record(self, kind, hit):
+        """
+        Counts a document for which the prior was consulted.
+        :param kind: LANGUAGE, ENCODING or a TEMPLATE kind
+        :param hit: True if the prior was verified, False if the verification failed, None if the domain had no prior
+        :return:
+        """
+        counters = self.counters.setdefault(kind, [0, 0, 0])
+        counters[0 if hit else 1 if hit is not None else 2] += 1
+
+    def report(self):
+        """
+        Summarizes how often the priors were used.
+        :return: A string like "language: hits = 80, misses = 2, no prior = 18"
+        """
+        return '; '.join('%s: hits = %i, misses = %i, no prior = %i' % (kind, hits, misses, unknown)
+                         for kind, (hits, misses, unknown) in sorted(self.counters.items()))
+
+    def take_changes(self):
+        """
+        Returns the observations changed and the documents counted since the last call and forgets them, e.g., to send
+        them from a worker process to the main process, which merges them.
+        :return: (observations, counters): kind -> domain -> [value, number of documents], None for priors that were
+            dropped; the counters as in self.counters
+        """
+        observations = {}
+        for kind, domain in self.changed:
+            observations.setdefault(kind, {})[domain] = self.observations.get(kind, {}).get(domain)
+        counters = self.counters
+        self.changed = set()
+        self.counters = {}
+        return observations, counters
+
+    def merge(self, observations, counters=None):
+        """
+        Merges observations learned elsewhere, e.g., by another process, into the priors in memory. If both have the
+        same value for a domain, the larger number of documents is kept, since both may have counted the same documents;
+        otherwise the value with more documents wins.
+        :param observations: kind -> domain -> [value, number of documents], None to drop the prior of the domain
+        :param counters: counters to add to self.counters, see take_changes
+        :return:
+        """
+        for kind, domains in observations.items():
+            own_domains = self.observations.setdefault(kind, {})
+            for domain, observation in domains.items():
+                own_observation = own_domains.get(domain)
+                if observation is None:
+                    own_domains.pop(domain, None)
+                elif own_observation is not None and own_observation[0] == observation[0]:
+                    own_observation[1] = max(own_observation[1], observation[1])
+                elif own_observation is None or observation[1] >= own_observation[1]:
+                    own_domains[domain] = list(observation)
+        for kind, counts in (counters or {}).items():
+            own_counts = self.counters.setdefault(kind, [0, 0, 0])
+            for index, count in enumerate(counts):
+                own_counts[index] += count
+
+    def load(self, path):
+        """
+        Merges the priors of a snapshot into the priors in memory, see merge.
+        :param path:
+        :return:
+        """
+        try:
+            with open(path, encoding='utf-8') as snapshot:
+                observations = json.load(snapshot)
+        except (OSError, ValueError) as error:
+            LOGGER.warning('could not load domain priors from %s: %s', path, error)
+            return
+        self.merge(observations)
+
+    def save(self, path=None):
+        """
+        Writes the priors to a snapshot. The priors of the existing snapshot, e.g., learned by another process
+        meanwhile, are merged into the priors in memory first, see merge. Processes that save to the same snapshot
+        take turns by locking a sidecar file (path + '.lock'), so that none of them overwrites what another one saved
+        between its read and its write. The snapshot is replaced atomically, so that concurrent readers never see a
+        partially written file.
+        :param path: defaults to the path given at initialization
+        :return:
+        """
+        path = path or self.path
+        if path is None:
+            return
+        with open(path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if os.path.exists(path):
+                self.load(path)
+            directory = os.path.dirname(os.path.abspath(path))
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, delete=False) as snapshot:
+                json.dump(self.observations, snapshot)
+            os.replace(snapshot.name, path)
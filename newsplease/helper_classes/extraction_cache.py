@@ -0,0 +1,153 @@
+"""
+Persistent cache of extraction results. News archives contain many byte-identical pages, e.g., the same URL in several
+WARC files of CommonCrawl or repeated crawls of a site. The cache maps a hash of the page (its normalized HTML, URL,
+extractor list, requested fields and the news-please version) to the fields that the extractors produced for it, so
+that identical pages are extracted only once.
+
+The cache is an SQLite database in WAL mode, which several processes can read and write concurrently. It holds at most
+max_entries results; the least recently used results are evicted first.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import time
+
+try:
+    from importlib.metadata import version, PackageNotFoundError
+except ImportError:
+    version = None
+
+LOGGER = logging.getLogger(__name__)
+
+# the item fields that the Extractor sets and that are cached
+ARTICLE_ITEM_FIELDS = ('article_title', 'article_description', 'article_text', 'article_image', 'article_author',
+                       'article_publish_date', 'article_language')
+
+
+def _newsplease_version():
+    """
+    :return: The installed version of news-please, extraction results of other versions are not reused
+    """
+    if version is not None:
+        try:
+            return version('news-please')
+        except PackageNotFoundError:
+            pass
+    return 'unknown'
+
+
+NEWSPLEASE_VERSION = _newsplease_version()
+
+
+class ExtractionCache(object):
+    # number of results written by this process between two checks of the size of the cache
+    eviction_interval = 1000
+
+    def __init__(self, path, max_entries=100000):
+        """
+        :param path: path of the SQLite database, created if it does not exist
+        :param max_entries: maximum number of results kept
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        # the connection of the process that opened it, processes forked afterwards open their own
+        self.connection = None
+        self.pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['connection'] = None
+        state['pid'] = None
+        return state
+
+    def _connect(self):
+        """
+        Opens the database on first use in the current process.
+        :return: sqlite3.Connection
+        """
+        if self.connection is None or self.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS extractions '
+                               '(key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS extractions_accessed ON extractions (accessed)')
+            self.connection = connection
+            self.pid = os.getpid()
+        return self.connection
+
+    @staticmethod
+    def key(body, url, extractor_list, fields):
+        """
+        Computes the cache key of a page.
+        :param body: The HTML of the page, a string or bytes
+        :param url: The URL of the page, which the extractors use, e.g., for publishing dates and image URLs
+        :param extractor_list: The extractors of the Extractor
+        :param fields: The ArticleCandidate fields to extract, None for all fields
+        :return: A string, the hex digest
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8', errors='surrogatepass')
+        digest = hashlib.sha256()
+        for part in (NEWSPLEASE_VERSION, repr(list(extractor_list)),
+                     repr(sorted(fields)) if fields is not None else 'None', url or ''):
+            digest.update(part.encode('utf-8', errors='surrogatepass'))
+            digest.update(b'\0')
+        # leading and trailing whitespace does not change the extraction
+        digest.update(body.strip())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Looks up the extraction result of a page.
+        :param key: see key()
+        :return: A dict of the article fields of the item, None if the page is not cached
+        """
+        connection = self._connect()
+        row = connection.execute('SELECT value FROM extractions WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        connection.execute('UPDATE extractions SET accessed = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def put(self, key, fields):
+        """
+        Stores the extraction result of a page.
+        :param key: see key()
+        :param fields: A dict of the article fields of the item
+        :return:
+        """
+        connection = self._connect()
+        connection.execute('INSERT OR REPLACE INTO extractions (key, value, accessed) VALUES (?, ?, ?)',
+                           (key, pickle.dumps(fields, protocol=pickle.HIGHEST_PROTOCOL), time.time()))
+        self.puts += 1
+        if self.puts % self.eviction_interval == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used results if the cache holds more than max_entries results.
+        :return:
+        """
+        connection = self._connect()
+        entries = connection.execute('SELECT COUNT(*) FROM extractions').fetchone()[0]
+        if entries > self.max_entries:
+            connection.execute('DELETE FROM extractions WHERE key IN '
+                               '(SELECT key FROM extractions ORDER BY accessed LIMIT ?)',
+                               (entries - self.max_entries,))
+            LOGGER.debug('evicted %i results from %s', entries - self.max_entries, self.path)
+
+    def report(self):
+        """
+        :return: A string like "hits = 120, misses = 880 (12.0 %)"
+        """
+        lookups = self.hits + self.misses
+        return 'hits = %i, misses = %i (%.1f %%)' % (self.hits, self.misses,
+                                                    100.0 * self.hits / lookups if lookups else 0.0)
@@ -0,0 +1,111 @@
+"""
+Filtering of URLs by their hostname against large lists of hosts, e.g., tens of thousands of news domains. Instead of
+scanning the URL for each host of the list, a HostIndex parses the hostname of the URL once and looks up the hostname
+and each of its parent domains in a hash set, i.e., a handful of lookups per URL regardless of the size of the list.
+For news.example.co.uk, these are news.example.co.uk, example.co.uk, co.uk and uk.
+
+Three kinds of matches are supported:
+
+- exact: the hostname equals a host of the list
+- subdomain: the hostname equals a host of the list or is a subdomain of it, e.g., example.com matches example.com and
+  news.example.com, but not myexample.com
+- registered_domain: the hostname belongs to the registered domain of a host of the list, e.g., news.example.co.uk
+  matches sport.example.co.uk. The registered domains are determined with tldextract, using its bundled copy of the
+  public suffix list.
+
+Hosts in an exclude list take precedence over the valid hosts, e.g., to keep example.com but not blogs.example.com.
+"""
+from six.moves import urllib
+
+try:
+    import tldextract
+except ImportError:
+    tldextract = None
+
+EXACT = 'exact'
+SUBDOMAIN = 'subdomain'
+REGISTERED_DOMAIN = 'registered_domain'
+
+
+def hostname(url):
+    """
+    :param url: A URL, or a hostname
+    :return: The lowercased hostname of the URL without port and trailing dot, None if it has none
+    """
+    if '://' not in url:
+        url = '//' + url
+    try:
+        host = urllib.parse.urlsplit(url).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    return host.rstrip('.')
+
+
+class HostIndex(object):
+    def __init__(self, valid_hosts=None, excluded_hosts=None, match=SUBDOMAIN):
+        """
+        :param valid_hosts: list of hosts (or URLs), one of which the hostname of a URL has to match, None or empty for
+            any host
+        :param excluded_hosts: list of hosts (or URLs), none of which the hostname of a URL may match, None or empty to
+            exclude no host
+        :param match: EXACT, SUBDOMAIN or REGISTERED_DOMAIN, see above. The excluded hosts are always matched with
+            their subdomains.
+        """
+        if match not in (EXACT, SUBDOMAIN, REGISTERED_DOMAIN):
+            raise ValueError('unknown match: %s' % match)
+        if match == REGISTERED_DOMAIN and tldextract is None:
+            raise ImportError('matching registered domains requires tldextract')
+        self.match = match
+        self.valid_hosts = self.__index(valid_hosts or [], match)
+        self.excluded_hosts = self.__index(excluded_hosts or [], SUBDOMAIN)
+
+    @staticmethod
+    def __index(hosts, match):
+        """
+        :return: The set of the normalized hosts, their registered domains if match is REGISTERED_DOMAIN
+        """
+        if match == REGISTERED_DOMAIN:
+            extract = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+        index = set()
+        for host in hosts:
+            host = hostname(host.strip())
+            if host is None:
+                continue
+            if match == REGISTERED_DOMAIN:
+                parts = extract(host)
+                if parts.domain and parts.suffix:
+                    host = parts.domain + '.' + parts.suffix
+            index.add(host)
+        return index
+
+    @staticmethod
+    def __matches(host, index, exact):
+        """
+        :return: True if the host, or one of its parent domains unless exact, is in the index
+        """
+        if host in index:
+            return True
+        if exact:
+            return False
+        dot = host.find('.')
+        while dot >= 0:
+            host = host[dot + 1:]
+            if host in index:
+                return True
+            dot = host.find('.')
+        return False
+
+    def matches(self, url):
+        """
+        :param url: A URL, or a hostname
+        :return: True if the hostname of the URL matches one of the valid hosts (or no valid hosts are given) and none
+            of the excluded hosts
+        """
+        host = hostname(url) if url else None
+        if host is None:
+            return not self.valid_hosts
+        if self.excluded_hosts and self.__matches(host, self.excluded_hosts, False):
+            return False
+        return not self.valid_hosts or self.__matches(host, self.valid_hosts, self.match == EXACT)
@@ -0,0 +1,47 @@
+"""
+Modules that are imported on first use. The storage backends (MySQL, PostgreSQL, Elasticsearch, pandas) and Scrapy
+take most of the time and memory of importing newsplease, although extracting articles with NewsPlease.from_html or
+from_warc does not need them.
+"""
+import importlib
+
+
+class LazyModule(object):
+    """
+    Stands in for a module, which is imported when one of its attributes is accessed for the first time, e.g.,
+    pymysql = LazyModule('pymysql') at module level and pymysql.connect(...) in a method. Exceptions of the module
+    can be caught as usual, since except clauses are only evaluated once an exception was raised.
+    """
+
+    def __init__(self, name):
+        """
+        :param name: The absolute name of the module, e.g., 'scrapy.exceptions'
+        """
+        self.__name = name
+        self.__module = None
+
+    def load(self):
+        """
+        Imports the module, if this has not happened yet.
+        :return: The module
+        :raises ImportError: if the module is not installed
+        """
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name)
+        return self.__module
+
+    def available(self):
+        """
+        :return: True if the module can be imported
+        """
+        try:
+            self.load()
+            return True
+        except ImportError:
+            return False
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        return '<LazyModule %s%s>' % (self.__name, '' if self.__module is None else ' (imported)')
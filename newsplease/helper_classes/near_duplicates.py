@@ -0,0 +1,163 @@
+"""
+Near-duplicate detection of articles. Wire stories are published by many sites with small changes (a different byline,
+an added sentence, other captions), so that their texts are not identical but nearly so. Each text gets a 64-bit
+SimHash fingerprint of its word shingles; the fingerprints of texts that share most of their shingles differ in only a
+few bits.
+
+The NearDuplicateIndex finds, for a new fingerprint, an earlier fingerprint that differs in at most max_distance bits.
+Fingerprints are split into max_distance + 1 bands; two fingerprints within that distance agree in at least one band
+(pigeonhole principle), so only the fingerprints that share a band with the new one have to be compared. Every article
+is assigned to a cluster, whose id is the hex fingerprint of its first article. Near-duplicates are not added to the
+index themselves, so that a cluster does not drift away from its first article.
+
+The index is an SQLite database in WAL mode, which persists across runs and which several processes can use
+concurrently.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+
+FINGERPRINT_BITS = 64
+FINGERPRINT_MASK = (1 << FINGERPRINT_BITS) - 1
+
+# to improve performance, regex statements are compiled only once per module
+re_word = re.compile(r'\w+')
+
+
+def simhash(text, shingle_size=3):
+    """
+    Computes the SimHash fingerprint of a text. Each distinct shingle (sequence of shingle_size words) is hashed, and
+    each bit of the fingerprint is set if it is set in the majority of the shingle hashes.
+    :param text:
+    :param shingle_size: number of words per shingle
+    :return: An int of FINGERPRINT_BITS bits, None if the text has no words
+    """
+    words = re_word.findall(text.lower())
+    if not words:
+        return None
+    shingles = {' '.join(words[index:index + shingle_size])
+                for index in range(max(1, len(words) - shingle_size + 1))}
+    # blake2b instead of hash(), which differs between processes
+    bits = ['{:064b}'.format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8', errors='surrogatepass'),
+                                                            digest_size=8).digest(), 'big'))
+            for shingle in shingles]
+    majority = len(bits) / 2
+    # each column holds one bit position of all shingle hashes
+    return int(''.join('1' if column.count('1') > majority else '0' for column in zip(*bits)), 2)
+
+
+def hamming_distance(fingerprint_a, fingerprint_b):
+    """
+    :return: The number of bits in which the fingerprints differ
+    """
+    return bin(fingerprint_a ^ fingerprint_b).count('1')
+
+
+class NearDuplicateIndex(object):
+    def __init__(self, path=None, max_distance=3, min_words=20):
+        """
+        :param path: path of the SQLite database, created if it does not exist. None keeps the index in memory for
+            the lifetime of this object.
+        :param max_distance: maximum number of differing bits of the fingerprints of near-duplicates
+        :param min_words: texts with fewer words are not fingerprinted, their fingerprints are not meaningful
+        """
+        self.path = path
+        self.max_distance = max_distance
+        self.min_words = min_words
+        # (shift, mask) of each band of the fingerprint
+        number_of_bands = max_distance + 1
+        self.bands = []
+        start = 0
+        for band in range(number_of_bands):
+            width = FINGERPRINT_BITS // number_of_bands + (1 if band < FINGERPRINT_BITS % number_of_bands else 0)
+            self.bands.append((start, (1 << width) - 1))
+            start += width
+        self.articles = 0
+        self.duplicates = 0
+        # the connection of the process that opened it, processes forked afterwards open their own
+        self.connection = None
+        self.pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['connection'] = None
+        state['pid'] = None
+        return state
+
+    def _connect(self):
+        """
+        Opens the database on first use in the current process.
+        :return: sqlite3.Connection
+        """
+        if self.connection is None or self.pid != os.getpid():
+            connection = sqlite3.connect(self.path or ':memory:', timeout=60, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # one row per band of each fingerprint, the key combines the number of the band and its value
+            connection.execute('CREATE TABLE IF NOT EXISTS bands '
+                               '(key TEXT NOT NULL, fingerprint INTEGER NOT NULL, cluster TEXT NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS bands_key ON bands (key)')
+            self.connection = connection
+            self.pid = os.getpid()
+        return self.connection
+
+    def _band_keys(self, fingerprint):
+        return ['%i:%x' % (band, (fingerprint >> shift) & mask) for band, (shift, mask) in enumerate(self.bands)]
+
+    def fingerprint(self, text):
+        """
+        :param text: The maintext of an article
+        :return: The SimHash fingerprint of the text, None if the text is too short
+        """
+        if not text or len(text.split()) < self.min_words:
+            return None
+        return simhash(text)
+
+    def assign(self, text):
+        """
+        Assigns an article to the cluster of an earlier near-duplicate, or starts a new cluster.
+        :param text: The maintext of the article
+        :return: A tuple of the cluster id (None if the text is too short) and True if the article is a near-duplicate
+            of an earlier article
+        """
+        fingerprint = self.fingerprint(text)
+        if fingerprint is None:
+            return None, False
+        self.articles += 1
+        keys = self._band_keys(fingerprint)
+        # SQLite integers are signed
+        stored_fingerprint = fingerprint - (1 << FINGERPRINT_BITS) if fingerprint >> (FINGERPRINT_BITS - 1) \
+            else fingerprint
+
+        connection = self._connect()
+        # the lookup and the insertion are one transaction, so that concurrent processes do not both start a cluster
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            rows = connection.execute('SELECT fingerprint, cluster FROM bands WHERE key IN (%s)'
+                                      % ','.join('?' * len(keys)), keys).fetchall()
+            best = None
+            for candidate, cluster in rows:
+                distance = hamming_distance(fingerprint, candidate & FINGERPRINT_MASK)
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, cluster)
+            if best is None:
+                cluster = '%016x' % fingerprint
+                connection.executemany('INSERT INTO bands (key, fingerprint, cluster) VALUES (?, ?, ?)',
+                                       [(key, stored_fingerprint, cluster) for key in keys])
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        if best is None:
+            return cluster, False
+        self.duplicates += 1
+        return best[1], True
+
+    def report(self):
+        """
+        :return: A string like "near-duplicates = 120 of 1000 articles (12.0 %)"
+        """
+        return 'near-duplicates = %i of %i articles (%.1f %%)' % (
+            self.duplicates, self.articles, 100.0 * self.duplicates / self.articles if self.articles else 0.0)
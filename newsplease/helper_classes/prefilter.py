@@ -0,0 +1,168 @@
+"""
+Staged pre-filters that drop documents before their article is extracted. Filters on the publishing date, for
+example, are otherwise only applied once the full extractor ensemble has run, which is wasted on the majority of the
+documents of a crawl when the date range is narrow. A PreFilter checks the cheapest signals first and stops at the
+first stage that rejects a document:
+
+1. status: the HTTP status is not 2xx
+2. content_type: the Content-Type is not HTML
+3. host: the hostname of the URL does not pass the HostIndex
+4. url_date: the URL contains a date (e.g., /2019/05/17/) outside of the date range
+5. html_lang: the <html lang> attribute names none of the valid languages
+6. meta_date: the publishing date of the JSON-LD data or of a <meta> tag, found by a quick scan of the raw HTML, is
+   outside of the date range
+
+The signals are only hints: the publishing date chosen by the extractors may differ from the date in the URL, and
+pages declare a language that the language detection does not confirm. Dates are therefore only rejected if they are
+outside of the range by more than a tolerance, and documents without a signal always pass, so that the regular filters
+decide after the extraction.
+"""
+import collections
+import datetime
+import re
+
+from . import date_parser
+
+STAGES = ('status', 'content_type', 'host', 'url_date', 'html_lang', 'meta_date')
+
+# to improve performance, regex statements are compiled only once per module
+re_url_date = re.compile(r'(?<!\d)((?:19|20)\d{2})[/_.-](0?[1-9]|1[0-2])[/_.-](0?[1-9]|[12]\d|3[01])(?!\d)')
+re_html_lang = re.compile(rb'<html\b[^>]*?\slang\s*=\s*["\']?([A-Za-z]{2,3})\b', re.IGNORECASE)
+re_json_ld_date = re.compile(rb'"datePublished"\s*:\s*"([^"]{6,40})"')
+re_meta_tag = re.compile(rb'<meta\s[^>]*>', re.IGNORECASE)
+re_attribute = re.compile(rb'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+re_html_content_type = re.compile(r'html|xml', re.IGNORECASE)
+
+# <meta> tags whose content is the publishing date, a subset of the tags read by the date_extractor
+META_DATE_KEYS = {(b'property', b'article:published_time'), (b'itemprop', b'datepublished'), (b'name', b'pubdate'),
+                  (b'name', b'publishdate'), (b'name', b'dc.date.issued'), (b'name', b'date'),
+                  (b'name', b'published-date'), (b'name', b'article.published'), (b'name', b'date_published')}
+
+# number of bytes at the start of a document in which <html lang> and the <meta> tags are looked for
+HEAD_BYTES = 65536
+
+
+class PreFilter(object):
+    def __init__(self, host_index=None, start_date=None, end_date=None, languages=None,
+                 date_tolerance=datetime.timedelta(days=1)):
+        """
+        :param host_index: a HostIndex (helper_classes.host_index) with the valid and excluded hosts, None for any host
+        :param start_date: documents published before this datetime are dropped, None for no limit
+        :param end_date: documents published after this datetime are dropped, None for no limit
+        :param languages: list of ISO 639-1 codes of the languages to keep, None or empty for any language
+        :param date_tolerance: dates are only rejected if they are outside of the range by more than this timedelta
+        """
+        self.host_index = host_index
+        self.start_date = start_date - date_tolerance if start_date is not None else None
+        self.end_date = end_date + date_tolerance if end_date is not None else None
+        self.languages = set(language.lower() for language in languages) if languages else None
+        self.check_dates = start_date is not None or end_date is not None
+
+        self.documents = 0
+        # number of documents dropped by each stage
+        self.dropped = collections.Counter()
+
+    def check(self, url, body=None, status=None, content_type=None):
+        """
+        Runs the stages on a document until one of them rejects it.
+        :param url: The URL of the document
+        :param body: The raw HTML (bytes), None to skip the stages that need it
+        :param status: The HTTP status, None if unknown. A status that is not a number counts as unknown.
+        :param content_type: The Content-Type header, None if unknown
+        :return: The name of the stage that rejected the document, None if it passed all stages
+        """
+        self.documents += 1
+        stage = self._first_rejecting_stage(url or '', body, status, content_type)
+        if stage is not None:
+            self.dropped[stage] += 1
+        return stage
+
+    def _first_rejecting_stage(self, url, body, status, content_type):
+        status = self._status_code(status)
+        if status is not None and not 200 <= status < 300:
+            return 'status'
+        if content_type and not re_html_content_type.search(content_type):
+            return 'content_type'
+        if self.host_index is not None and not self.host_index.matches(url):
+            return 'host'
+        if self.check_dates:
+            match = re_url_date.search(url)
+            if match and not self._within_range(self._url_date(match)):
+                return 'url_date'
+        if body is None:
+            return None
+
+        head = body[:HEAD_BYTES]
+        if self.languages:
+            match = re_html_lang.search(head)
+            if match and match.group(1).decode('ascii').lower() not in self.languages:
+                return 'html_lang'
+        if self.check_dates and not self._within_range(self._meta_date(body, head)):
+            return 'meta_date'
+        return None
+
+    @staticmethod
+    def _status_code(status):
+        """
+        :return: The HTTP status as int, None if it is unknown or malformed, e.g., the reason phrase of a status line
+            without code
+        """
+        try:
+            return int(status)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _url_date(match):
+        """
+        :return: The date of a match of re_url_date as datetime, None if it is no valid date
+        """
+        try:
+            return datetime.datetime(*(int(group) for group in match.groups()))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _meta_date(body, head):
+        """
+        Looks for the publishing date in the JSON-LD data and the <meta> tags.
+        :param body: The raw HTML
+        :param head: The start of the raw HTML
+        :return: datetime, None if no date was found
+        """
+        match = re_json_ld_date.search(body)
+        if match:
+            date = date_parser.normalize(match.group(1).decode('ascii', errors='replace'))
+            if date is not None:
+                return date
+        for meta_tag in re_meta_tag.finditer(head):
+            # one of the two values is empty, depending on the quotes of the attribute
+            attributes = {name.lower(): value1 or value2
+                          for name, value1, value2 in re_attribute.findall(meta_tag.group(0))}
+            if b'content' not in attributes:
+                continue
+            for attribute in (b'property', b'itemprop', b'name'):
+                if (attribute, attributes.get(attribute, b'').lower()) in META_DATE_KEYS:
+                    return date_parser.normalize(attributes[b'content'].strip().decode('ascii', errors='replace'))
+        return None
+
+    def _within_range(self, date):
+        """
+        :return: False if the date is outside of the range including the tolerance, True otherwise or if no date is
+            given
+        """
+        if date is None:
+            return True
+        if self.start_date is not None and date < self.start_date:
+            return False
+        if self.end_date is not None and date > self.end_date:
+            return False
+        return True
+
+    def report(self):
+        """
+        :return: A string like "dropped = 120 of 1000 documents (status = 3, host = 80, url_date = 37)"
+        """
+        return 'dropped = %i of %i documents (%s)' % (
+            sum(self.dropped.values()), self.documents,
+            ', '.join('%s = %i' % (stage, self.dropped[stage]) for stage in STAGES if self.dropped[stage]) or '-')
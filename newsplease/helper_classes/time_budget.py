@@ -0,0 +1,201 @@
+"""
+Time budget of the extraction of a document. Some pathological pages make readability or newspaper run for minutes,
+which stalls the whole worker, e.g., a CommonCrawl extraction process or the Scrapy pipeline. A TimeBudget limits the
+time spent on each document and on each extractor. An extractor that exceeds its budget is abandoned and the comparers
+choose from the candidates of the remaining extractors; once the budget of the document is used up, the remaining
+extractors are skipped.
+
+The extractors are interrupted with an interval timer (SIGALRM, or SIGPROF for CPU time), which is only available on
+Unix and in the main thread. Elsewhere, an extractor cannot be interrupted; its overrun is recorded and the remaining
+extractors are skipped. Note that long calls into C code, e.g., parsing a huge document with lxml, are only
+interrupted once they return.
+
+The URLs of the documents with abandoned extractors are logged. If a quarantine directory is given, their HTML is
+written to it, together with an index (quarantine.jsonl), so that they can be replayed later:
+
+for html, url, download_date in read_quarantine('quarantine'):
+    article = NewsPlease.from_html(html, url=url)
+"""
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import os
+import signal
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+QUARANTINE_INDEX = 'quarantine.jsonl'
+
+
+class ExtractionTimeout(BaseException):
+    """
+    Raised within an extractor that exceeds its time budget. It derives from BaseException, so that the broad except
+    clauses within the extractors and their libraries do not swallow it.
+    """
+    pass
+
+
+class TimeBudget(object):
+    def __init__(self, document_seconds=None, extractor_seconds=None, quarantine_dir=None, cpu_time=False):
+        """
+        :param document_seconds: maximum time spent on the extractors of a document, None for no limit
+        :param extractor_seconds: maximum time spent on a single extractor, None for no limit
+        :param quarantine_dir: directory to which the HTML of documents with abandoned extractors is written, None to
+            only log their URLs
+        :param cpu_time: if True, the budgets are measured in CPU time of the process instead of wall-clock time, so
+            that waiting, e.g., for a busy machine, does not count
+        """
+        self.document_seconds = document_seconds
+        self.extractor_seconds = extractor_seconds
+        self.quarantine_dir = quarantine_dir
+        self.cpu_time = cpu_time
+        if cpu_time:
+            self._clock = time.process_time
+            self._timer, self._signal = getattr(signal, 'ITIMER_PROF', None), getattr(signal, 'SIGPROF', None)
+        else:
+            self._clock = time.perf_counter
+            self._timer, self._signal = getattr(signal, 'ITIMER_REAL', None), getattr(signal, 'SIGALRM', None)
+
+        self.documents = 0
+        self.documents_over_budget = 0
+        # number of documents on which each extractor was abandoned, and the most recent offending URLs
+        self.abandoned = collections.Counter()
+        self.offenders = collections.deque(maxlen=100)
+
+        # state of the current document: its deadline and the time taken by each abandoned extractor, None for the
+        # extractors that were skipped since the budget of the document was used up
+        self._deadline = None
+        self._overruns = {}
+        self._armed = False
+
+    def start_document(self):
+        """
+        Starts the budget of the next document.
+        """
+        self.documents += 1
+        self._overruns = {}
+        self._deadline = self._clock() + self.document_seconds if self.document_seconds is not None else None
+
+    def over_budget(self):
+        """
+        :return: True if an extractor of the current document was abandoned or exceeded its budget
+        """
+        return bool(self._overruns)
+
+    def _interruptible(self):
+        """
+        :return: True if extractors can be interrupted, i.e., on Unix and in the main thread
+        """
+        return self._signal is not None and hasattr(signal, 'setitimer') \
+            and threading.current_thread() is threading.main_thread()
+
+    def _on_timer(self, signum, frame):
+        if self._armed:
+            self._armed = False
+            raise ExtractionTimeout()
+
+    def run(self, name, function, *arguments):
+        """
+        Runs an extractor of the current document within its budget.
+        :param name: The name of the extractor, for the statistics
+        :param function: The function to run, e.g., extractor.extract
+        :param arguments: The arguments of the function
+        :return: The result of the function, None if the extractor was abandoned or skipped
+        """
+        start = self._clock()
+        deadline = self._deadline
+        if self.extractor_seconds is not None and (deadline is None or start + self.extractor_seconds < deadline):
+            deadline = start + self.extractor_seconds
+        if deadline is None:
+            return function(*arguments)
+        if deadline <= start:
+            self._overruns[name] = None
+            return None
+
+        if not self._interruptible():
+            result = function(*arguments)
+            if self._clock() > deadline:
+                self._overruns[name] = self._clock() - start
+            return result
+
+        previous_handler = signal.signal(self._signal, self._on_timer)
+        try:
+            self._armed = True
+            signal.setitimer(self._timer, deadline - start)
+            result = function(*arguments)
+            self._armed = False
+            return result
+        except ExtractionTimeout:
+            self._overruns[name] = self._clock() - start
+            return None
+        finally:
+            self._armed = False
+            signal.setitimer(self._timer, 0)
+            signal.signal(self._signal, previous_handler)
+
+    def end_document(self, item):
+        """
+        Records the document if an extractor was abandoned or skipped.
+        :param item: The NewscrawlerItem of the document
+        """
+        if not self._overruns:
+            return
+        self.documents_over_budget += 1
+        self.abandoned.update(self._overruns.keys())
+        url = item['url']
+        self.offenders.append(url)
+        LOGGER.warning('time budget exceeded, abandoned %s: %s', ', '.join(
+            '%s (skipped)' % name if seconds is None else '%s (%.1f s)' % (name, seconds)
+            for name, seconds in sorted(self._overruns.items())), url)
+        if self.quarantine_dir is not None:
+            try:
+                self._quarantine(item)
+            except (OSError, ValueError) as error:
+                LOGGER.error('could not quarantine %s: %s', url, error)
+
+    def _quarantine(self, item):
+        """
+        Writes the HTML of the document to the quarantine directory and adds it to the index.
+        :param item: The NewscrawlerItem of the document
+        """
+        body = item['spider_response'].body
+        if isinstance(body, str):
+            body = body.encode('utf-8', errors='surrogatepass')
+        filename = hashlib.sha1(body).hexdigest() + '.html'
+        os.makedirs(self.quarantine_dir, exist_ok=True)
+        with open(os.path.join(self.quarantine_dir, filename), 'wb') as html_file:
+            html_file.write(body)
+        entry = {'url': item['url'], 'file': filename, 'download_date': item.get('download_date'),
+                 'quarantined': datetime.datetime.now().isoformat(), 'extractors': self._overruns}
+        # a single write of one line, so that the lines of several processes do not interleave
+        with open(os.path.join(self.quarantine_dir, QUARANTINE_INDEX), 'a', encoding='utf-8') as index_file:
+            index_file.write(json.dumps(entry, default=str) + '\n')
+
+    def report(self):
+        """
+        :return: A string like "over budget = 3 of 1000 documents, abandoned: newspaper = 1, readability = 2"
+        """
+        return 'over budget = %i of %i documents, abandoned: %s' % (
+            self.documents_over_budget, self.documents,
+            ', '.join('%s = %i' % count for count in sorted(self.abandoned.items())) or '-')
+
+
+def read_quarantine(quarantine_dir):
+    """
+    Reads the documents written to a quarantine directory by a TimeBudget, e.g., to replay their extraction.
+    :param quarantine_dir: The quarantine directory
+    :return: A generator yielding a (html, url, download_date) tuple for each quarantined document, which can be passed
+        to NewsPlease.from_html_batch
+    """
+    with open(os.path.join(quarantine_dir, QUARANTINE_INDEX), encoding='utf-8') as index_file:
+        for line in index_file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            with open(os.path.join(quarantine_dir, entry['file']), 'rb') as html_file:
+                html = html_file.read().decode('utf-8', errors='replace')
+            yield html, entry['url'], entry.get('download_date')
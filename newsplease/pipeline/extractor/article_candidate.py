@@ -2,12 +2,19 @@ class ArticleCandidate:
     """This is a helpclass to store the result of an article after it was extracted. Every implemented extractor
     returns an ArticleCanditate as result.
     """
-    url = None
-    title = None
-    description = None
-    text = None
-    topimage = None
-    author = None
-    publish_date = None
-    extractor = None
-    language = None
+    # one candidate is created per extractor and article, slots keep them small and fast to create
+    __slots__ = ('url', 'title', 'description', 'text', 'topimage', 'author', 'publish_date', 'extractor', 'language',
+                 'settled_fields')
+
+    def __init__(self):
+        self.url = None
+        self.title = None
+        self.description = None
+        self.text = None
+        self.topimage = None
+        self.author = None
+        self.publish_date = None
+        self.extractor = None
+        self.language = None
+        # the fields that the extractor settled, see AbstractExtractor.settled_fields
+        self.settled_fields = None
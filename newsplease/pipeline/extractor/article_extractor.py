@@ -1,3 +1,4 @@
+import collections
 import importlib
 import inspect
 import logging
@@ -5,6 +6,23 @@ import logging
 from .cleaner import Cleaner
 from .comparer.comparer import Comparer
 from .extractors.abstract_extractor import AbstractExtractor
+from .html_slimmer import HtmlSlimmer
+from .parsed_document import ParsedDocument
+from ...helper_classes.extraction_cache import ARTICLE_ITEM_FIELDS
+
+# fields of NewsArticle that are determined by the extractors, mapped to the respective fields of ArticleCandidate
+ARTICLE_FIELDS = {
+    'title': 'title',
+    'description': 'description',
+    'maintext': 'text',
+    'image_url': 'topimage',
+    'authors': 'author',
+    'date_publish': 'publish_date',
+    'language': 'language',
+}
+# fields of NewsArticle that are taken from the item and are therefore always available
+ITEM_FIELDS = ('date_download', 'date_modify', 'filename', 'localpath', 'source_domain', 'text', 'title_page',
+               'title_rss', 'url')
 
 
 class Extractor:
@@ -12,11 +30,35 @@ class Extractor:
     be initialized here and added to list_extractor.
     """
 
-    def __init__(self, extractor_list):
+    # initialized Extractors, shared within the process and keyed by class and extractor list
+    instances = {}
+
+    @classmethod
+    def get_instance(cls, extractor_list, slim_html=False, max_html_bytes=None):
+        """
+        Returns an initialized Extractor for the given extractor list. Initializing the extractors, the cleaner and
+        the comparers is expensive, hence each configuration is initialized only once per process and reused.
+
+        :param extractor_list: List of strings containing all extractors to be initialized.
+        :param slim_html: see __init__
+        :param max_html_bytes: see __init__
+        :return: An Extractor
+        """
+        key = (cls, tuple(extractor_list), slim_html, max_html_bytes)
+        extractor = cls.instances.get(key)
+        if extractor is None:
+            extractor = cls(extractor_list, slim_html=slim_html, max_html_bytes=max_html_bytes)
+            cls.instances[key] = extractor
+        return extractor
+
+    def __init__(self, extractor_list, slim_html=False, max_html_bytes=None):
         """
         Initializes all the extractors, comparers and the cleaner.
 
         :param extractor_list: List of strings containing all extractors to be initialized.
+        :param slim_html: if True, scripts (except JSON-LD), styles, SVG graphics and base64 data URIs are removed
+            from the HTML before it is parsed, see html_slimmer. The raw response of the item is not changed.
+        :param max_html_bytes: if set, larger documents are cut to this size before they are parsed
         """
         def proc_instance(instance):
             if instance is not None:
@@ -27,6 +69,13 @@ class Extractor:
                                " will be ignored: %s", extractor)
 
         self.log = logging.getLogger(__name__)
+        # the pre-processing of the HTML, its bytes saved are reported by html_slimmer.report()
+        self.html_slimmer = HtmlSlimmer(strip_payloads=slim_html, max_bytes=max_html_bytes) \
+            if slim_html or max_html_bytes else None
+        # the configuration, which is part of the keys of cached extraction results
+        self.extractor_names = list(extractor_list)
+        if self.html_slimmer is not None:
+            self.extractor_names.append(self.html_slimmer.key())
         self.extractor_list = []
         for extractor in extractor_list:
 
@@ -50,21 +99,130 @@ class Extractor:
         self.cleaner = Cleaner()
         self.comparer = Comparer()
 
-    def extract(self, item):
+        # per-run statistics: processed documents, documents for which a field settled by an extractor was not
+        # requested from a later extractor, and the number of documents in which each field was settled
+        self.documents = 0
+        self.fast_path_documents = 0
+        self.settled_field_documents = collections.Counter()
+        # whether the extractors loaded their resources, see AbstractExtractor.prepare
+        self.prepared = False
+
+    @staticmethod
+    def candidate_fields(fields):
+        """Translates names of NewsArticle fields into the names of the ArticleCandidate fields that have to be
+        extracted for them.
+
+        :param fields: An iterable of NewsArticle field names, e.g., ['title', 'date_publish'], or None for all fields.
+        :return: A set of ArticleCandidate field names, or None for all fields
+        """
+        if fields is None:
+            return None
+
+        candidate_fields = set()
+        for field in fields:
+            if field in ARTICLE_FIELDS:
+                candidate_fields.add(ARTICLE_FIELDS[field])
+            elif field not in ITEM_FIELDS:
+                raise ValueError('Unknown field: %s' % field)
+        return candidate_fields
+
+    def extract(self, item, fields=None, cache=None, time_budget=None):
         """Runs the HTML-response trough a list of initialized extractors, a cleaner and compares the results.
 
         :param item: NewscrawlerItem to be processed.
+        :param fields: An iterable of NewsArticle fields that are needed, e.g., ['title', 'date_publish']. Extractors,
+            cleaning steps and comparers that only contribute to other fields are skipped and these fields are set
+            to None. If None, all fields are extracted.
+        :param cache: An ExtractionCache (helper_classes.extraction_cache). If the same page was extracted before with
+            the same extractors, its results are taken from the cache instead of running the extractors.
+        :param time_budget: A TimeBudget (helper_classes.time_budget) that limits the time spent on the document and
+            on each extractor. Extractors that exceed it are abandoned and the article is chosen from the candidates
+            of the remaining extractors. Such results are not cached.
         :return: An updated NewscrawlerItem including the results of the extraction
         """
+        candidate_fields = self.candidate_fields(fields)
+
+        if cache is not None:
+            key = cache.key(item['spider_response'].body, item['url'], self.extractor_names, candidate_fields)
+            cached = cache.get(key)
+            if cached is not None:
+                for field in ARTICLE_ITEM_FIELDS:
+                    item[field] = cached[field]
+                return item
+            item = self._extract(item, candidate_fields, time_budget)
+            if time_budget is None or not time_budget.over_budget():
+                cache.put(key, {field: item[field] for field in ARTICLE_ITEM_FIELDS})
+            return item
+
+        return self._extract(item, candidate_fields, time_budget)
+
+    def _extract(self, item, candidate_fields, time_budget=None):
+        """Runs the extractors, the cleaner and the comparers, see extract.
+
+        :param item: NewscrawlerItem to be processed.
+        :param candidate_fields: A set of ArticleCandidate fields to extract, None for all fields
+        :param time_budget: A TimeBudget or None, see extract
+        :return: An updated NewscrawlerItem including the results of the extraction
+        """
+        if time_budget is not None:
+            if not self.prepared:
+                for extractor in self.extractor_list:
+                    extractor.prepare()
+                self.prepared = True
+            time_budget.start_document()
+
+        body = item['spider_response'].body
+        if self.html_slimmer is not None:
+            body = self.html_slimmer.slim(body)
+        # parse the body only once, all extractors work on the same document
+        item['parsed_document'] = ParsedDocument(body)
 
         article_candidates = []
 
+        # fields not yet settled by an earlier extractor, e.g., by the structured metadata of the document
+        open_fields = set(ARTICLE_FIELDS.values()) if candidate_fields is None else set(candidate_fields)
+        settled_fields = set()
+        fast_path = False
+
         for extractor in self.extractor_list:
-            article_candidate = extractor.extract(item)
+            if extractor.fields is None or (candidate_fields is None and len(open_fields) == len(ARTICLE_FIELDS)):
+                extractor_fields = open_fields
+                arguments = (item,)
+            else:
+                extractor_fields = open_fields.intersection(extractor.fields)
+                if settled_fields.intersection(extractor.fields):
+                    # the extractor is spared fields that it would have extracted otherwise
+                    fast_path = True
+                if not extractor_fields:
+                    continue
+                arguments = (item, extractor_fields)
+            if time_budget is None:
+                article_candidate = extractor.extract(*arguments)
+            else:
+                article_candidate = time_budget.run(extractor.name, extractor.extract, *arguments)
+                if article_candidate is None:
+                    # abandoned, the article is chosen from the candidates of the other extractors
+                    continue
             article_candidates.append(article_candidate)
 
-        article_candidates = self.cleaner.clean(article_candidates)
-        article = self.comparer.compare(item, article_candidates)
+            newly_settled_fields = extractor.settled_fields(article_candidate) & open_fields
+            settled_fields |= newly_settled_fields
+            open_fields -= newly_settled_fields
+
+        self.documents += 1
+        if fast_path:
+            self.fast_path_documents += 1
+        self.settled_field_documents.update(settled_fields)
+
+        article_candidates = self.cleaner.clean(article_candidates, candidate_fields)
+        article = self.comparer.compare(item, article_candidates, candidate_fields)
+
+        if time_budget is not None and time_budget.over_budget():
+            # the extractors do not learn from the results of an incomplete ensemble
+            time_budget.end_document(item)
+        else:
+            for extractor in self.extractor_list:
+                extractor.observe(item, article)
 
         item['article_title'] = article.title
         item['article_description'] = article.description
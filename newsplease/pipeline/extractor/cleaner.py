@@ -1,15 +1,40 @@
 # -*- coding: utf-8 -*-
+import datetime
 import re
 import sys
+from functools import lru_cache
 
 from lxml import html
 
+from ...helper_classes import date_parser
+
 # to improve performance, regex statements are compiled only once per module
 re_newline_spc = re.compile(r'(?<=\n)( )+')
 re_starting_whitespc = re.compile(r'^[ \t\n\r\f]*')
 re_multi_spc_tab = re.compile(r'[ \t]+(?=([ \t]))')
 re_double_newline = re.compile(r'[ \n]+(?=(\n))')
 re_ending_spc_newline = re.compile(r'[ \n]*$')
+# characters that lxml turns into something else: markup, entities, carriage returns, NUL, lone surrogates and the BOM
+re_markup = re.compile(u'[<&\r\x00\ud800-\udfff\ufeff]')
+# runs of whitespace that delete_whitespaces may change
+re_whitespace_run = re.compile(r'[ \t\n]{2,}')
+
+
+@lru_cache(maxsize=1024)
+def _clean_run(run):
+    """Applies the rules of Cleaner.delete_whitespaces_stepwise that concern the inside of the string to a run of
+    whitespace. Runs repeat a lot, hence the results are cached.
+
+    :param run: A string of spaces, tabs and newlines
+    :return: A string, the cleaned run
+    """
+    run = re_newline_spc.sub('', run)
+    run = re_multi_spc_tab.sub('', run)
+    return re_double_newline.sub('', run)
+
+
+def _clean_whitespace_run(match):
+    return _clean_run(match.group(0))
 
 
 class Cleaner:
@@ -20,13 +45,18 @@ class Cleaner:
     """
 
     def delete_tags(self, arg):
-        """Removes html-tags from extracted data.
+        """Removes html-tags from extracted data. Strings without markup, like most titles, authors and URLs, are not
+        parsed, since lxml would return their text unchanged.
 
         :param arg: A string, the string which shall be cleaned
         :return: A string, the cleaned string
         """
 
         if len(arg) > 0:
+            stripped = arg.strip()
+            # lxml rejects strings that consist of whitespace only, they take the slow path to behave alike
+            if stripped and re_markup.search(arg) is None:
+                return stripped
             try:
                 raw = html.fromstring(arg)
             except ValueError:
@@ -38,6 +68,21 @@ class Cleaner:
     def delete_whitespaces(self, arg):
         """Removes newlines, tabs and whitespaces at the beginning, the end and if there is more than one.
 
+        The rules of delete_whitespaces_stepwise only ever change runs of at least two spaces, tabs and newlines, and
+        each run independently of the others. Hence the string is stripped and each run is replaced in a single pass,
+        looking up the cleaned form of runs that occurred before.
+
+        :param arg: A string, the string which shell be cleaned
+        :return: A string, the cleaned string
+        """
+        arg = arg.lstrip(' \t\n\r\f')
+        arg = re_whitespace_run.sub(_clean_whitespace_run, arg)
+        return arg.rstrip(' \n')
+
+    @staticmethod
+    def delete_whitespaces_stepwise(arg):
+        """Applies the rules of delete_whitespaces one after another. This is the reference for delete_whitespaces.
+
         :param arg: A string, the string which shell be cleaned
         :return: A string, the cleaned string
         """
@@ -77,22 +122,40 @@ class Cleaner:
         else:
             return None
 
-    def clean(self, list_article_candidates):
+    def clean_date(self, arg):
+        """Extractors return dates as datetime objects, which need no cleaning. Strings, e.g., returned by custom
+        extractors, are cleaned and parsed.
+
+        :param arg: A datetime or a string
+        :return: A datetime, None if the string is no date
+        """
+        if arg is None or isinstance(arg, datetime.datetime):
+            return arg
+        return date_parser.normalize(self.do_cleaning(arg))
+
+    def clean(self, list_article_candidates, fields=None):
         """Iterates over each article_candidate and cleans every extracted data.
 
         :param list_article_candidates: A list, the list of ArticleCandidate-Objects which have been extracted
+        :param fields: A set of ArticleCandidate fields to clean, None to clean all fields
         :return: A list, the list with the cleaned ArticleCandidate-Objects
         """
         # Save cleaned article_candidates in results.
         results = []
 
         for article_candidate in list_article_candidates:
-            article_candidate.title = self.do_cleaning(article_candidate.title)
-            article_candidate.description = self.do_cleaning(article_candidate.description)
-            article_candidate.text = self.do_cleaning(article_candidate.text)
-            article_candidate.topimage = self.do_cleaning(article_candidate.topimage)
-            article_candidate.author = self.do_cleaning(article_candidate.author)
-            article_candidate.publish_date = self.do_cleaning(article_candidate.publish_date)
+            if fields is None or 'title' in fields:
+                article_candidate.title = self.do_cleaning(article_candidate.title)
+            if fields is None or 'description' in fields:
+                article_candidate.description = self.do_cleaning(article_candidate.description)
+            if fields is None or 'text' in fields:
+                article_candidate.text = self.do_cleaning(article_candidate.text)
+            if fields is None or 'topimage' in fields:
+                article_candidate.topimage = self.do_cleaning(article_candidate.topimage)
+            if fields is None or 'author' in fields:
+                article_candidate.author = self.do_cleaning(article_candidate.author)
+            if fields is None or 'publish_date' in fields:
+                article_candidate.publish_date = self.clean_date(article_candidate.publish_date)
 
             results.append(article_candidate)
 
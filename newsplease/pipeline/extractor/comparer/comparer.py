@@ -21,22 +21,31 @@ class Comparer:
         self.comparer_date = ComparerDate()
         self.comparer_language = ComparerLanguage()
 
-    def compare(self, item, article_candidates):
+    def compare(self, item, article_candidates, fields=None):
         """Compares the article candidates using the different submodules and saves the best results in
         new ArticleCandidate object
 
         :param item: The NewscrawlerItem related to the ArticleCandidates
         :param article_candidates: The list of ArticleCandidate-Objects which have been extracted
+        :param fields: A set of ArticleCandidate fields to compare, None to compare all fields. The other fields of
+            the result remain None.
         :return: An ArticleCandidate-object containing the best results
         """
 
         result = ArticleCandidate()
 
-        result.title = self.comparer_title.extract(item, article_candidates)
-        result.description = self.comparer_desciption.extract(item, article_candidates)
-        result.text = self.comparer_text.extract(item, article_candidates)
-        result.topimage = self.comparer_topimage.extract(item, article_candidates)
-        result.author = self.comparer_author.extract(item, article_candidates)
-        result.publish_date = self.comparer_date.extract(item, article_candidates)
-        result.language = self.comparer_language.extract(item, article_candidates)
+        if fields is None or 'title' in fields:
+            result.title = self.comparer_title.extract(item, article_candidates)
+        if fields is None or 'description' in fields:
+            result.description = self.comparer_desciption.extract(item, article_candidates)
+        if fields is None or 'text' in fields:
+            result.text = self.comparer_text.extract(item, article_candidates)
+        if fields is None or 'topimage' in fields:
+            result.topimage = self.comparer_topimage.extract(item, article_candidates)
+        if fields is None or 'author' in fields:
+            result.author = self.comparer_author.extract(item, article_candidates)
+        if fields is None or 'publish_date' in fields:
+            result.publish_date = self.comparer_date.extract(item, article_candidates)
+        if fields is None or 'language' in fields:
+            result.language = self.comparer_language.extract(item, article_candidates)
         return result
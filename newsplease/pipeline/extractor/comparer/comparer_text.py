@@ -4,6 +4,24 @@ import itertools
 class ComparerText():
     """This class compares the text of the list of ArticleCandidates and sends the result back to the Comparer."""
 
+    # The minimal number of words a text needs to have
+    min_number_words = 15
+
+    def score(self, words_a, words_b):
+        """Scores how much two texts agree. The score divides the number of words which are not in both texts by the
+        number of words which are in both texts and subtracts the result from 1. The closer to 1 the more similar they
+        are. Texts without common words get the lowest possible score.
+
+        :param words_a: A set, the words of the first text
+        :param words_b: A set, the words of the second text
+        :return: A float
+        """
+        intersection = len(words_a & words_b)
+        if intersection == 0:
+            return float('-inf')
+        symmetric_difference = len(words_a) + len(words_b) - 2 * intersection
+        return 1 - (symmetric_difference / (2 * intersection))
+
     def extract(self, item, article_candidate_list):
         """Compares the extracted texts.
 
@@ -13,18 +31,14 @@ class ComparerText():
         """
         list_text = []
 
-        # The minimal number of words a text needs to have
-        min_number_words = 15
-
-        # The texts of the article candidates and the respective extractors are saved in a tuple in list_text.
+        # The texts of the article candidates and the respective extractors are saved in a tuple in list_text,
+        # together with the words of the text, which are split only once. Texts that are shorter than
+        # min_number_words are left out.
         for article_candidate in article_candidate_list:
             if article_candidate.text != None:
-                list_text.append((article_candidate.text, article_candidate.extractor))
-
-        # Remove texts that are shorter than min_number_words.
-        for text_tuple in list_text:
-            if len(text_tuple[0].split()) < min_number_words:
-                list_text.remove(text_tuple)
+                words = article_candidate.text.split()
+                if len(words) >= self.min_number_words:
+                    list_text.append((article_candidate.text, article_candidate.extractor, words))
 
         # If there is no value in the list, return None.
         if len(list_text) == 0:
@@ -37,26 +51,15 @@ class ComparerText():
 
             # If there is more than one solution, do the following:
 
+            # Create the set of words of each text once
+            word_sets = [set(text_tuple[2]) for text_tuple in list_text]
+
             # Create a list which holds triple of the score and the two extractors
             list_score = []
 
             # Compare every text with all other texts at least once
-            for a, b, in itertools.combinations(list_text, 2):
-
-                # Create sets from the texts
-                set_a = set(a[0].split())
-                set_b = set(b[0].split())
-                symmetric_difference_a_b = set_a ^ set_b
-                intersection_a_b = set_a & set_b
-
-                # Replace 0 with -1 in order to elude division by zero
-                if intersection_a_b == 0:
-                    intersection_a_b = -1
-
-                # Create the score. It divides the number of words which are not in both texts by the number of words which
-                # are in both texts and subtracts the result from 1. The closer to 1 the more similiar they are.
-                score = 1 - ((len(symmetric_difference_a_b)) / (2 * len(intersection_a_b)))
-                list_score.append((score, a[1], b[1]))
+            for (a, words_a), (b, words_b) in itertools.combinations(zip(list_text, word_sets), 2):
+                list_score.append((self.score(words_a, words_b), a[1], b[1]))
 
             # Find out which is the highest score
             best_score = max(list_score, key=lambda item: item[0])
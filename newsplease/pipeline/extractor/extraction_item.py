@@ -0,0 +1,82 @@
+"""
+The item that NewsPlease.from_html, from_warc and the batch extraction hand to the article extractor. The Scrapy
+pipelines pass their NewscrawlerItem (crawler/items.py), which needs Scrapy and keeps its fields in a dict, wrapped
+together with a fake spider response. The extractors only read and write items by key, e.g., item['url'] and
+item['spider_response'].body, so an ExtractionItem provides the same fields and the same access by key, but keeps
+its fields in slots and needs no Scrapy. Since a NewscrawlerItem already supports access by key, it is handed to the
+extractors as it is, without copying it into an ExtractionItem.
+"""
+
+# the fields of NewscrawlerItem, see crawler/items.py
+ITEM_FIELDS = ('db_id', 'local_path', 'filename', 'abs_local_path', 'modified_date', 'download_date', 'source_domain',
+               'url', 'html_title', 'spider_response', 'parsed_document', 'domain_priors', 'rss_title', 'article_title',
+               'article_description', 'article_text', 'article_image', 'article_author', 'article_publish_date',
+               'article_language', 'cluster_id')
+_ITEM_FIELDS = frozenset(ITEM_FIELDS)
+
+
+class Response(object):
+    """The part of a Scrapy response that the extractors use: its body."""
+
+    __slots__ = ('body',)
+
+    def __init__(self, body):
+        """
+        :param body: The HTML of the page
+        """
+        self.body = body
+
+
+class ExtractionItem(object):
+    """
+    An item with the fields of NewscrawlerItem, which are accessed by key like the fields of a NewscrawlerItem. Fields
+    that were not set are None; unlike in a NewscrawlerItem, item[field] returns None instead of raising a KeyError.
+    """
+
+    __slots__ = ITEM_FIELDS
+
+    def __init__(self, body, url='', source_domain=b'', filename=None, download_date=None, domain_priors=None):
+        """
+        :param body: The HTML of the page
+        :param url:
+        :param source_domain: The hostname of the url, as bytes
+        :param filename:
+        :param download_date:
+        :param domain_priors: see NewsPlease.from_html
+        """
+        for field in ITEM_FIELDS:
+            setattr(self, field, None)
+        self.spider_response = Response(body)
+        self.url = url
+        self.source_domain = source_domain
+        self.html_title = b''
+        self.rss_title = b''
+        self.filename = filename
+        self.download_date = download_date
+        self.domain_priors = domain_priors
+
+    def __getitem__(self, key):
+        if key not in _ITEM_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _ITEM_FIELDS:
+            raise KeyError('%s does not support field: %s' % (self.__class__.__name__, key))
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _ITEM_FIELDS and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        """
+        :return: The value of the field, the default if it is not set
+        """
+        value = getattr(self, key, None) if key in _ITEM_FIELDS else None
+        return default if value is None else value
+
+    def keys(self):
+        """
+        :return: The fields that are set
+        """
+        return [field for field in ITEM_FIELDS if getattr(self, field) is not None]
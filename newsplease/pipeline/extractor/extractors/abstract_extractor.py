@@ -1,6 +1,7 @@
 from abc import ABCMeta, abstractmethod
 
 from ..article_candidate import ArticleCandidate
+from ..parsed_document import ParsedDocument
 
 
 class AbstractExtractor:
@@ -9,14 +10,57 @@ class AbstractExtractor:
 
     __metaclass__ = ABCMeta
 
+    # The ArticleCandidate fields this extractor produces. If set, the Extractor skips the extractor when none of
+    # these fields is requested and otherwise passes the requested subset to extract(item, fields). None means the
+    # extractor does not declare its fields; it is then always executed via extract(item).
+    fields = None
+
     @abstractmethod
     def __init__(self):
         self.name = None
 
+    def _document(self, item):
+        """Returns the ParsedDocument of the item. The Extractor parses every item once and shares the result with
+        all extractors; if an extractor is used on its own, the body is parsed here and attached to the item.
+
+        :param item: A NewscrawlerItem to parse.
+        :return: ParsedDocument of the item's response body.
+        """
+        document = item.get('parsed_document')
+        if document is None:
+            document = ParsedDocument(item['spider_response'].body)
+            item['parsed_document'] = document
+        return document
+
     def _name(self):
         """Returns the name of the article extractor."""
         return self.name
 
+    def settled_fields(self, article_candidate):
+        """Returns the fields of the given candidate that are reliable enough to be final. The Extractor does not
+        request these fields from the extractors that run afterwards.
+
+        :param article_candidate: An ArticleCandidate returned by extract.
+        :return: A set of ArticleCandidate fields
+        """
+        return set()
+
+    def prepare(self):
+        """Loads the resources that the extractor otherwise loads on first use, e.g., models. The Extractor calls it
+        before the first document that is extracted within a time budget, so that loading them is not mistaken for a
+        pathological document.
+        """
+        pass
+
+    def observe(self, item, article):
+        """Called with the final result of the extraction of each item, after the candidates of all extractors were
+        compared. Extractors that learn from the results of the ensemble override this.
+
+        :param item: The NewscrawlerItem that was extracted.
+        :param article: The ArticleCandidate with the chosen value of each field.
+        """
+        pass
+
     def _language(self, item):
         """Returns the language of the extracted article."""
         return None
@@ -45,22 +89,30 @@ class AbstractExtractor:
         """Returns the publish date of the extracted article."""
         return None
 
-    def extract(self, item):
+    def extract(self, item, fields=None):
         """Executes all implemented functions on the given article and returns an
         object containing the recovered data.
 
         :param item: A NewscrawlerItem to parse.
+        :param fields: A set of ArticleCandidate fields to extract, None to extract all fields.
         :return: ArticleCandidate containing the recovered article data.
         """
 
         article_candidate = ArticleCandidate()
         article_candidate.extractor = self._name()
-        article_candidate.title = self._title(item)
-        article_candidate.description = self._description(item)
-        article_candidate.text = self._text(item)
-        article_candidate.topimage = self._topimage(item)
-        article_candidate.author = self._author(item)
-        article_candidate.publish_date = self._publish_date(item)
-        article_candidate.language = self._language(item)
+        if fields is None or 'title' in fields:
+            article_candidate.title = self._title(item)
+        if fields is None or 'description' in fields:
+            article_candidate.description = self._description(item)
+        if fields is None or 'text' in fields:
+            article_candidate.text = self._text(item)
+        if fields is None or 'topimage' in fields:
+            article_candidate.topimage = self._topimage(item)
+        if fields is None or 'author' in fields:
+            article_candidate.author = self._author(item)
+        if fields is None or 'publish_date' in fields:
+            article_candidate.publish_date = self._publish_date(item)
+        if fields is None or 'language' in fields:
+            article_candidate.language = self._language(item)
 
         return article_candidate
@@ -1,11 +1,8 @@
-import json
 import re
-from copy import deepcopy
-
-from bs4 import BeautifulSoup
-from dateutil.parser import parse
 
 from .abstract_extractor import AbstractExtractor
+from ..parsed_document import ParsedDocument
+from ....helper_classes import date_parser
 
 try:
     import urllib.request as urllib2
@@ -18,12 +15,60 @@ re_pub_date = re.compile(
 )
 re_class = re.compile("pubdate|timestamp|article_date|articledate|date", re.IGNORECASE)
 
+# <meta> tags that may carry the publishing date, keyed by (attribute, lowercased value). If a tag matches several
+# keys, they are tried in the order of their priority.
+META_DATE = 0  # the content is the date
+META_IMAGE = 1  # the content is the URL of an image, which may contain the date
+META_HTTP_EQUIV = 2  # the content is the date, but only if the tag is no image with a dated URL
+META_KEYS = {
+    # <meta name="pubdate" content="2015-11-26T07:11:02Z" >
+    ('name', 'pubdate'): META_DATE,
+    # <meta name='publishdate' content='201511261006'/>
+    ('name', 'publishdate'): META_DATE,
+    # <meta name="timestamp"  data-type="date" content="2015-11-25 22:40:25" />
+    ('name', 'timestamp'): META_DATE,
+    # <meta name="DC.date.issued" content="2015-11-26">
+    ('name', 'dc.date.issued'): META_DATE,
+    # <meta property="article:published_time"  content="2015-11-25" />
+    ('property', 'article:published_time'): META_DATE,
+    # <meta name="Date" content="2015-11-26" />
+    ('name', 'date'): META_DATE,
+    # <meta property="bt:pubDate" content="2015-11-26T00:10:33+00:00">
+    ('property', 'bt:pubdate'): META_DATE,
+    # <meta name="sailthru.date" content="2015-11-25T19:56:04+0000" />
+    ('name', 'sailthru.date'): META_DATE,
+    # <meta name="article.published" content="2015-11-26T11:53:00.000Z" />
+    ('name', 'article.published'): META_DATE,
+    # <meta name="published-date" content="2015-11-26T11:53:00.000Z" />
+    ('name', 'published-date'): META_DATE,
+    # <meta name="article.created" content="2015-11-26T11:53:00.000Z" />
+    ('name', 'article.created'): META_DATE,
+    # <meta name="article_date_original" content="Thursday, November 26, 2015,  6:42 AM" />
+    ('name', 'article_date_original'): META_DATE,
+    # <meta name="cXenseParse:recs:publishtime" content="2015-11-26T14:42Z"/>
+    ('name', 'cxenseparse:recs:publishtime'): META_DATE,
+    # <meta name="DATE_PUBLISHED" content="11/24/2015 01:05AM" />
+    ('name', 'date_published'): META_DATE,
+    # <meta itemprop="datePublished" content="2015-11-26T11:53:00.000Z" />
+    ('itemprop', 'datepublished'): META_DATE,
+    # <meta itemprop="dateCreated" content="2015-11-26T11:53:00.000Z" />
+    ('itemprop', 'datecreated'): META_DATE,
+    # <meta property="og:image" content="http://www.dailytimes.com.pk/digital
+    # _images/400/2015-11-26/norway-return-number-of-asylum-seekers-to-pakistan-1448538771-7363.jpg"/>
+    ('property', 'og:image'): META_IMAGE,
+    ('itemprop', 'image'): META_IMAGE,
+    # <meta http-equiv="data" content="10:27:15 AM Thursday, November 26, 2015">
+    ('http-equiv', 'date'): META_HTTP_EQUIV,
+}
+META_ATTRIBUTES = ('name', 'property', 'itemprop', 'http-equiv')
 
 class DateExtractor(AbstractExtractor):
     """This class implements ArticleDateExtractor as an article extractor. ArticleDateExtractor is
     a subclass of ExtractorInterface.
     """
 
+    fields = ('publish_date',)
+
     def __init__(self):
         self.name = "date_extractor"
 
@@ -31,24 +76,22 @@ class DateExtractor(AbstractExtractor):
         """Returns the publish_date of the extracted article."""
 
         url = item['url']
-        html = deepcopy(item['spider_response'].body)
+        document = self._document(item)
         publish_date = None
 
         try:
-            if html is None:
+            if document.html is None:
                 request = urllib2.Request(url)
                 # Using a browser user agent, decreases the change of sites blocking this request - just a suggestion
                 # request.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko)
                 # Chrome/41.0.2228.0 Safari/537.36')
-                html = urllib2.build_opener().open(request).read()
-
-            html = BeautifulSoup(html, "lxml")
+                document = ParsedDocument(urllib2.build_opener().open(request).read())
 
-            publish_date = self._extract_from_json(html)
+            publish_date = self._extract_from_json(document)
             if publish_date is None:
-                publish_date = self._extract_from_meta(html)
+                publish_date = self._extract_from_meta(document)
             if publish_date is None:
-                publish_date = self._extract_from_html_tag(html)
+                publish_date = self._extract_from_html_tag(document)
             if publish_date is None:
                 publish_date = self._extract_from_url(url)
         except Exception as e:
@@ -58,29 +101,24 @@ class DateExtractor(AbstractExtractor):
         return publish_date
 
     def parse_date_str(self, date_string):
-        try:
-            date = parse(date_string)
-            return date.strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            return None
+        return date_parser.normalize(date_string)
 
     def _extract_from_url(self, url):
         """Try to extract from the article URL - simple but might work as a fallback"""
 
         # Regex by Newspaper3k  - https://github.com/codelucas/newspaper/blob/master/newspaper/urls.py
-        m = re.search(re_pub_date, url)
+        m = re_pub_date.search(url)
         if m:
             return self.parse_date_str(m.group(0))
         return None
 
-    def _extract_from_json(self, html):
+    def _extract_from_json(self, document):
         date = None
         try:
-            script = html.find('script', type='application/ld+json')
-            if script is None:
+            if not document.json_ld:
                 return None
 
-            data = json.loads(script.string)
+            data = document.json_ld[0]
 
             try:
                 date = self.parse_date_str(data['datePublished'])
@@ -96,136 +134,54 @@ class DateExtractor(AbstractExtractor):
 
         return date
 
-    def _extract_from_meta(self, html):
-        date = None
-        for meta in html.findAll("meta"):
-            meta_name = meta.get('name', '').lower()
-            item_prop = meta.get('itemprop', '').lower()
-            http_equiv = meta.get('http-equiv', '').lower()
-            meta_property = meta.get('property', '').lower()
-
-            # <meta name="pubdate" content="2015-11-26T07:11:02Z" >
-            if 'pubdate' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name='publishdate' content='201511261006'/>
-            if 'publishdate' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name="timestamp"  data-type="date" content="2015-11-25 22:40:25" />
-            if 'timestamp' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name="DC.date.issued" content="2015-11-26">
-            if 'dc.date.issued' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta property="article:published_time"  content="2015-11-25" />
-            if 'article:published_time' == meta_property:
-                date = meta['content'].strip()
-                break
-                # <meta name="Date" content="2015-11-26" />
-            if 'date' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta property="bt:pubDate" content="2015-11-26T00:10:33+00:00">
-            if 'bt:pubdate' == meta_property:
-                date = meta['content'].strip()
-                break
-                # <meta name="sailthru.date" content="2015-11-25T19:56:04+0000" />
-            if 'sailthru.date' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name="article.published" content="2015-11-26T11:53:00.000Z" />
-            if 'article.published' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name="published-date" content="2015-11-26T11:53:00.000Z" />
-            if 'published-date' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name="article.created" content="2015-11-26T11:53:00.000Z" />
-            if 'article.created' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name="article_date_original" content="Thursday, November 26, 2015,  6:42 AM" />
-            if 'article_date_original' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name="cXenseParse:recs:publishtime" content="2015-11-26T14:42Z"/>
-            if 'cxenseparse:recs:publishtime' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta name="DATE_PUBLISHED" content="11/24/2015 01:05AM" />
-            if 'date_published' == meta_name:
-                date = meta['content'].strip()
-                break
-
-            # <meta itemprop="datePublished" content="2015-11-26T11:53:00.000Z" />
-            if 'datepublished' == item_prop:
-                date = meta['content'].strip()
-                break
-
-            # <meta itemprop="datePublished" content="2015-11-26T11:53:00.000Z" />
-            if 'datecreated' == item_prop:
-                date = meta['content'].strip()
-                break
-
-            # <meta property="og:image" content="http://www.dailytimes.com.pk/digital
-            # _images/400/2015-11-26/norway-return-number-of-asylum-seekers-to-pakistan-1448538771-7363.jpg"/>
-            if 'og:image' == meta_property or "image" == item_prop:
-                url = meta['content'].strip()
-                possible_date = self._extract_from_url(url)
-                if possible_date is not None:
-                    return self.parse_date_str(possible_date)
-
-            # <meta http-equiv="data" content="10:27:15 AM Thursday, November 26, 2015">
-            if 'date' == http_equiv:
-                date = meta['content'].strip()
-                break
-
-        if date is not None:
-            return self.parse_date_str(date)
+    def _extract_from_meta(self, document):
+        for meta in document.meta:
+            priorities = [META_KEYS[key] for key in ((attribute, meta.get(attribute, '').lower())
+                                                     for attribute in META_ATTRIBUTES) if key in META_KEYS]
+            for priority in sorted(priorities):
+                if priority == META_IMAGE:
+                    possible_date = self._extract_from_url(meta['content'].strip())
+                    if possible_date is not None:
+                        return self.parse_date_str(possible_date)
+                else:
+                    return self.parse_date_str(meta['content'].strip())
 
         return None
 
-    def _extract_from_html_tag(self, html):
-        # <time>
-        for time in html.findAll("time"):
-            datetime = time.get('datetime', '')
-            if len(datetime) > 0:
-                return self.parse_date_str(datetime)
-
-            datetime = time.get('class', '')
-            if len(datetime) > 0 and datetime[0].lower() == "timestamp":
-                return self.parse_date_str(time.string)
-
-        tag = html.find("span", {"itemprop": "datePublished"})
-        if tag is not None:
-            date_string = tag.get("content")
-            if date_string is None:
-                date_string = tag.text
-            if date_string is not None:
-                return self.parse_date_str(date_string)
+    def _extract_from_html_tag(self, document):
+        if document.tree is None:
+            return None
 
-        # class=
-        for tag in html.find_all(['span', 'p', 'div'], class_=re_class):
-            date_string = tag.string
+        # a single pass over the tree collects all candidates; <time> elements are preferred over
+        # <span itemprop="datePublished">, which are preferred over <span>, <p> and <div> elements with a date-like
+        # class. lxml's iter is considerably faster than an equivalent XPath expression here.
+        item_prop_tag = None
+        class_tags = []
+        for tag in document.tree.iter('time', 'span', 'p', 'div'):
+            if tag.tag == 'time':
+                datetime = tag.get('datetime', '')
+                if len(datetime) > 0:
+                    return self.parse_date_str(datetime)
+
+                datetime = tag.get('class', '').split()
+                if len(datetime) > 0 and datetime[0].lower() == "timestamp":
+                    return self.parse_date_str(tag.text_content())
+                continue
+
+            if item_prop_tag is None and tag.tag == 'span' and tag.get('itemprop') == 'datePublished':
+                item_prop_tag = tag
+            css_class = tag.get('class')
+            if css_class and re_class.search(css_class):
+                class_tags.append(tag)
+
+        if item_prop_tag is not None:
+            date_string = item_prop_tag.get("content")
             if date_string is None:
-                date_string = tag.text
+                date_string = item_prop_tag.text_content()
+            return self.parse_date_str(date_string)
 
-            date = self.parse_date_str(date_string)
+        for tag in class_tags:
+            date = self.parse_date_str(tag.text_content())
 
             if date is not None:
                 return date
@@ -1,11 +1,9 @@
 import locale
 import re
 
-from langdetect import detect
-from langdetect.lang_detect_exception import LangDetectException
-from lxml import html
-
 from .abstract_extractor import AbstractExtractor
+from ..language_identifier import NgramLanguageIdentifier
+from ....helper_classes.domain_priors import DomainPriors, LANGUAGE
 
 
 class LangExtractor(AbstractExtractor):
@@ -14,19 +12,31 @@ class LangExtractor(AbstractExtractor):
 
     """
 
+    fields = ('language',)
+
+    # the backend that identifies the language of the visible text if the page does not declare it, see
+    # language_identifier
+    identifier = NgramLanguageIdentifier
+
+    # number of characters of the text that are checked against the language prior of the domain, see domain_priors
+    verification_length = 300
+
     def __init__(self):
         self.name = "langdetect"
         self.langcode_pattern = re.compile(r'\b[a-zA-Z]{2}(?=([-_]|\b))')
 
+    def prepare(self):
+        self.identifier.get_instance()
+
     def _language(self, item):
         """Returns the language of the extracted article by analyzing metatags and inspecting the visible text
-        with langdetect"""
+        with the language identifier"""
 
-        response = item['spider_response'].body
-        try:
-            root = html.fromstring(response)
-        except ValueError:
-            root = html.fromstring(response.encode("utf-8"))
+        identifier = self.identifier.get_instance()
+        document = self._document(item)
+        root = document.tree
+        if root is None:
+            return None
 
         # Check for lang-attributes
         lang = root.get('lang')
@@ -36,38 +46,63 @@ class LangExtractor(AbstractExtractor):
 
         # Check for general meta tags
         if lang is None:
-            meta = root.cssselect('meta[name="language"]')
+            meta = [meta for meta in document.meta if meta.get('name') == 'language']
             if len(meta) > 0:
                 lang = meta[0].get('content')
 
         # Check for open graph tags
         if lang is None:
-            meta = root.cssselect('meta[property="og:locale"]')
+            meta = [meta for meta in document.meta if meta.get('property') == 'og:locale']
             if len(meta) > 0:
                 lang = meta[0].get('content')
 
-        # Look for <article> elements and inspect the one with the largest payload with langdetect
+        priors = item.get('domain_priors')
+        domain = DomainPriors.domain(item.get('source_domain')) if priors is not None else None
+
         if lang is None:
-            article_list = []
-            for article in root.xpath('//article'):
-                article_list.append(re.sub(r'\s+', ' ', article.text_content().strip()))
-                longest_articles = sorted(article_list, key=lambda article: len(article), reverse=True)
-                for article in longest_articles:
-                    try:
-                        lang = detect(article)
-                    except LangDetectException:
-                        continue
-                    else:
+            article_list = [re.sub(r'\s+', ' ', article.text_content().strip()) for article in root.iter('article')]
+            article_list.sort(key=len, reverse=True)
+
+            # Check a short sample against the language the domain usually publishes in
+            if priors is not None:
+                lang = self._verified_prior(priors, domain, identifier,
+                                            article_list[0] if article_list else document.text)
+
+            # Look for <article> elements and inspect the one with the largest payload
+            if lang is None:
+                for article in article_list:
+                    lang = identifier.detect(article)
+                    if lang is not None:
                         break
 
-        # Analyze the whole body with langdetect
-        if lang is None:
-            try:
-                lang = detect(root.text_content().strip())
-            except LangDetectException:
-                pass
+            # Analyze the whole body
+            if lang is None:
+                lang = identifier.detect(document.text)
+
+        lang = self._normalize(lang)
+        if priors is not None:
+            priors.observe(LANGUAGE, domain, lang)
+        return lang
 
-        # Try to normalize output
+    def _verified_prior(self, priors, domain, identifier, text):
+        """Returns the language prior of the domain if the language of a short sample of the text agrees with it.
+
+        :param priors: DomainPriors
+        :param domain: The source domain of the item
+        :param identifier: A LanguageIdentifier
+        :param text: The text whose language is to be identified
+        :return: The language prior, None if the domain has no prior or the sample disagrees
+        """
+        prior = priors.get(LANGUAGE, domain)
+        if prior is None:
+            priors.record(LANGUAGE, None)
+            return None
+        verified = self._normalize(identifier.detect(identifier.sample(text, self.verification_length))) == prior
+        priors.record(LANGUAGE, verified)
+        return prior if verified else None
+
+    def _normalize(self, lang):
+        """Normalizes a language code or locale to its two-letter language code, e.g., en_US to en."""
         if lang is not None:
             # First search for suitable locale in the original output
             matches = self.langcode_pattern.search(lang)
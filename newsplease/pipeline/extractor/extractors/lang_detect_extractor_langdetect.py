@@ -0,0 +1,6 @@
+from .lang_detect_extractor import LangExtractor
+from ..language_identifier import LangdetectLanguageIdentifier
+
+
+class LangExtractorLangdetect(LangExtractor):
+    identifier = LangdetectLanguageIdentifier
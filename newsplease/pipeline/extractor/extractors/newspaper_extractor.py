@@ -1,9 +1,25 @@
+import copy
 import logging
 
 from newspaper import Article
+from newspaper.configuration import Configuration
+from newspaper.parsers import Parser
 
 from .abstract_extractor import AbstractExtractor
 from ..article_candidate import ArticleCandidate
+from ....helper_classes import date_parser
+
+
+class DocumentParser(Parser):
+    """Newspaper's parser, but instead of parsing the HTML again it hands out a copy of the already parsed
+    document. Newspaper modifies the tree while extracting, hence every call returns a fresh copy.
+    """
+
+    def __init__(self, document):
+        self.document = document
+
+    def fromstring(self, html):
+        return self.document.copy_tree()
 
 
 class NewspaperExtractor(AbstractExtractor):
@@ -11,37 +27,80 @@ class NewspaperExtractor(AbstractExtractor):
     a subclass of ExtractorsInterface
     """
 
+    fields = ('title', 'description', 'text', 'topimage', 'author', 'publish_date', 'language')
+
+    # fields that require newspaper's full pipeline, all other fields are read from the metadata of the document
+    full_parse_fields = ('text', 'topimage')
+
     def __init__(self):
         self.log = logging.getLogger(__name__)
         self.name = "newspaper"
 
+        # the configuration is built once and copied for every article
+        self.config = Configuration()
+        for key, value in self._article_kwargs().items():
+            setattr(self.config, key, value)
+
     def _article_kwargs(self):
         return {}
 
-    def extract(self, item):
+    def _parse_metadata(self, article, doc, fields):
+        """Runs only the metadata part of newspaper's Article.parse for the given fields, skipping the costly cleaning
+        of the document and the detection of the main text and the top image. The metadata getters of newspaper do
+        not modify the tree, so the shared document can be used as is.
+
+        :param article: The Article to set the results on.
+        :param doc: The root of the parsed document.
+        :param fields: A set of ArticleCandidate fields to extract.
+        """
+        if 'title' in fields:
+            article.set_title(article.extractor.get_title(doc))
+        if 'author' in fields:
+            article.set_authors(article.extractor.get_authors(doc))
+        if 'language' in fields:
+            article.set_meta_language(article.extractor.get_meta_lang(doc))
+        if 'description' in fields:
+            article.set_meta_description(article.extractor.get_meta_description(doc))
+        if 'publish_date' in fields:
+            article.publish_date = article.extractor.get_publishing_date(article.url, doc)
+
+    def extract(self, item, fields=None):
         """Creates an instance of Article without a Download and returns an ArticleCandidate with the results of
         parsing the HTML-Code.
 
         :param item: A NewscrawlerItem to parse.
+        :param fields: A set of ArticleCandidate fields to extract, None to extract all fields.
         :return: ArticleCandidate containing the recovered article data.
         """
         article_candidate = ArticleCandidate()
         article_candidate.extractor = self._name()
 
-        article = Article('', **self._article_kwargs())
-        article.set_html(item['spider_response'].body)
-        article.parse()
-        article_candidate.title = article.title
-        article_candidate.description = article.meta_description
-        article_candidate.text = article.text
-        article_candidate.topimage = article.top_image
-        article_candidate.author = article.authors
-        if article.publish_date:
-            try:
-                article_candidate.publish_date = article.publish_date.strftime('%Y-%m-%d %H:%M:%S')
-            except ValueError as exception:
-                self.log.debug('%s: Newspaper failed to extract the date in the supported format,'
-                              'Publishing date set to None' % item['url'])
-        article_candidate.language = article.meta_lang
+        document = self._document(item)
+
+        config = copy.copy(self.config)
+        if document.tree is not None:
+            parser = DocumentParser(document)
+            config.get_parser = lambda: parser
+
+        article = Article('', config=config)
+        article.set_html(document.html)
+        if fields is not None and document.tree is not None and not set(fields) & set(self.full_parse_fields):
+            self._parse_metadata(article, document.tree, fields)
+        else:
+            article.parse()
+        if fields is None or 'title' in fields:
+            article_candidate.title = article.title
+        if fields is None or 'description' in fields:
+            article_candidate.description = article.meta_description
+        if fields is None or 'text' in fields:
+            article_candidate.text = article.text
+        if fields is None or 'topimage' in fields:
+            article_candidate.topimage = article.top_image
+        if fields is None or 'author' in fields:
+            article_candidate.author = article.authors
+        if fields is None or 'publish_date' in fields:
+            article_candidate.publish_date = date_parser.normalize(article.publish_date)
+        if fields is None or 'language' in fields:
+            article_candidate.language = article.meta_lang
 
         return article_candidate
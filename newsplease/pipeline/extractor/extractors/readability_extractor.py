@@ -1,5 +1,3 @@
-from copy import deepcopy
-
 from readability import Document
 
 from .abstract_extractor import AbstractExtractor
@@ -12,23 +10,33 @@ class ReadabilityExtractor(AbstractExtractor):
 
     """
 
+    fields = ('title', 'description')
+
     def __init__(self):
         self.name = "readability"
 
-    def extract(self, item):
+    def extract(self, item, fields=None):
         """Creates an readability document and returns an ArticleCandidate containing article title and text.
 
         :param item: A NewscrawlerItem to parse.
+        :param fields: A set of ArticleCandidate fields to extract, None to extract all fields.
         :return: ArticleCandidate containing the recovered article data.
         """
 
-        doc = Document(deepcopy(item['spider_response'].body))
-        description = doc.summary()
+        # readability modifies the tree it is given, so it works on a private copy of the shared document
+        document = self._document(item)
+        tree = document.copy_tree()
+        if tree is None:
+            tree = document.html
+        doc = Document(tree)
 
         article_candidate = ArticleCandidate()
         article_candidate.extractor = self._name
-        article_candidate.title = doc.short_title()
-        article_candidate.description = description
+        if fields is None or 'description' in fields:
+            # summary() runs the actual readability algorithm, which is by far the most expensive step
+            article_candidate.description = doc.summary()
+        if fields is None or 'title' in fields:
+            article_candidate.title = doc.short_title()
         article_candidate.text = self._text(item)
         article_candidate.topimage = self._topimage(item)
         article_candidate.author = self._author(item)
@@ -0,0 +1,228 @@
+import re
+
+from six.moves import urllib
+
+from .abstract_extractor import AbstractExtractor
+from ..article_candidate import ArticleCandidate
+from ....helper_classes import date_parser
+
+# to improve performance, regex statements are compiled only once per module
+re_whitespaces = re.compile(r'\s+')
+re_langcode = re.compile(r'\b[a-zA-Z]{2}(?=([-_]|\b))')
+
+# schema.org types of JSON-LD objects that describe the article itself
+ARTICLE_TYPES = {'article', 'newsarticle', 'reportagenewsarticle', 'analysisnewsarticle', 'opinionnewsarticle',
+                 'reviewnewsarticle', 'backgroundnewsarticle', 'blogposting', 'liveblogposting', 'report',
+                 'socialmediaposting', 'webpage'}
+
+# (attribute, lowercased value) of <meta> tags mapped to the source and the field they describe
+META_FIELDS = {
+    ('property', 'og:title'): ('opengraph', 'title'),
+    ('property', 'og:description'): ('opengraph', 'description'),
+    ('property', 'og:image'): ('opengraph', 'topimage'),
+    ('property', 'og:image:url'): ('opengraph', 'topimage'),
+    ('property', 'og:locale'): ('opengraph', 'language'),
+    ('property', 'article:published_time'): ('opengraph', 'publish_date'),
+    ('property', 'article:author'): ('opengraph', 'author'),
+    ('name', 'twitter:title'): ('twitter', 'title'),
+    ('name', 'twitter:description'): ('twitter', 'description'),
+    ('name', 'twitter:image'): ('twitter', 'topimage'),
+    ('name', 'twitter:image:src'): ('twitter', 'topimage'),
+    ('property', 'twitter:title'): ('twitter', 'title'),
+    ('property', 'twitter:description'): ('twitter', 'description'),
+    ('property', 'twitter:image'): ('twitter', 'topimage'),
+    ('name', 'dc.title'): ('dublincore', 'title'),
+    ('name', 'dcterms.title'): ('dublincore', 'title'),
+    ('name', 'dc.description'): ('dublincore', 'description'),
+    ('name', 'dcterms.description'): ('dublincore', 'description'),
+    ('name', 'dc.date'): ('dublincore', 'publish_date'),
+    ('name', 'dc.date.issued'): ('dublincore', 'publish_date'),
+    ('name', 'dcterms.date'): ('dublincore', 'publish_date'),
+    ('name', 'dcterms.issued'): ('dublincore', 'publish_date'),
+    ('name', 'dcterms.created'): ('dublincore', 'publish_date'),
+    ('name', 'dc.creator'): ('dublincore', 'author'),
+    ('name', 'dcterms.creator'): ('dublincore', 'author'),
+    ('name', 'dc.language'): ('dublincore', 'language'),
+    ('name', 'dcterms.language'): ('dublincore', 'language'),
+    ('name', 'author'): ('meta', 'author'),
+    ('name', 'description'): ('meta', 'description'),
+    ('name', 'language'): ('meta', 'language'),
+}
+
+# sources in the order of their reliability, the first source that provides a field determines its value
+SOURCES = ('jsonld', 'opengraph', 'twitter', 'dublincore', 'meta', 'html')
+
+
+class StructuredDataExtractor(AbstractExtractor):
+    """This class reads the structured metadata publishers embed into their pages, i.e., all JSON-LD graphs and
+    OpenGraph, Twitter card and Dublin Core meta tags as well as the language of the <html> tag, in a single pass over
+    the shared document.
+
+    Most news pages describe their articles completely this way. If a field is provided and all sources that provide
+    it agree, the field is settled and the Extractor does not run the remaining, much more expensive extractors for
+    it. This extractor therefore has to be the first one in the list of extractors.
+    """
+
+    fields = ('title', 'description', 'topimage', 'author', 'publish_date', 'language')
+
+    def __init__(self):
+        self.name = "structured_data"
+
+    def _collect(self, item):
+        """Collects the values of all sources of structured metadata.
+
+        :param item: A NewscrawlerItem to parse.
+        :return: A dict, mapping each field to a list of (source, value) tuples in document order
+        """
+        document = self._document(item)
+        values = {}
+
+        for data in document.json_ld:
+            for entity in self._article_entities(data):
+                self._add(values, 'jsonld', 'title', entity.get('headline') or entity.get('name'))
+                self._add(values, 'jsonld', 'description', entity.get('description'))
+                self._add(values, 'jsonld', 'topimage', self._image_url(entity.get('image')))
+                self._add(values, 'jsonld', 'publish_date', entity.get('datePublished') or entity.get('dateCreated'))
+                self._add(values, 'jsonld', 'language', entity.get('inLanguage'))
+                for author in self._author_names(entity.get('author')):
+                    self._add(values, 'jsonld', 'author', author)
+
+        for meta in document.meta:
+            content = meta.get('content')
+            if not content:
+                continue
+            for attribute in ('property', 'name', 'itemprop'):
+                key = (attribute, meta.get(attribute, '').lower())
+                if key in META_FIELDS:
+                    source, field = META_FIELDS[key]
+                    self._add(values, source, field, content)
+                    break
+
+        if document.tree is not None:
+            self._add(values, 'html', 'language', document.tree.get('lang'))
+
+        return values
+
+    @staticmethod
+    def _add(values, source, field, value):
+        if isinstance(value, str):
+            value = value.strip()
+            if value:
+                values.setdefault(field, []).append((source, value))
+
+    @staticmethod
+    def _article_entities(data):
+        """Yields all objects of a JSON-LD block that describe an article, including those nested in @graph."""
+        if isinstance(data, list):
+            for entry in data:
+                for entity in StructuredDataExtractor._article_entities(entry):
+                    yield entity
+        elif isinstance(data, dict):
+            if '@graph' in data:
+                for entity in StructuredDataExtractor._article_entities(data['@graph']):
+                    yield entity
+            types = data.get('@type')
+            if not isinstance(types, list):
+                types = [types]
+            if any(isinstance(type_, str) and type_.lower() in ARTICLE_TYPES for type_ in types):
+                yield data
+
+    @staticmethod
+    def _image_url(image):
+        if isinstance(image, list):
+            image = image[0] if image else None
+        if isinstance(image, dict):
+            image = image.get('url') or image.get('contentUrl')
+        return image
+
+    @staticmethod
+    def _author_names(author):
+        if not isinstance(author, list):
+            author = [author]
+        names = []
+        for entry in author:
+            if isinstance(entry, dict):
+                entry = entry.get('name')
+            if isinstance(entry, str) and entry.strip():
+                names.append(entry.strip())
+        return names
+
+    @staticmethod
+    def _normalize_text(title):
+        return re_whitespaces.sub(' ', title).strip().lower()
+
+    @staticmethod
+    def _normalize_image_url(url, image):
+        """Resolves the image URL against the URL of the document and drops the scheme and the fragment, so that
+        relative and absolute, http and https URLs of the same image are equal."""
+        try:
+            parts = urllib.parse.urlsplit(urllib.parse.urljoin(url or '', image))
+        except ValueError:
+            return image
+        return parts.netloc.lower() + parts.path + ('?' + parts.query if parts.query else '')
+
+    def parse_date_str(self, date_string):
+        return date_parser.normalize(date_string)
+
+    def normalize_language(self, language):
+        matches = re_langcode.search(language)
+        if matches is None:
+            return None
+        return matches.group(0).lower()
+
+    def extract(self, item, fields=None):
+        """Reads all structured metadata of the document and returns an ArticleCandidate with the most reliable
+        value of each field.
+
+        :param item: A NewscrawlerItem to parse.
+        :param fields: A set of ArticleCandidate fields to extract, None to extract all fields.
+        :return: ArticleCandidate containing the recovered article data.
+        """
+        values = self._collect(item)
+        settled = set()
+
+        article_candidate = ArticleCandidate()
+        article_candidate.extractor = self._name()
+
+        for field in self.fields:
+            if fields is not None and field not in fields:
+                continue
+
+            candidates = values.get(field, [])
+            if field == 'publish_date':
+                candidates = [(source, self.parse_date_str(value)) for source, value in candidates]
+            elif field == 'language':
+                candidates = [(source, self.normalize_language(value)) for source, value in candidates]
+            candidates = [(source, value) for source, value in candidates if value]
+            if not candidates:
+                continue
+
+            if field == 'author':
+                # authors are listed by the most reliable source that names any. The field is settled if all sources
+                # name the same authors
+                source = min(candidates, key=lambda candidate: SOURCES.index(candidate[0]))[0]
+                value = [name for name_source, name in candidates if name_source == source]
+                authors = {}
+                for name_source, name in candidates:
+                    authors.setdefault(name_source, set()).add(self._normalize_text(name))
+                consistent = len(set(frozenset(names) for names in authors.values())) == 1
+            else:
+                value = min(candidates, key=lambda candidate: SOURCES.index(candidate[0]))[1]
+                if field in ('title', 'description'):
+                    consistent = len(set(self._normalize_text(text) for _, text in candidates)) == 1
+                elif field == 'topimage':
+                    consistent = len(set(self._normalize_image_url(item['url'], image)
+                                         for _, image in candidates)) == 1
+                else:
+                    consistent = len(set(value for _, value in candidates)) == 1
+
+            setattr(article_candidate, field, value)
+            if consistent:
+                settled.add(field)
+
+        article_candidate.settled_fields = settled
+        return article_candidate
+
+    def settled_fields(self, article_candidate):
+        """Returns the fields that were provided by the structured data and on which all sources agree."""
+        return article_candidate.settled_fields
@@ -0,0 +1,338 @@
+import re
+from functools import lru_cache
+
+from lxml import etree
+
+from .abstract_extractor import AbstractExtractor
+from ..article_candidate import ArticleCandidate
+from ..cleaner import Cleaner
+from ..comparer.comparer_text import ComparerText
+from ..comparer.comparer_topimage import ComparerTopimage
+from ....helper_classes import date_parser
+from ....helper_classes.domain_priors import DomainPriors, TEMPLATE
+
+# to improve performance, regex statements are compiled only once per module
+re_whitespaces = re.compile(r'\s+')
+re_word = re.compile(r'\w+')
+# ids with long numbers are usually generated per page
+re_generated_id = re.compile(r'\d{3,}')
+
+# attributes that identify a <meta> tag
+META_KEYS = ('property', 'name', 'itemprop')
+# attributes that identify other elements, in the order of preference
+ELEMENT_KEYS = ('id', 'itemprop', 'class')
+
+# elements and attributes containing a string, the deepest elements last
+xpath_containing = etree.XPath('//@*[contains(normalize-space(.), $s) and string-length(.) <= $n] | '
+                               '//*[not(self::script or self::style)]'
+                               '[contains(normalize-space(.), $s) and string-length(normalize-space(.)) <= $n]')
+# elements containing a string, regardless of their length
+xpath_containing_elements = etree.XPath('//*[not(self::script or self::style)][contains(normalize-space(.), $s)]')
+
+
+@lru_cache(maxsize=1024)
+def _compile(locator):
+    """
+    :param locator: An XPath expression
+    :return: The compiled expression, None if it is invalid
+    """
+    try:
+        return etree.XPath(locator)
+    except etree.XPathSyntaxError:
+        return None
+
+
+class TemplateExtractor(AbstractExtractor):
+    """This class learns the layout of each domain from the results of the other extractors and then extracts the
+    fields of further pages of the domain directly from it.
+
+    For every field, the extractor derives an XPath locator that reproduces the value that the ensemble of extractors
+    chose. Once the same locator was derived on several consecutive pages of a domain, it is stored as a template in
+    the DomainPriors of the item (see domain_priors). On later pages, the template is applied and its value settles the
+    field, if it passes a plausibility check, so that the other extractors are not run for it. Values that fail the
+    check are left to the ensemble, and templates that fail too often are dropped and learned again. Without
+    DomainPriors, this extractor does nothing.
+
+    This extractor has to be placed before the extractors it is supposed to save, i.e., at the beginning of the list.
+    """
+
+    fields = ('title', 'description', 'text', 'topimage', 'author', 'publish_date')
+
+    # a text needs at least this many words, shorter texts indicate that the layout of the page differs
+    min_text_words = 50
+    # minimal agreement (see ComparerText.score) of a text extracted by a locator with the text of the ensemble
+    min_text_agreement = 0.9
+    # minimal share of the words of a title that are part of the <title> of the page
+    min_title_overlap = 0.5
+    # maximal length of the name of an author
+    max_author_length = 100
+    # number of observations that a failed template outweighs, see DomainPriors.reject
+    failure_penalty = 4
+    # maximal number of steps of a locator without an identifying attribute
+    max_locator_depth = 8
+    # maximal number of candidate nodes checked when deriving the locator of a field
+    max_candidates = 20
+
+    def __init__(self):
+        self.name = "template"
+        self.cleaner = Cleaner()
+        self.comparer_text = ComparerText()
+        self.comparer_topimage = ComparerTopimage()
+
+    @staticmethod
+    def kind(field):
+        """Returns the kind of the DomainPriors under which the template of a field is kept, e.g., 'template:text'."""
+        return '%s:%s' % (TEMPLATE, field)
+
+    def extract(self, item, fields=None):
+        """Applies the templates of the domain of the item.
+
+        :param item: A NewscrawlerItem to parse.
+        :param fields: A set of ArticleCandidate fields to extract, None to extract all fields.
+        :return: ArticleCandidate containing the fields for which the domain has a template that gave a plausible value
+        """
+        article_candidate = ArticleCandidate()
+        article_candidate.extractor = self._name()
+        article_candidate.settled_fields = set()
+
+        priors = item.get('domain_priors')
+        if priors is None:
+            return article_candidate
+        document = self._document(item)
+        domain = DomainPriors.domain(item.get('source_domain'))
+        if document.tree is None or domain is None:
+            return article_candidate
+
+        for field in self.fields:
+            if fields is not None and field not in fields:
+                continue
+            kind = self.kind(field)
+            locator = priors.get(kind, domain)
+            if locator is None:
+                priors.record(kind, None)
+                continue
+            value = self._apply(document, locator, field)
+            if value is not None and self._plausible(field, value, document):
+                setattr(article_candidate, field, value)
+                article_candidate.settled_fields.add(field)
+                priors.record(kind, True)
+            else:
+                priors.record(kind, False)
+                priors.reject(kind, domain, self.failure_penalty)
+
+        return article_candidate
+
+    def settled_fields(self, article_candidate):
+        """Returns the fields that were extracted with a template."""
+        return article_candidate.settled_fields
+
+    def observe(self, item, article):
+        """Learns the locators of the fields of the chosen article. A locator is kept if it reproduces the value of
+        the field; if no locator does, the learning of the field restarts.
+
+        :param item: The NewscrawlerItem that was extracted.
+        :param article: The ArticleCandidate with the chosen value of each field.
+        """
+        priors = item.get('domain_priors')
+        document = item.get('parsed_document')
+        if priors is None or document is None or document.tree is None:
+            return
+        domain = DomainPriors.domain(item.get('source_domain'))
+        if domain is None:
+            return
+
+        for field in self.fields:
+            value = getattr(article, field)
+            # pages on which the chosen value would not pass as the value of a template, e.g., short news flashes,
+            # tell nothing about the template
+            if not value or not self._plausible(field, value, document):
+                continue
+            kind = self.kind(field)
+            locator = priors.get(kind, domain)
+            if locator is None or not self._reproduces(document, locator, field, value, item['url']):
+                locator = self._derive(document, field, value, item['url'])
+            if locator is None:
+                priors.reject(kind, domain, self.failure_penalty)
+            else:
+                priors.observe(kind, domain, locator)
+
+    def _apply(self, document, locator, field):
+        """Extracts the value of a field with a locator.
+
+        :param document: The ParsedDocument
+        :param locator: An XPath expression
+        :param field: An ArticleCandidate field
+        :return: The uncleaned value, None if the locator does not match
+        """
+        xpath = _compile(locator)
+        if xpath is None:
+            return None
+        try:
+            nodes = xpath(document.tree)
+        except etree.XPathError:
+            return None
+        if not isinstance(nodes, list):
+            return None
+
+        values = [value for value in (self._node_value(node, field) for node in nodes) if value]
+        if not values:
+            return None
+        if field == 'author':
+            return values
+        if field == 'publish_date':
+            return date_parser.normalize(values[0])
+        return values[0]
+
+    def _node_value(self, node, field):
+        """
+        :param node: An element, or an attribute value as returned by XPath
+        :param field:
+        :return: A string, the value of the node
+        """
+        if isinstance(node, str):
+            return str(node).strip()
+        if not isinstance(node.tag, str):
+            return None
+        if field == 'text':
+            # paragraphs as separated by newspaper
+            paragraphs = [re_whitespaces.sub(' ', paragraph.text_content()).strip() for paragraph in node.iter('p')]
+            paragraphs = [paragraph for paragraph in paragraphs if paragraph]
+            if paragraphs:
+                return '\n\n'.join(paragraphs)
+        return re_whitespaces.sub(' ', node.text_content()).strip()
+
+    def _plausible(self, field, value, document):
+        """Checks a value extracted with a template.
+
+        :param field:
+        :param value:
+        :param document: The ParsedDocument
+        :return: True if the value looks like a value of the field
+        """
+        if field == 'text':
+            return len(value.split()) >= self.min_text_words
+        if field == 'title':
+            page_title = document.tree.findtext('.//title')
+            words = set(re_word.findall(value.lower()))
+            if not page_title or not words:
+                return False
+            return len(words & set(re_word.findall(page_title.lower()))) >= self.min_title_overlap * len(words)
+        if field == 'author':
+            return all(len(name) <= self.max_author_length for name in value)
+        return True
+
+    def _clean(self, field, value, url):
+        """Transforms a value like the Cleaner and the Comparer transform the values of the extractors."""
+        if field == 'publish_date':
+            return value
+        value = self.cleaner.do_cleaning(value)
+        if field == 'topimage' and value:
+            value = self.comparer_topimage.image_absoulte_path(url, value)
+        return value
+
+    def _agrees(self, field, value, expected):
+        if field == 'text':
+            return self.comparer_text.score(set(value.split()), set(expected.split())) >= self.min_text_agreement
+        return value == expected
+
+    def _reproduces(self, document, locator, field, expected, url):
+        """
+        :return: True if the locator extracts the expected, i.e., the chosen value of the field from the document
+        """
+        value = self._apply(document, locator, field)
+        return value is not None and self._plausible(field, value, document) and \
+            self._agrees(field, self._clean(field, value, url), expected)
+
+    def _derive(self, document, field, expected, url):
+        """Looks for a locator that reproduces the chosen value of a field.
+
+        :param document: The ParsedDocument
+        :param field:
+        :param expected: The chosen value of the field
+        :param url: The URL of the page, relative image URLs are resolved against it
+        :return: An XPath expression, None if no locator reproduces the value
+        """
+        tree = document.tree
+        if field == 'text':
+            nodes = self._text_containers(tree, expected)
+        elif field == 'publish_date':
+            nodes = xpath_containing(tree, s=str(expected.year), n=64)
+        else:
+            if field == 'author':
+                expected_string = expected[0]
+            elif field == 'topimage':
+                # the last part of the path, image URLs are often relative
+                expected_string = expected.split('?')[0].rstrip('/').rsplit('/', 1)[-1]
+            else:
+                expected_string = expected
+            expected_string = re_whitespaces.sub(' ', expected_string).strip()
+            if not expected_string:
+                return None
+            nodes = xpath_containing(tree, s=expected_string[:50],
+                                     n=len(expected) * 2 + 100 if field == 'topimage' else len(expected_string) + 20)
+
+        checked = set()
+        for node in nodes[:self.max_candidates]:
+            locator = self._locator(node)
+            if locator is None or locator in checked:
+                continue
+            checked.add(locator)
+            if self._reproduces(document, locator, field, expected, url):
+                return locator
+        return None
+
+    def _text_containers(self, tree, text):
+        """Finds the element that contains the first and the last paragraph of a text, and its ancestors.
+
+        :return: list of elements, the innermost first
+        """
+        paragraphs = [paragraph for paragraph in text.split('\n') if paragraph.strip()]
+        first = re_whitespaces.sub(' ', paragraphs[0]).strip()[:50]
+        last = re_whitespaces.sub(' ', paragraphs[-1]).strip()[-50:]
+        first_elements = xpath_containing_elements(tree, s=first)
+        last_elements = xpath_containing_elements(tree, s=last)
+        if not first_elements or not last_elements:
+            return []
+
+        # the matches of a string are nested, the last match in document order is the innermost one
+        ancestors = list(first_elements[-1].iterancestors())
+        ancestors.insert(0, first_elements[-1])
+        element = last_elements[-1]
+        while element is not None and element not in ancestors:
+            element = element.getparent()
+        if element is None:
+            return []
+        return ancestors[ancestors.index(element):ancestors.index(element) + 3]
+
+    def _locator(self, node):
+        """Builds an XPath expression that selects the node, based on identifying attributes of the node or of its
+        nearest ancestor that has any, rather than on the position of the node, which changes between pages.
+
+        :param node: An element, or an attribute value as returned by XPath
+        :return: An XPath expression, None if the node cannot be located
+        """
+        suffix = ''
+        element = node
+        if isinstance(node, str):
+            if not getattr(node, 'is_attribute', False):
+                return None
+            if '{' in node.attrname:
+                return None
+            suffix = '/@' + node.attrname
+            element = node.getparent()
+
+        steps = [suffix]
+        for _ in range(self.max_locator_depth):
+            tag = element.tag
+            if not isinstance(tag, str) or '{' in tag or ':' in tag:
+                return None
+            for key in META_KEYS if tag == 'meta' else ELEMENT_KEYS:
+                value = element.get(key)
+                if value and '"' not in value and not (key == 'id' and re_generated_id.search(value)):
+                    steps.append('//%s[@%s="%s"]' % (tag, key, value))
+                    return ''.join(reversed(steps))
+            steps.append('/' + tag)
+            element = element.getparent()
+            if element is None:
+                return ''.join(reversed(steps))
+        return None
@@ -0,0 +1,147 @@
+"""
+Pre-processing of the HTML before it is parsed. News pages are often several megabytes large, mostly because of
+inline scripts, styles, SVG graphics, base64-encoded images and JSON state blobs of JavaScript frameworks. The
+extractors ignore all of these, yet parsing them, copying their trees for newspaper and readability and walking them
+in every extractor dominates the time of such pages. The HtmlSlimmer removes them before the document is parsed and
+optionally cuts the document at a maximum size. JSON-LD blocks and <meta> tags, from which the publishing date, the
+authors and other metadata are read, are kept.
+"""
+import re
+
+PAYLOAD_TAGS = ('script', 'style', 'svg')
+PAYLOAD_START = r'<(script|style|svg)\b([^>]*)>'
+# a tag is self-closing if it ends with a slash that is not part of an unquoted attribute value, as lxml parses it
+SELF_CLOSING = r'(?:^|[\s"\'])/\s*$'
+# elements that do not occur within SVG graphics. If one of them is found before the end tag of an <svg> element, its
+# end tag is missing and the element is kept, instead of removing everything up to the end tag of a later graphic.
+HTML_ELEMENT = r'<(?:p|div|article|section|main|header|footer|body|h[1-6]|ul|ol|table)\b'
+# base64-encoded images and fonts, shorter ones are not worth replacing
+DATA_URI = r'data:[\w/+.-]+;base64,[A-Za-z0-9+/=\s]{256,}'
+
+
+def _compile(pattern, flags=0):
+    """
+    :return: The regex compiled for decoded documents (str) and for raw documents (bytes)
+    """
+    return {str: re.compile(pattern, flags), bytes: re.compile(pattern.encode(), flags)}
+
+
+# to improve performance, regex statements are compiled only once per module, for decoded documents (str) and for raw
+# documents (bytes)
+re_payload_start = _compile(PAYLOAD_START, re.IGNORECASE)
+re_payload_end = {tag: _compile(r'</%s\s*>' % tag, re.IGNORECASE) for tag in PAYLOAD_TAGS}
+re_self_closing = _compile(SELF_CLOSING)
+re_html_element = _compile(HTML_ELEMENT, re.IGNORECASE)
+re_data_uri = _compile(DATA_URI)
+re_json_ld = _compile(r'ld\+json', re.IGNORECASE)
+EMPTY_DATA_URI = {str: 'data:,', bytes: b'data:,'}
+
+
+def _strip_payload_elements(body):
+    """
+    Removes the <script> (except JSON-LD), <style> and <svg> elements of a document. Each element ends at the first
+    end tag of its kind after its start tag, self-closing start tags end the element at once. Elements without an end
+    tag are kept.
+    :param body: The HTML, a string or bytes
+    :return: The HTML without the elements, of the same type as the body
+    """
+    body_type = type(body)
+    parts = []
+    position = 0
+    search_start = 0
+    while True:
+        start = re_payload_start[body_type].search(body, search_start)
+        if start is None:
+            break
+        tag, attributes = start.group(1, 2)
+        tag = tag.lower() if body_type is str else tag.lower().decode('ascii')
+        if re_self_closing[body_type].search(attributes):
+            end = start.end()
+        else:
+            end_tag = re_payload_end[tag][body_type].search(body, start.end())
+            if end_tag is None or (tag == 'svg' and re_html_element[body_type].search(body, start.end(),
+                                                                                     end_tag.start())):
+                search_start = start.end()
+                continue
+            end = end_tag.end()
+            if tag == 'script' and re_json_ld[body_type].search(attributes):
+                search_start = end
+                continue
+        parts.append(body[position:start.start()])
+        position = search_start = end
+    parts.append(body[position:])
+    return body[:0].join(parts)
+
+
+class HtmlSlimmer(object):
+    def __init__(self, strip_payloads=True, max_bytes=None):
+        """
+        :param strip_payloads: if True, scripts (except JSON-LD), styles, SVG graphics and base64 data URIs are
+            removed
+        :param max_bytes: maximum size of the UTF-8 encoded document, larger documents are cut at the last tag that
+            starts before this size. None keeps the documents whole.
+        """
+        self.strip_payloads = strip_payloads
+        self.max_bytes = max_bytes
+        # the sizes are the lengths of the bodies, i.e., bytes or characters, depending on the type of the body
+        self.documents = 0
+        self.size_in = 0
+        self.size_out = 0
+        self.truncated = 0
+
+    def key(self):
+        """
+        :return: A string describing the configuration, which is part of the keys of cached extraction results
+        """
+        return 'HtmlSlimmer(strip_payloads=%r, max_bytes=%r)' % (self.strip_payloads, self.max_bytes)
+
+    def slim(self, body):
+        """
+        Removes the payloads from a document and cuts it to the maximum size.
+        :param body: The HTML, a string or bytes
+        :return: The slimmed HTML, of the same type as the body
+        """
+        if not body:
+            return body
+        size = len(body)
+        self.documents += 1
+        self.size_in += size
+
+        if self.strip_payloads:
+            body_type = type(body)
+            body = _strip_payload_elements(body)
+            body = re_data_uri[body_type].sub(EMPTY_DATA_URI[body_type], body)
+
+        if self.max_bytes is not None and len(body) > self.max_bytes // 4:
+            body = self._truncate(body)
+
+        self.size_out += len(body)
+        return body
+
+    def _truncate(self, body):
+        """
+        Cuts a document at the last tag that starts before max_bytes.
+        :param body: The HTML, a string or bytes
+        :return: The HTML, of the same type as the body
+        """
+        encoded = body.encode('utf-8', errors='surrogatepass') if isinstance(body, str) else body
+        if len(encoded) <= self.max_bytes:
+            return body
+        self.truncated += 1
+        encoded = encoded[:self.max_bytes]
+        tag_start = encoded.rfind(b'<')
+        if tag_start > 0:
+            encoded = encoded[:tag_start]
+        if isinstance(body, str):
+            # drops a character that was cut in half
+            return encoded.decode('utf-8', errors='ignore')
+        return encoded
+
+    def report(self):
+        """
+        :return: A string like "saved = 52.1 MB of 80.0 MB (65.1 %), truncated documents = 3 of 1000"
+        """
+        saved = self.size_in - self.size_out
+        return 'saved = %.1f MB of %.1f MB (%.1f %%), truncated documents = %i of %i' % (
+            saved / 1e6, self.size_in / 1e6, 100.0 * saved / self.size_in if self.size_in else 0.0, self.truncated,
+            self.documents)
@@ -0,0 +1,193 @@
+import math
+import re
+from array import array
+from collections import Counter
+from operator import add
+
+from langdetect import detector_factory
+from langdetect.lang_detect_exception import LangDetectException
+from langdetect.utils.ngram import NGram
+
+# to improve performance, regex statements are compiled only once per module
+re_url = re.compile(r'https?://[-_.?&~;+=/#0-9A-Za-z]{1,2076}')
+re_mail = re.compile(r'[-_.0-9A-Za-z]{1,64}@[-_0-9A-Za-z]{1,255}[-_.0-9A-Za-z]{1,255}')
+re_latin = re.compile(r'[A-Za-z]')
+re_non_latin = re.compile('[\u0300-\u1dff\u1f00-\uffff]')
+re_capital_word = re.compile(r'[A-Z]{2}')
+
+
+class LanguageIdentifier(object):
+    """Base class of the language identification backends. Backends are stateless after their initialization, hence
+    each backend is initialized only once per process, see get_instance.
+    """
+
+    # initialized backends of the current process, keyed by class
+    instances = {}
+
+    # maximum number of characters of a text that are inspected, longer texts are sampled
+    max_text_length = 2000
+    # number of evenly spaced excerpts that make up the sample of a long text
+    sample_excerpts = 4
+
+    @classmethod
+    def get_instance(cls):
+        """Returns the initialized backend of this class, initializing it on first use.
+
+        :return: A LanguageIdentifier
+        """
+        instance = LanguageIdentifier.instances.get(cls)
+        if instance is None:
+            instance = cls()
+            LanguageIdentifier.instances[cls] = instance
+        return instance
+
+    def sample(self, text, max_text_length=None):
+        """Caps the text at max_text_length characters. Long texts are represented by evenly spaced excerpts, so that
+        a page's boilerplate at the beginning or the end does not dominate the sample.
+
+        :param text: A string
+        :param max_text_length: The maximum length of the sample, defaults to the max_text_length of the backend
+        :return: A string of at most max_text_length characters
+        """
+        if max_text_length is None:
+            max_text_length = self.max_text_length
+        if len(text) <= max_text_length:
+            return text
+        excerpt_length = max_text_length // self.sample_excerpts
+        step = (len(text) - excerpt_length) // (self.sample_excerpts - 1)
+        return ' '.join(text[i * step:i * step + excerpt_length] for i in range(self.sample_excerpts))
+
+    def detect(self, text):
+        """Identifies the language of a text.
+
+        :param text: A string
+        :return: A string, the language code (e.g., en, de, zh-cn), None if the language cannot be identified
+        """
+        raise NotImplementedError
+
+    def detect_many(self, texts):
+        """Identifies the languages of several texts.
+
+        :param texts: An iterable of strings
+        :return: A list, the language code of each text or None
+        """
+        return [self.detect(text) for text in texts]
+
+
+class NgramLanguageIdentifier(LanguageIdentifier):
+    """Identifies languages with the character n-gram profiles of langdetect, but scores all n-grams of the sampled
+    text in a single deterministic pass (naive Bayes with langdetect's smoothing) instead of langdetect's repeated
+    random trials. The profiles are loaded once per process.
+    """
+
+    # smoothing of n-grams that do not occur in a language, langdetect's default alpha divided by its base frequency
+    smoothing = 0.5 / 10000
+
+    def __init__(self):
+        detector_factory.init_factory()
+        factory = detector_factory._factory
+        self.languages = list(factory.langlist)
+        # arrays of doubles take a fraction of the memory of lists of floats
+        self.log_probabilities = {
+            ngram: array('d', [math.log(self.smoothing + probability) for probability in probabilities])
+            for ngram, probabilities in factory.word_lang_prob_map.items()
+        }
+        # maps characters to langdetect's normalized form, filled on first use of each character
+        self.normalization = _NormalizationTable()
+
+    def ngrams(self, text):
+        """Extracts the character 1-, 2- and 3-grams of a text like langdetect does: URLs and e-mail addresses are
+        removed, Latin characters are dropped from mostly non-Latin texts, and words in capitals are skipped.
+
+        :param text: A string
+        :return: A list of n-grams that occur in the profiles
+        """
+        text = re_url.sub(' ', text)
+        text = re_mail.sub(' ', text)
+        text = NGram.normalize_vi(text)
+        if len(re_latin.findall(text)) * 2 < len(re_non_latin.findall(text)):
+            text = re_latin.sub('', text)
+        text = text.translate(self.normalization)
+
+        log_probabilities = self.log_probabilities
+        ngrams = []
+        for word in text.split():
+            if re_capital_word.search(word):
+                continue
+            # words are delimited by spaces, which are part of the 2- and 3-grams at the word boundaries
+            padded = ' ' + word + ' '
+            ngrams.extend(ngram for ngram in word if ngram in log_probabilities)
+            ngrams.extend(ngram for ngram in (padded[i:i + 2] for i in range(len(padded) - 1))
+                          if ngram in log_probabilities)
+            ngrams.extend(ngram for ngram in (padded[i:i + 3] for i in range(len(padded) - 2))
+                          if ngram in log_probabilities)
+        return ngrams
+
+    def scores(self, text):
+        """Computes the log-likelihood of the sampled text for each language.
+
+        :param text: A string
+        :return: A list of scores in the order of self.languages, None if the text contains no known n-grams
+        """
+        ngrams = self.ngrams(self.sample(text))
+        if not ngrams:
+            return None
+        log_probabilities = self.log_probabilities
+        scores = [0.0] * len(self.languages)
+        # frequent n-grams are scored once, weighted by their number of occurrences
+        for ngram, count in Counter(ngrams).items():
+            if count == 1:
+                scores = list(map(add, scores, log_probabilities[ngram]))
+            else:
+                scores = [score + count * probability
+                          for score, probability in zip(scores, log_probabilities[ngram])]
+        return scores
+
+    def detect(self, text):
+        if not text:
+            return None
+        scores = self.scores(text)
+        if scores is None:
+            return None
+        return self.languages[max(range(len(scores)), key=scores.__getitem__)]
+
+
+class LangdetectLanguageIdentifier(LanguageIdentifier):
+    """Identifies languages with langdetect itself. langdetect's random trials are seeded, so that results are
+    deterministic.
+    """
+
+    max_text_length = 10000
+
+    def __init__(self):
+        detector_factory.init_factory()
+        self.factory = detector_factory._factory
+
+    def detect(self, text):
+        if not text:
+            return None
+        detector = self.factory.create()
+        detector.seed = 0
+        detector.append(self.sample(text))
+        try:
+            return detector.detect()
+        except LangDetectException:
+            return None
+
+
+class _NormalizationTable(dict):
+    """Translation table for str.translate that maps each character to langdetect's normalized form. Entries are
+    computed on first use, since the table would otherwise cover all of unicode.
+    """
+
+    def __missing__(self, code):
+        value = NGram.normalize(chr(code))
+        self[code] = value
+        return value
+
+
+# backends by name, e.g., for the configuration
+IDENTIFIERS = {
+    'ngram': NgramLanguageIdentifier,
+    'langdetect': LangdetectLanguageIdentifier,
+}
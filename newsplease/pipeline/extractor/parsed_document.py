@@ -0,0 +1,116 @@
+import copy
+import json
+import re
+
+from lxml import etree, html
+from lxml.etree import ParserError
+
+# to improve performance, regex statements are compiled only once per module
+re_xml_declaration = re.compile(r'^\s*<\?.*?\?>', re.DOTALL)
+re_whitespaces = re.compile(r'\s+')
+
+# text nodes of elements whose content is never rendered are not part of the visible text
+xpath_visible_text = etree.XPath(
+    '//text()[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template)]'
+)
+
+
+class ParsedDocument:
+    """Holds the DOM of a single HTML document. The document is parsed exactly once when an item enters the
+    Extractor, afterwards all extractors read from this object instead of parsing the raw body again. Derived views
+    (meta tags, JSON-LD blocks, <time> elements, visible text) are computed on first access and cached.
+    """
+
+    def __init__(self, body):
+        """
+        Parses the given body.
+
+        :param body: A string or bytes, the raw HTML of the response
+        """
+        self.html = body
+        self.tree = self._parse(body)
+
+        self._meta = None
+        self._json_ld = None
+        self._time_elements = None
+        self._text = None
+
+    @staticmethod
+    def _parse(body):
+        """Parses the body with lxml.
+
+        :param body: A string or bytes, the raw HTML
+        :return: The root HtmlElement, None if the body is empty or cannot be parsed
+        """
+        if not body:
+            return None
+
+        try:
+            if isinstance(body, str):
+                # lxml does not accept unicode strings that declare an encoding
+                body = re_xml_declaration.sub('', body, count=1)
+            return html.fromstring(body)
+        except ValueError:
+            try:
+                return html.fromstring(body.encode('utf-8'))
+            except (ValueError, ParserError):
+                return None
+        except ParserError:
+            return None
+
+    def copy_tree(self):
+        """Returns a private copy of the tree for consumers that modify the DOM in place (newspaper, readability).
+        Copying an lxml tree is considerably cheaper than parsing the HTML again.
+
+        :return: A deep copy of the root HtmlElement, None if the document could not be parsed
+        """
+        if self.tree is None:
+            return None
+        return copy.deepcopy(self.tree)
+
+    @property
+    def meta(self):
+        """A list, the attributes of every <meta> tag in document order, each as a dict."""
+        if self._meta is None:
+            if self.tree is None:
+                self._meta = []
+            else:
+                self._meta = [dict(element.attrib) for element in self.tree.iter('meta')]
+        return self._meta
+
+    @property
+    def json_ld(self):
+        """A list, the decoded content of every <script type="application/ld+json"> block that contains valid
+        JSON, in document order."""
+        if self._json_ld is None:
+            self._json_ld = []
+            if self.tree is not None:
+                for script in self.tree.iter('script'):
+                    if (script.get('type') or '').strip().lower() != 'application/ld+json':
+                        continue
+                    try:
+                        self._json_ld.append(json.loads(script.text))
+                    except (TypeError, ValueError):
+                        continue
+        return self._json_ld
+
+    @property
+    def time_elements(self):
+        """A list, every <time> element of the document in document order."""
+        if self._time_elements is None:
+            if self.tree is None:
+                self._time_elements = []
+            else:
+                self._time_elements = list(self.tree.iter('time'))
+        return self._time_elements
+
+    @property
+    def text(self):
+        """A string, the visible text of the document, i.e., the text of all elements except scripts, styles and
+        the like, with whitespace collapsed."""
+        if self._text is None:
+            if self.tree is None:
+                self._text = ''
+            else:
+                self._text = re_whitespaces.sub(' ', ''.join(xpath_visible_text(self.tree))).strip()
+        return self._text
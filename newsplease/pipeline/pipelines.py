@@ -8,25 +8,29 @@ import logging
 import os.path
 import sys
 
-import pymysql
-import psycopg2
-from dateutil import parser as dateparser
-from elasticsearch import Elasticsearch
-from scrapy.exceptions import DropItem
-
 from NewsArticle import NewsArticle
 from .extractor import article_extractor
 from ..config import CrawlerConfig
+from ..helper_classes import date_parser
+from ..helper_classes.domain_priors import DomainPriors
+from ..helper_classes.extraction_cache import ExtractionCache
+from ..helper_classes.lazy_module import LazyModule
+from ..helper_classes.near_duplicates import NearDuplicateIndex
+from ..helper_classes.prefilter import PreFilter
+from ..helper_classes.time_budget import TimeBudget
 
 if sys.version_info[0] < 3:
     ConnectionError = OSError
 
-try:
-    import numpy as np
-    import pandas as pd
-except ImportError:
-    np = None
-    pd = None
+# the storage backends and Scrapy are only imported when they are used, so that NewsPlease.from_html and from_warc,
+# which use ExtractedInformationStorage, do not load them
+pymysql = LazyModule('pymysql')
+psycopg2 = LazyModule('psycopg2')
+elasticsearch = LazyModule('elasticsearch')
+scrapy_exceptions = LazyModule('scrapy.exceptions')
+# optional
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
 
 
 class HTMLCodeHandling(object):
@@ -40,7 +44,7 @@ class HTMLCodeHandling(object):
         # For the case where something goes wrong
         if item['spider_response'].status != 200:
             # Item is no longer processed in the pipeline
-            raise DropItem("%s: Non-200 response" % item['url'])
+            raise scrapy_exceptions.DropItem("%s: Non-200 response" % item['url'])
         else:
             return item
 
@@ -56,11 +60,41 @@ class ArticleMasterExtractor(object):
         self.cfg = CrawlerConfig.get_instance()
         self.extractor_list = self.cfg.section("ArticleMasterExtractor")[
             "extractors"]
-
-        self.extractor = article_extractor.Extractor(self.extractor_list)
+        self.fields = self.cfg.section("ArticleMasterExtractor").get("fields")
+        extraction_cache = self.cfg.section("ArticleMasterExtractor").get("extraction_cache")
+        self.extraction_cache = ExtractionCache(extraction_cache) if extraction_cache else None
+        domain_priors = self.cfg.section("ArticleMasterExtractor").get("domain_priors")
+        self.domain_priors = DomainPriors(path=domain_priors) if domain_priors else None
+
+        slim_html = self.cfg.section("ArticleMasterExtractor").get("slim_html", False)
+        max_html_bytes = self.cfg.section("ArticleMasterExtractor").get("max_html_bytes")
+
+        self.extractor = article_extractor.Extractor.get_instance(self.extractor_list, slim_html=slim_html,
+                                                                  max_html_bytes=max_html_bytes)
+
+        document_time_budget = self.cfg.section("ArticleMasterExtractor").get("document_time_budget")
+        extractor_time_budget = self.cfg.section("ArticleMasterExtractor").get("extractor_time_budget")
+        self.time_budget = None
+        if document_time_budget is not None or extractor_time_budget is not None:
+            self.time_budget = TimeBudget(
+                document_seconds=document_time_budget, extractor_seconds=extractor_time_budget,
+                quarantine_dir=self.cfg.section("ArticleMasterExtractor").get("quarantine_dir"),
+                cpu_time=self.cfg.section("ArticleMasterExtractor").get("cpu_time_budget", False))
 
     def process_item(self, item, spider):
-        return self.extractor.extract(item)
+        item['domain_priors'] = self.domain_priors
+        return self.extractor.extract(item, self.fields, cache=self.extraction_cache, time_budget=self.time_budget)
+
+    def close_spider(self, spider):
+        if self.extraction_cache is not None:
+            self.log.info("Extraction cache: %s", self.extraction_cache.report())
+        if self.domain_priors is not None:
+            self.log.info("Domain priors: %s", self.domain_priors.report())
+            self.domain_priors.save()
+        if self.extractor.html_slimmer is not None:
+            self.log.info("HTML slimmer: %s", self.extractor.html_slimmer.report())
+        if self.time_budget is not None:
+            self.log.info("Time budget: %s", self.time_budget.report())
 
 
 class RSSCrawlCompare(object):
@@ -114,7 +148,7 @@ class RSSCrawlCompare(object):
                     < datetime.timedelta(hours=self.delta_time):
                 # Compare the two download dates. index 3 of old_version
                 # corresponds to the download_date attribute in the DB
-                raise DropItem("Article in DB too recent. Not saving.")
+                raise scrapy_exceptions.DropItem("Article in DB too recent. Not saving.")
 
         return item
 
@@ -284,18 +318,21 @@ class ExtractedInformationStorage(object):
             return text.decode('utf-8')
 
     @staticmethod
-    def extract_relevant_info(item):
+    def extract_relevant_info(item, serialize_dates=True):
         """
         extracts from an item only fields that we want to output as extracted information
         :rtype: object
         :param item:
+        :param serialize_dates: if True, the publishing date is formatted as a string for storage, otherwise it is
+            kept as datetime
         :return:
         """
         article = {
             'authors': item['article_author'],
             'date_download': item['download_date'],
             'date_modify': item['modified_date'],
-            'date_publish': item['article_publish_date'],
+            'date_publish': (date_parser.to_string(item['article_publish_date']) if serialize_dates
+                             else item['article_publish_date']),
             'description': item['article_description'],
             'filename': item['filename'],
             'image_url': item['article_image'],
@@ -308,6 +345,9 @@ class ExtractedInformationStorage(object):
             'maintext': item['article_text'],
             'url': item['url']
         }
+        # only set by the NearDuplicateFilter
+        if item.get('cluster_id') is not None:
+            article['cluster_id'] = item['cluster_id']
 
         # clean values
         for key in article:
@@ -319,8 +359,10 @@ class ExtractedInformationStorage(object):
 
     @staticmethod
     def datestring_to_date(text):
+        if isinstance(text, datetime.datetime):
+            return text
         if text:
-            return dateparser.parse(text)
+            return date_parser.parse(text)
         else:
             return None
 
@@ -342,6 +384,37 @@ class ExtractedInformationStorage(object):
         news_article.source_domain = item['source_domain']
         news_article.maintext = item['maintext']
         news_article.url = item['url']
+        news_article.cluster_id = item.get('cluster_id')
+        return news_article
+
+    @staticmethod
+    def item_to_class(item):
+        """
+        Creates the NewsArticle of an extracted item directly, i.e., without the dict of extract_relevant_info. The
+        result is the same as convert_to_class(extract_relevant_info(item, serialize_dates=False)).
+        :param item: A NewscrawlerItem or an ExtractionItem
+        :return: NewsArticle
+        """
+        def clean(value):
+            return None if isinstance(value, str) and not value else value
+
+        news_article = NewsArticle()
+        news_article.authors = clean(item['article_author'])
+        news_article.date_download = ExtractedInformationStorage.datestring_to_date(item['download_date'])
+        news_article.date_modify = ExtractedInformationStorage.datestring_to_date(item['modified_date'])
+        news_article.date_publish = ExtractedInformationStorage.datestring_to_date(item['article_publish_date'])
+        news_article.description = clean(item['article_description'])
+        news_article.filename = clean(item['filename'])
+        news_article.image_url = clean(item['article_image'])
+        news_article.language = clean(item['article_language'])
+        news_article.localpath = clean(item['local_path'])
+        news_article.title = clean(item['article_title'])
+        news_article.title_page = clean(ExtractedInformationStorage.ensure_str(item['html_title']))
+        news_article.title_rss = clean(ExtractedInformationStorage.ensure_str(item['rss_title']))
+        news_article.source_domain = clean(ExtractedInformationStorage.ensure_str(item['source_domain']))
+        news_article.maintext = clean(item['article_text'])
+        news_article.url = clean(item['url'])
+        news_article.cluster_id = clean(item.get('cluster_id'))
         return news_article
 
 class PostgresqlStorage(ExtractedInformationStorage):
@@ -577,7 +650,7 @@ class ElasticsearchStorage(ExtractedInformationStorage):
         self.cfg = CrawlerConfig.get_instance()
         self.database = self.cfg.section("Elasticsearch")
 
-        self.es = Elasticsearch(
+        self.es = elasticsearch.Elasticsearch(
             [self.database["host"]],
             http_auth=(str(self.database["username"]), str(self.database["secret"])),
             port=self.database["port"],
@@ -692,30 +765,109 @@ class DateFilter(object):
 
         # Check if date could be extracted
         if item['article_publish_date'] is None and self.strict_mode:
-            raise DropItem('DateFilter: %s: Publishing date is missing and strict mode is enabled.' % item['url'])
+            raise scrapy_exceptions.DropItem('DateFilter: %s: Publishing date is missing and strict mode is enabled.'
+                                             % item['url'])
         elif item['article_publish_date'] is None:
             return item
         else:
-            # Create datetime object
+            # Create datetime object, unless the extractor provided one
             try:
-                publish_date = datetime.datetime.strptime(str(item['article_publish_date']), '%Y-%m-%d %H:%M:%S')
+                publish_date = item['article_publish_date']
+                if not isinstance(publish_date, datetime.datetime):
+                    publish_date = datetime.datetime.strptime(str(publish_date), '%Y-%m-%d %H:%M:%S')
             except ValueError as error:
                 self.log.warning("DateFilter: Extracted date has the wrong format: %s - %s" %
                                  (item['article_publishing_date'], item['url']))
                 if self.strict_mode:
-                    raise DropItem('DateFilter: %s: Dropped due to wrong date format: %s' %
-                                   (item['url'], item['publish_date']))
+                    raise scrapy_exceptions.DropItem('DateFilter: %s: Dropped due to wrong date format: %s' %
+                                                     (item['url'], item['publish_date']))
                 else:
                     return item
             # Check interval boundaries
             if self.start_date is not None and self.start_date > publish_date:
-                raise DropItem('DateFilter: %s: Article is too old: %s' % (item['url'], publish_date))
+                raise scrapy_exceptions.DropItem('DateFilter: %s: Article is too old: %s' %
+                                                 (item['url'], publish_date))
             elif self.end_date is not None and self.end_date < publish_date:
-                raise DropItem('DateFilter: %s: Article is too young: %s ' % (item['url'], publish_date))
+                raise scrapy_exceptions.DropItem('DateFilter: %s: Article is too young: %s ' %
+                                                 (item['url'], publish_date))
             else:
                 return item
 
 
+class PreExtractionFilter(object):
+    """
+    Drops pages before their article is extracted if cheap signals (HTTP status and content type, dates in the URL and
+    in the meta tags, <html lang>) show that they are outside of the date range of the DateFilter or not in one of the
+    configured languages. This module should be placed before the KM4 article extractor.
+    """
+
+    log = None
+    cfg = None
+    prefilter = None
+
+    def __init__(self):
+        self.log = logging.getLogger(__name__ + '.PreExtractionFilter')
+        self.cfg = CrawlerConfig.get_instance()
+        self.config = self.cfg.section("PreExtractionFilter")
+        date_filter_config = self.cfg.section("DateFilter")
+
+        # the date range is the one of the DateFilter, so that it is configured only once
+        try:
+            start_date, end_date = (
+                datetime.datetime.strptime(str(date), '%Y-%m-%d %H:%M:%S') if date is not None else None
+                for date in (date_filter_config['start_date'], date_filter_config['end_date']))
+        except ValueError:
+            start_date, end_date = None, None
+            self.log.error("PreExtractionFilter: Couldn't read start or end date of the DateFilter, the dates are not "
+                           "checked.")
+        self.prefilter = PreFilter(start_date=start_date, end_date=end_date, languages=self.config['languages'],
+                                   date_tolerance=datetime.timedelta(days=self.config['date_tolerance_days']))
+
+    def process_item(self, item, spider):
+        response = item['spider_response']
+        content_type = response.headers.get('Content-Type')
+        if isinstance(content_type, bytes):
+            content_type = content_type.decode('latin-1')
+        stage = self.prefilter.check(item['url'], response.body, status=response.status, content_type=content_type)
+        if stage is not None:
+            raise scrapy_exceptions.DropItem('PreExtractionFilter: %s: Dropped by %s check.' % (item['url'], stage))
+        return item
+
+    def close_spider(self, spider):
+        self.log.info("PreExtractionFilter: %s", self.prefilter.report())
+
+
+class NearDuplicateFilter(object):
+    """
+    Detects articles whose text is a near-duplicate of an earlier article, e.g., copies of the same wire story on
+    several sites. Near-duplicates are dropped, or kept and tagged with the cluster_id of the earlier article.
+    This module should be placed after the KM4 article extractor and before the storage modules.
+    """
+
+    log = None
+    cfg = None
+    drop = True
+    index = None
+
+    def __init__(self):
+        self.log = logging.getLogger(__name__ + '.NearDuplicateFilter')
+        self.cfg = CrawlerConfig.get_instance()
+        self.config = self.cfg.section("NearDuplicateFilter")
+        self.drop = self.config['drop']
+        self.index = NearDuplicateIndex(self.config['index_path'], max_distance=self.config['max_distance'])
+
+    def process_item(self, item, spider):
+        cluster_id, near_duplicate = self.index.assign(item['article_text'])
+        if near_duplicate and self.drop:
+            raise scrapy_exceptions.DropItem('NearDuplicateFilter: %s: Near-duplicate of cluster %s' %
+                                             (item['url'], cluster_id))
+        item['cluster_id'] = cluster_id
+        return item
+
+    def close_spider(self, spider):
+        self.log.info("NearDuplicateFilter: %s", self.index.report())
+
+
 class PandasStorage(ExtractedInformationStorage):
     """
     Store meta data a Pandas data frame
@@ -730,7 +882,7 @@ class PandasStorage(ExtractedInformationStorage):
     running = False
 
     def __init__(self):
-        if np is None:
+        if not np.available() or not pd.available():
             raise ModuleNotFoundError("Using PandasStorage requires numpy and pandas")
         self.log = logging.getLogger(__name__)
         self.cfg = CrawlerConfig.get_instance()
@@ -36,13 +36,12 @@ news-please is an open source, easy-to-use news crawler that extracts structured
           'hjson>=1.5.8',
           'elasticsearch>=2.4',
           'beautifulsoup4>=4.3.2',
-          'readability-lxml>=0.6.2',
+          'readability-lxml>=0.8',
           'newspaper3k>=0.2.8',
           'langdetect>=1.0.7',
           'python-dateutil>=2.4.0',
           'plac>=0.9.6',
-          'dotmap>=1.2.17',
-          'readability-lxml>=0.6.2',
+          'readability-lxml>=0.8',
           'PyDispatcher>=2.0.5',
           'warcio>=1.3.3',
           'ago>=0.0.9',
@@ -60,6 +59,7 @@ news-please is an open source, easy-to-use news crawler that extracts structured
       },
       entry_points={
           'console_scripts': ['news-please = newsplease.__main__:main',
-                              'news-please-cc = newsplease.examples.commoncrawl:main']
+                              'news-please-cc = newsplease.examples.commoncrawl:main',
+                              'news-please-benchmark = newsplease.benchmark.suite:main']
       },
       )